@@ -8,10 +8,10 @@ and creates a mapping for organization.
 import os
 import csv
 import json
-from pathlib import Path
-import re
 from datetime import datetime
 
+from hts_file_scanner import scan_directory
+
 # Chapter names mapping based on HTS structure
 CHAPTER_NAMES = {
     1: "live-animals",
@@ -114,63 +114,26 @@ CHAPTER_NAMES = {
 }
 
 def find_hts_files(base_dir):
-    """Find all HTS data files in timestamp directories."""
+    """Find all HTS data files in timestamp directories, with the chapter of each CSV file."""
     files_found = []
-    base_path = Path(base_dir)
-    
-    if not base_path.exists():
-        print(f"Directory {base_dir} does not exist!")
-        return files_found
-    
-    # Look for timestamp directories
-    timestamp_pattern = re.compile(r'^\d{4}-\d{2}-\d{2}T\d{2}-\d{2}-\d{2}\.\d{3}Z$')
-    
-    for item in base_path.iterdir():
-        if item.is_dir() and timestamp_pattern.match(item.name):
-            # Check for HTS files in this timestamp directory
-            csv_file = item / "htsdata.csv"
-            json_file = item / "htsdata.json"
-            xlsx_file = item / "htsdata.xlsx"
-            
-            if csv_file.exists():
-                files_found.append({
-                    'timestamp_dir': item.name,
-                    'csv_file': csv_file,
-                    'json_file': json_file if json_file.exists() else None,
-                    'xlsx_file': xlsx_file if xlsx_file.exists() else None
-                })
+    index = scan_directory(base_dir)
+    
+    # Other formats downloaded into the same timestamp directory
+    siblings = {(scanned.directory, scanned.file_format): scanned.path
+                for scanned in index.files() + index.unidentified}
+    
+    csv_files = [scanned for scanned in index.files('csv') + index.unidentified if scanned.file_format == 'csv']
+    for scanned in sorted(csv_files, key=lambda scanned: scanned.directory):
+        files_found.append({
+            'timestamp_dir': scanned.directory,
+            'csv_file': scanned.path,
+            'json_file': siblings.get((scanned.directory, 'json')),
+            'xlsx_file': siblings.get((scanned.directory, 'xlsx')),
+            'chapter_number': scanned.chapter
+        })
     
     return files_found
 
-def identify_chapter_from_csv(csv_file):
-    """Identify HTS chapter number from CSV file content."""
-    try:
-        with open(csv_file, 'r', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            header = next(reader)  # Skip header
-            
-            # Read first few data rows to find HTS numbers
-            for i, row in enumerate(reader):
-                if i >= 10:  # Check first 10 rows max
-                    break
-                
-                if len(row) > 0 and row[0]:  # First column should be HTS Number
-                    hts_number = row[0].strip('"').strip()
-                    
-                    # Extract chapter number from HTS code
-                    if len(hts_number) >= 2:
-                        try:
-                            chapter_num = int(hts_number[:2])
-                            if chapter_num > 0 and chapter_num <= 99:
-                                return chapter_num
-                        except ValueError:
-                            continue
-    
-    except Exception as e:
-        print(f"Error reading {csv_file}: {e}")
-    
-    return None
-
 def analyze_all_files(base_dir):
     """Analyze all HTS files and create mapping."""
     files = find_hts_files(base_dir)
@@ -181,11 +144,10 @@ def analyze_all_files(base_dir):
     
     for file_info in files:
         timestamp_dir = file_info['timestamp_dir']
-        csv_file = file_info['csv_file']
         
         print(f"Analyzing {timestamp_dir}...")
         
-        chapter_num = identify_chapter_from_csv(csv_file)
+        chapter_num = file_info['chapter_number']
         
         if chapter_num:
             chapter_name = CHAPTER_NAMES.get(chapter_num, f"chapter-{chapter_num}")
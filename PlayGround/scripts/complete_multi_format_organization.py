@@ -6,18 +6,11 @@ This handles the case where each format was downloaded to separate timestamp dir
 """
 
 import os
-import csv
-import json
 import shutil
 from pathlib import Path
 from collections import defaultdict
-import re
-try:
-    from openpyxl import load_workbook
-    OPENPYXL_AVAILABLE = True
-except ImportError:
-    OPENPYXL_AVAILABLE = False
-    print("⚠️  openpyxl not available. Install with: pip install openpyxl")
+
+from hts_file_scanner import scan_directory
 
 # Chapter names mapping
 CHAPTER_NAMES = {
@@ -69,132 +62,38 @@ CHAPTER_NAMES = {
     98: "special-classification-provisions", 99: "temporary-legislation-modifications"
 }
 
-def identify_chapter_from_csv(csv_file):
-    """Identify chapter from CSV file."""
-    try:
-        with open(csv_file, 'r', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            header = next(reader)
-            first_row = next(reader)
-            hts_number = first_row[0].strip('"').strip()
-            
-            if len(hts_number) >= 2 and hts_number.isdigit():
-                chapter_num = int(hts_number[:2])
-                if 1 <= chapter_num <= 99:
-                    return chapter_num
-    except Exception as e:
-        print(f"  Error reading CSV {csv_file}: {e}")
-    return None
-
-def identify_chapter_from_json(json_file):
-    """Identify chapter from JSON file."""
-    try:
-        with open(json_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            
-            if isinstance(data, list) and len(data) > 0:
-                first_data = data[0]
-                
-                hts_number = None
-                if isinstance(first_data, dict):
-                    for field_name in ['htsno', 'HTS Number', 'HTS_Number', 'hts_number', 'HTS', 'hts']:
-                        if field_name in first_data:
-                            hts_number = str(first_data[field_name]).strip('"').strip()
-                            break
-                elif isinstance(first_data, list) and len(first_data) > 0:
-                    hts_number = str(first_data[0]).strip('"').strip()
-                
-                if hts_number and len(hts_number) >= 2 and hts_number.isdigit():
-                    chapter_num = int(hts_number[:2])
-                    if 1 <= chapter_num <= 99:
-                        return chapter_num
-    except Exception as e:
-        print(f"  Error reading JSON {json_file}: {e}")
-    return None
-
-def identify_chapter_from_excel(excel_file):
-    """Identify chapter from Excel file."""
-    if not OPENPYXL_AVAILABLE:
-        return None
-    
-    try:
-        workbook = load_workbook(excel_file, read_only=True)
-        worksheet = workbook.active
-        
-        for row in worksheet.iter_rows(min_row=2, max_row=3, values_only=True):
-            if row and row[0]:
-                hts_number = str(row[0]).strip('"').strip()
-                
-                if len(hts_number) >= 2:
-                    try:
-                        chapter_num = int(hts_number[:2])
-                        if 1 <= chapter_num <= 99:
-                            workbook.close()
-                            return chapter_num
-                    except ValueError:
-                        continue
-        
-        workbook.close()
-    except Exception as e:
-        print(f"  Error reading Excel {excel_file}: {e}")
-    return None
-
 def scan_all_files(playwright_dir):
     """Scan all files and categorize by chapter and format."""
-    base_path = Path(playwright_dir)
-    timestamp_pattern = re.compile(r'^\d{4}-\d{2}-\d{2}T\d{2}-\d{2}-\d{2}\.\d{3}Z$')
-    
     # Dictionary to store files by chapter: {chapter_num: {'csv': path, 'json': path, 'xlsx': path}}
     chapter_files = defaultdict(lambda: {'csv': None, 'json': None, 'xlsx': None})
     unidentified_files = []
     
     print("🔍 Scanning all timestamp directories...")
     
-    total_dirs = 0
+    index = scan_directory(playwright_dir)
     processed_dirs = 0
     
-    for item in base_path.iterdir():
-        if item.is_dir() and timestamp_pattern.match(item.name):
-            total_dirs += 1
-            
-            # Check what files are in this directory
-            csv_file = item / "htsdata.csv"
-            json_file = item / "htsdata.json"
-            xlsx_file = item / "htsdata.xlsx"
-            
-            chapter_num = None
-            file_type = None
-            
-            # Identify chapter and file type
-            if csv_file.exists():
-                chapter_num = identify_chapter_from_csv(csv_file)
-                file_type = 'csv'
-                file_path = csv_file
-            elif json_file.exists():
-                chapter_num = identify_chapter_from_json(json_file)
-                file_type = 'json'
-                file_path = json_file
-            elif xlsx_file.exists():
-                chapter_num = identify_chapter_from_excel(xlsx_file)
-                file_type = 'xlsx'
-                file_path = xlsx_file
+    # Timestamp order, so the earliest download of a chapter is the one kept
+    for scanned in sorted(index.files() + index.unidentified, key=lambda scanned: scanned.directory):
+        chapter_num = scanned.chapter
+        file_type = scanned.file_format
+        
+        if chapter_num:
+            chapter_name = CHAPTER_NAMES.get(chapter_num, f"chapter-{chapter_num}")
+            print(f"  📁 {scanned.directory}: Chapter {chapter_num:02d} ({chapter_name}) - {file_type.upper()}")
             
-            if chapter_num and file_type:
-                chapter_name = CHAPTER_NAMES.get(chapter_num, f"chapter-{chapter_num}")
-                print(f"  📁 {item.name}: Chapter {chapter_num:02d} ({chapter_name}) - {file_type.upper()}")
-                
-                # Store the file path for this chapter and format
-                if chapter_files[chapter_num][file_type] is None:
-                    chapter_files[chapter_num][file_type] = file_path
-                    processed_dirs += 1
-                else:
-                    print(f"    ⚠️  Duplicate {file_type.upper()} found for Chapter {chapter_num}, keeping first one")
+            # Store the file path for this chapter and format
+            if chapter_files[chapter_num][file_type] is None:
+                chapter_files[chapter_num][file_type] = scanned.path
+                processed_dirs += 1
             else:
-                print(f"  ❓ {item.name}: Could not identify chapter")
-                unidentified_files.append(item)
+                print(f"    ⚠️  Duplicate {file_type.upper()} found for Chapter {chapter_num}, keeping first one")
+        else:
+            print(f"  ❓ {scanned.directory}: Could not identify chapter")
+            unidentified_files.append(scanned.path.parent)
     
     print(f"\n📊 Scan Summary:")
-    print(f"  Total directories: {total_dirs}")
+    print(f"  Total directories: {index.directories}")
     print(f"  Successfully processed: {processed_dirs}")
     print(f"  Unidentified: {len(unidentified_files)}")
     print(f"  Unique chapters found: {len(chapter_files)}")
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+HTS File Scanner
+Finds the htsdata.csv / .json / .xlsx files in the Playwright timestamp
+directories and identifies the chapter of each one, reading only the start
+of the file:
+
+- CSV: the first rows after the header line
+- JSON: the first records, decoded one at a time from the opening bytes
+- XLSX: the first HTS number among the workbook's shared strings
+
+Directories are listed with os.scandir and files are sniffed on a thread
+pool. The result is one index of files by chapter and format.
+"""
+
+import csv
+import io
+import json
+import os
+import re
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+try:
+    from openpyxl import load_workbook
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+
+# File name of each format inside a timestamp directory
+HTS_FILENAMES = {
+    'csv': "htsdata.csv",
+    'json': "htsdata.json",
+    'xlsx': "htsdata.xlsx",
+}
+
+TIMESTAMP_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}T\d{2}-\d{2}-\d{2}\.\d{3}Z$')
+
+# HTS numbers as published: 0601, 0601.10, 0601.10.15.00
+HTS_NUMBER_PATTERN = re.compile(r'^\d{4}(?:\.\d{2,4})*$')
+
+# Bytes read first from a file; JSON reads more, doubling, up to MAX_SNIFF_BYTES
+SNIFF_BYTES = 16 * 1024
+MAX_SNIFF_BYTES = 1024 * 1024
+
+# Records looked at for an HTS number before giving up
+MAX_SNIFF_RECORDS = 10
+
+# Field holding the HTS number in JSON records
+JSON_CODE_FIELDS = ['htsno', 'HTS Number', 'HTS_Number', 'hts_number', 'HTS', 'hts']
+
+
+class ScannedFile(NamedTuple):
+    """One HTS data file and the chapter it holds (None if not identified)."""
+    directory: str
+    path: Path
+    file_format: str
+    chapter: Optional[int]
+    size: int
+
+
+class ScanIndex(NamedTuple):
+    """Scanned files by chapter and format, plus the files whose chapter was not identified."""
+    chapters: Dict[int, Dict[str, List[ScannedFile]]]
+    unidentified: List[ScannedFile]
+    directories: int
+
+    def first(self, chapter: int, file_format: str) -> Optional[ScannedFile]:
+        """Earliest file of a chapter in a format."""
+        files = self.chapters.get(chapter, {}).get(file_format)
+        return files[0] if files else None
+
+    def files(self, file_format: Optional[str] = None) -> List[ScannedFile]:
+        """All identified files, optionally of one format, by chapter then directory."""
+        return [scanned for chapter in sorted(self.chapters)
+                for fmt, files in sorted(self.chapters[chapter].items())
+                if file_format is None or fmt == file_format
+                for scanned in files]
+
+
+def chapter_from_code(value) -> Optional[int]:
+    """Chapter of an HTS number ("0601.10" -> 6), or None."""
+    code = str(value).strip('"').strip() if value is not None else ''
+    if len(code) >= 2 and code[:2].isdigit():
+        chapter = int(code[:2])
+        if 1 <= chapter <= 99:
+            return chapter
+    return None
+
+
+def sniff_csv_chapter(path: Path) -> Optional[int]:
+    """Chapter from the first data rows of a CSV file."""
+    with open(path, 'rb') as f:
+        head = f.read(SNIFF_BYTES)
+        complete = not f.read(1)
+    text = head.decode('utf-8-sig', errors='ignore')
+    if not complete:
+        # The last line may be cut off
+        text = text[:text.rfind('\n') + 1]
+    rows = csv.reader(io.StringIO(text))
+    next(rows, None)  # Header
+    for i, row in enumerate(rows):
+        if i >= MAX_SNIFF_RECORDS:
+            break
+        if row and row[0]:
+            chapter = chapter_from_code(row[0])
+            if chapter:
+                return chapter
+    return None
+
+
+def _record_chapter(record) -> Optional[int]:
+    if isinstance(record, dict):
+        for field_name in JSON_CODE_FIELDS:
+            if field_name in record:
+                return chapter_from_code(record[field_name])
+    elif isinstance(record, list) and record:
+        return chapter_from_code(record[0])
+    return None
+
+
+def sniff_json_chapter(path: Path) -> Optional[int]:
+    """
+    Chapter from the first records of a JSON array, decoding one record at a
+    time from the start of the file instead of loading all of it.
+    """
+    decoder = json.JSONDecoder()
+    limit = SNIFF_BYTES
+    with open(path, 'rb') as f:
+        data = b''
+        while True:
+            chunk = f.read(limit - len(data))
+            data += chunk
+            text = data.decode('utf-8-sig', errors='ignore')
+            position = text.find('[')
+            if position < 0:
+                return None
+            position += 1
+            for _ in range(MAX_SNIFF_RECORDS):
+                while position < len(text) and text[position] in ' \t\r\n,':
+                    position += 1
+                if position >= len(text) or text[position] == ']':
+                    break
+                try:
+                    record, position = decoder.raw_decode(text, position)
+                except json.JSONDecodeError:
+                    break  # Record runs past the bytes read so far
+                chapter = _record_chapter(record)
+                if chapter:
+                    return chapter
+            else:
+                return None
+            if not chunk or limit >= MAX_SNIFF_BYTES:
+                return None
+            limit *= 2
+
+
+def sniff_xlsx_chapter(path: Path) -> Optional[int]:
+    """
+    Chapter from the first HTS number in the workbook's shared strings,
+    falling back to the first rows of the sheet when numbers are not stored
+    as shared strings.
+    """
+    try:
+        with zipfile.ZipFile(path) as workbook:
+            if 'xl/sharedStrings.xml' in workbook.namelist():
+                with workbook.open('xl/sharedStrings.xml') as strings:
+                    head = strings.read(SNIFF_BYTES).decode('utf-8', errors='ignore')
+                for text in re.findall(r'<t(?:\s[^>]*)?>([^<]*)</t>', head):
+                    if HTS_NUMBER_PATTERN.match(text.strip()):
+                        return chapter_from_code(text)
+    except zipfile.BadZipFile:
+        return None
+
+    if not OPENPYXL_AVAILABLE:
+        return None
+    workbook = load_workbook(path, read_only=True)
+    try:
+        for row in workbook.active.iter_rows(min_row=2, max_row=MAX_SNIFF_RECORDS + 1, values_only=True):
+            if row and row[0]:
+                chapter = chapter_from_code(row[0])
+                if chapter:
+                    return chapter
+    finally:
+        workbook.close()
+    return None
+
+
+SNIFFERS = {
+    'csv': sniff_csv_chapter,
+    'json': sniff_json_chapter,
+    'xlsx': sniff_xlsx_chapter,
+}
+
+
+def _candidate_files(base_dir: Path) -> tuple:
+    """
+    (directory, path, format, size) of every HTS file in the timestamp
+    directories, and the number of those directories.
+    """
+    candidates = []
+    with os.scandir(base_dir) as entries:
+        directories = sorted(entry.name for entry in entries
+                             if entry.is_dir() and TIMESTAMP_PATTERN.match(entry.name))
+    wanted = {filename: file_format for file_format, filename in HTS_FILENAMES.items()}
+    for directory in directories:
+        with os.scandir(base_dir / directory) as entries:
+            for entry in entries:
+                if entry.name in wanted and entry.is_file():
+                    candidates.append((directory, Path(entry.path), wanted[entry.name], entry.stat().st_size))
+    return candidates, len(directories)
+
+
+def _sniff(candidate: tuple) -> ScannedFile:
+    directory, path, file_format, size = candidate
+    try:
+        chapter = SNIFFERS[file_format](path)
+    except Exception as e:
+        print(f"  Error reading {file_format.upper()} {path}: {e}")
+        chapter = None
+    return ScannedFile(directory, path, file_format, chapter, size)
+
+
+def scan_directory(playwright_dir, max_workers: int = 8) -> ScanIndex:
+    """
+    Identify every HTS file under the timestamp directories of
+    ``playwright_dir``. Files of a chapter and format are listed in
+    directory (timestamp) order.
+    """
+    base_path = Path(playwright_dir)
+    if not base_path.exists():
+        print(f"Directory {playwright_dir} does not exist!")
+        return ScanIndex({}, [], 0)
+
+    candidates, directory_count = _candidate_files(base_path)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        scanned = list(executor.map(_sniff, candidates))
+
+    chapters: Dict[int, Dict[str, List[ScannedFile]]] = {}
+    unidentified = []
+    for scanned_file in scanned:
+        if scanned_file.chapter is None:
+            unidentified.append(scanned_file)
+        else:
+            chapters.setdefault(scanned_file.chapter, {}).setdefault(scanned_file.file_format, []).append(scanned_file)
+    return ScanIndex(chapters, unidentified, directory_count)
+
+
+def main():
+    """Print the scan index of the Playwright output directory."""
+    import sys
+    import time
+    try:
+        from config import PLAYWRIGHT_OUTPUT_DIR
+    except ImportError:
+        PLAYWRIGHT_OUTPUT_DIR = "../playwright-mcp-output11"
+    playwright_dir = sys.argv[1] if len(sys.argv) > 1 else PLAYWRIGHT_OUTPUT_DIR
+
+    start = time.time()
+    index = scan_directory(playwright_dir)
+    elapsed = time.time() - start
+
+    print(f"🔍 Scanned {index.directories} directories in {elapsed:.2f}s")
+    for file_format in HTS_FILENAMES:
+        print(f"  {file_format.upper()}: {len(index.files(file_format))} files")
+    print(f"  Chapters: {len(index.chapters)}")
+    print(f"  Unidentified: {len(index.unidentified)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,12 +4,15 @@ Handles caching, validation, and error recovery.
 """
 
 from typing import Dict, List, Any, Optional
+import copy
 import json
 import hashlib
 import time
 from pathlib import Path
 import logging
 
+from agents.cache import SingleFlight, load_cache_config, make_cache, prompt_key
+
 logger = logging.getLogger(__name__)
 
 
@@ -19,38 +22,34 @@ class BaseExtractorAgent:
     Handles caching, validation, and error recovery.
     """
     
-    def __init__(self, cache_dir: str = "data/cache", confidence_threshold: float = 0.95):
+    # AI calls in progress, shared by all agents of the process so that
+    # threads of one agent class and cache asking for the same prompt at
+    # once make a single call (see _flight_key)
+    inflight = SingleFlight()
+    
+    def __init__(self, cache_dir: str = "data/cache", confidence_threshold: float = 0.95,
+                 cache_backend: Optional[str] = None, cache=None):
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(exist_ok=True)
         self.confidence_threshold = confidence_threshold
+        # Response cache: a backend from agents/cache.py, shared if passed in,
+        # otherwise as configured under ai_extraction in config.yaml
+        if cache is None:
+            options = load_cache_config()
+            backend = options.pop('backend', 'sqlite')
+            cache = make_cache(cache_backend or backend, cache_dir, **options)
+        self.cache = cache
         
     def get_cached_response(self, prompt: str) -> Optional[Dict]:
         """Check if we have a cached response for this prompt"""
-        prompt_hash = hashlib.md5(prompt.encode()).hexdigest()
-        cache_file = self.cache_dir / f"{prompt_hash}.json"
-        
-        if cache_file.exists():
-            try:
-                with open(cache_file, "r", encoding='utf-8') as f:
-                    cached_data = json.load(f)
-                    logger.info("Using cached response")
-                    return cached_data
-            except (json.JSONDecodeError, IOError) as e:
-                logger.warning(f"Failed to load cached response: {e}")
-                
-        return None
+        cached_data = self.cache.get(prompt)
+        if cached_data is not None:
+            logger.info("Using cached response")
+        return cached_data
     
     def cache_response(self, prompt: str, response: Dict) -> None:
         """Cache the AI response for reuse"""
-        prompt_hash = hashlib.md5(prompt.encode()).hexdigest()
-        cache_file = self.cache_dir / f"{prompt_hash}.json"
-        
-        try:
-            with open(cache_file, "w", encoding='utf-8') as f:
-                json.dump(response, f, indent=2, ensure_ascii=False)
-            logger.info(f"Cached response to {cache_file}")
-        except IOError as e:
-            logger.error(f"Failed to cache response: {e}")
+        self.cache.put(prompt, response)
     
     def extract_with_ai(self, prompt: str) -> Dict:
         """
@@ -62,6 +61,26 @@ class BaseExtractorAgent:
         if cached:
             return cached
         
+        # Identical prompts already being extracted share that call
+        response, shared = self.inflight.do(self._flight_key(prompt), lambda: self._call_and_cache(prompt))
+        return copy.deepcopy(response) if shared else response
+    
+    def _flight_key(self, prompt: str) -> tuple:
+        """
+        Calls coalesce only between agents of the same class sharing a cache:
+        another class may call a different service, and another cache would
+        not receive the response.
+        """
+        return (type(self).__name__, id(self.cache), prompt_key(prompt))
+    
+    def _call_and_cache(self, prompt: str) -> Dict:
+        """Call the AI service and cache the response; run once per in-flight prompt."""
+        # A call for this prompt may have finished between the cache check
+        # and now; peek so this second look is not counted as another miss
+        cached = self.cache.peek(prompt)
+        if cached:
+            return cached
+        
         # This should be overridden in subclasses
         response = self.call_ai(prompt)
         
@@ -173,8 +192,8 @@ class WebScrapingAgent(BaseExtractorAgent):
     Agent that extracts HS data from official sources via web scraping.
     """
     
-    def __init__(self, cache_dir: str = "data/cache", confidence_threshold: float = 0.9):
-        super().__init__(cache_dir, confidence_threshold)
+    def __init__(self, cache_dir: str = "data/cache", confidence_threshold: float = 0.9, **cache_options):
+        super().__init__(cache_dir, confidence_threshold, **cache_options)
         self.known_sources = [
             "https://unstats.un.org/unsd/tradekb/Knowledgebase/50018/Harmonized-Commodity-Description-and-Coding-Systems-HS",
             "https://www.wcoomd.org/en/topics/nomenclature/instrument-and-tools/hs_nomenclature_2022_edition.aspx"
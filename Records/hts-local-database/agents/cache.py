@@ -0,0 +1,385 @@
+"""
+Response cache backends for the extraction agents.
+
+Responses are keyed by the MD5 of the prompt. Two backends:
+
+- FileResponseCache: one JSON file per prompt, the original layout
+  (optionally sharded into subdirectories by the first hash characters).
+- SQLiteResponseCache: one SQLite file holding zlib-compressed compact
+  JSON, with an optional time-to-live and a size bound enforced by evicting
+  the least recently used entries. On a miss it reads the per-prompt JSON
+  file left by the file backend, if any, and imports it, so responses
+  cached before the switch are not requested again.
+
+Both count hits and misses (see stats()), offer peek() for lookups that
+should not be counted, and are safe to share between threads. SingleFlight
+lets concurrent misses on the same prompt share one AI call.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Any, Optional, Hashable
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+CACHE_BACKENDS = ('sqlite', 'file')
+
+DEFAULT_CONFIG_PATH = "config.yaml"
+
+
+def prompt_key(prompt: str) -> str:
+    """Cache key of a prompt."""
+    return hashlib.md5(prompt.encode()).hexdigest()
+
+
+class FileResponseCache:
+    """
+    One pretty-printed JSON file per prompt in ``cache_dir``. With
+    ``shard_depth`` 1 or 2, files go into that many levels of two-character
+    subdirectories (ab/cd/abcd....json); files of the flat layout are still read.
+    """
+    
+    def __init__(self, cache_dir: str = "data/cache", shard_depth: int = 0):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.shard_depth = shard_depth
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+    
+    def _path(self, key: str) -> Path:
+        directory = self.cache_dir
+        for level in range(self.shard_depth):
+            directory = directory / key[level * 2:level * 2 + 2]
+        return directory / f"{key}.json"
+    
+    def _read(self, key: str) -> Optional[Dict]:
+        for cache_file in (self._path(key), self.cache_dir / f"{key}.json"):
+            if cache_file.exists():
+                try:
+                    with open(cache_file, "r", encoding='utf-8') as f:
+                        return json.load(f)
+                except (json.JSONDecodeError, IOError) as e:
+                    logger.warning(f"Failed to load cached response: {e}")
+                    break
+        return None
+    
+    def get(self, prompt: str) -> Optional[Dict]:
+        """Cached response for a prompt, or None."""
+        response = self._read(prompt_key(prompt))
+        with self._lock:
+            if response is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return response
+    
+    def peek(self, prompt: str) -> Optional[Dict]:
+        """Cached response for a prompt without counting a lookup."""
+        return self._read(prompt_key(prompt))
+    
+    def put(self, prompt: str, response: Dict) -> None:
+        """Store the response of a prompt."""
+        cache_file = self._path(prompt_key(prompt))
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(cache_file, "w", encoding='utf-8') as f:
+                json.dump(response, f, indent=2, ensure_ascii=False)
+            logger.debug(f"Cached response to {cache_file}")
+        except IOError as e:
+            logger.error(f"Failed to cache response: {e}")
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit and miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            'backend': 'file',
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+    
+    def close(self) -> None:
+        pass
+
+
+class SQLiteResponseCache:
+    """
+    Key-value cache in one SQLite file. Entries older than ``ttl_seconds``
+    are misses (and are deleted); when the compressed values exceed
+    ``max_bytes``, the least recently used entries are evicted.
+    
+    ``legacy_dir`` is the directory of a flat FileResponseCache. A miss
+    falls back to its <key>.json file and imports it, dated by the file's
+    modification time so the TTL still applies. The file is left in place.
+    """
+    
+    def __init__(self, path: str = "data/cache/responses.db", ttl_seconds: Optional[float] = None,
+                 max_bytes: Optional[int] = 256 * 1024 * 1024, compression_level: int = 6,
+                 legacy_dir: Optional[str] = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.compression_level = compression_level
+        self.legacy_dir = Path(legacy_dir) if legacy_dir else None
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.imported = 0
+        self._lock = threading.Lock()
+        
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                cache_key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+    
+    def get(self, prompt: str) -> Optional[Dict]:
+        """Cached response for a prompt, or None when absent or expired."""
+        key = prompt_key(prompt)
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute("SELECT value, size, created_at FROM responses WHERE cache_key = ?",
+                                    (key,)).fetchone()
+            if row is not None:
+                value, size, created_at = row
+                if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+                    self.conn.execute("DELETE FROM responses WHERE cache_key = ?", (key,))
+                    self.total_bytes -= size
+                    self.expired += 1
+                    self.misses += 1
+                    return None
+                self.conn.execute("UPDATE responses SET accessed_at = ? WHERE cache_key = ?", (now, key))
+                self.hits += 1
+        
+        if row is None:
+            response = self._import_legacy(key, now)
+            with self._lock:
+                if response is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+            return response
+        
+        try:
+            return json.loads(zlib.decompress(value))
+        except (zlib.error, json.JSONDecodeError) as e:
+            logger.warning(f"Failed to load cached response: {e}")
+            return None
+    
+    def peek(self, prompt: str) -> Optional[Dict]:
+        """
+        Cached response for a prompt, as a read-only lookup: it is not
+        counted, does not refresh the entry's recency and leaves an expired
+        entry in place (returning None for it).
+        """
+        with self._lock:
+            row = self.conn.execute("SELECT value, created_at FROM responses WHERE cache_key = ?",
+                                    (prompt_key(prompt),)).fetchone()
+        if row is None or (self.ttl_seconds is not None and time.time() - row[1] > self.ttl_seconds):
+            return None
+        try:
+            return json.loads(zlib.decompress(row[0]))
+        except (zlib.error, json.JSONDecodeError) as e:
+            logger.warning(f"Failed to load cached response: {e}")
+            return None
+    
+    def _import_legacy(self, key: str, now: float) -> Optional[Dict]:
+        """Response from the flat file cache in legacy_dir, copied into this cache; None if absent or expired."""
+        if self.legacy_dir is None:
+            return None
+        legacy_file = self.legacy_dir / f"{key}.json"
+        try:
+            modified = legacy_file.stat().st_mtime
+        except OSError:
+            return None
+        if self.ttl_seconds is not None and now - modified > self.ttl_seconds:
+            return None
+        try:
+            with open(legacy_file, "r", encoding='utf-8') as f:
+                response = json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            logger.warning(f"Failed to load cached response: {e}")
+            return None
+        
+        self._store(key, response, created_at=modified)
+        with self._lock:
+            self.imported += 1
+        logger.debug(f"Imported cached response from {legacy_file}")
+        return response
+    
+    def put(self, prompt: str, response: Dict) -> None:
+        """Store the response of a prompt, evicting old entries if over the size bound."""
+        self._store(prompt_key(prompt), response)
+    
+    def _store(self, key: str, response: Dict, created_at: Optional[float] = None) -> None:
+        value = zlib.compress(json.dumps(response, ensure_ascii=False, separators=(',', ':')).encode('utf-8'),
+                              self.compression_level)
+        now = time.time()
+        with self._lock:
+            previous = self.conn.execute("SELECT size FROM responses WHERE cache_key = ?", (key,)).fetchone()
+            self.conn.execute("""
+                INSERT OR REPLACE INTO responses (cache_key, value, size, created_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, (key, value, len(value), created_at or now, now))
+            self.total_bytes += len(value) - (previous[0] if previous else 0)
+            if self.max_bytes is not None and self.total_bytes > self.max_bytes:
+                self._evict()
+    
+    def _evict(self) -> None:
+        """Delete least recently used entries until the cache is at 90% of max_bytes."""
+        target = self.max_bytes * 0.9
+        cursor = self.conn.execute("SELECT cache_key, size FROM responses ORDER BY accessed_at")
+        evicted = []
+        for key, size in cursor:
+            if self.total_bytes <= target:
+                break
+            evicted.append((key,))
+            self.total_bytes -= size
+        cursor.close()
+        self.conn.executemany("DELETE FROM responses WHERE cache_key = ?", evicted)
+        self.evictions += len(evicted)
+        logger.debug(f"Evicted {len(evicted)} cached responses")
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit, miss, expiry, eviction and import counters, entry count and stored bytes."""
+        with self._lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            'backend': 'sqlite',
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'expired': self.expired,
+            'evictions': self.evictions,
+            'imported': self.imported,
+            'entries': entries,
+            'bytes': self.total_bytes,
+        }
+    
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+
+
+class _Flight:
+    """One call in progress and, once done, its result or exception."""
+    
+    __slots__ = ('done', 'result', 'error')
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller runs the
+    function, callers arriving while it runs wait for it and share its result
+    (or exception). Counts the calls made and the calls coalesced.
+    """
+    
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+    
+    def do(self, key: Hashable, func) -> tuple:
+        """(result, shared): shared is True when the result came from another caller's call."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                self.calls += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+        
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+        
+        try:
+            flight.result = func()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result, False
+    
+    def in_flight(self) -> int:
+        """Number of keys with a call in progress."""
+        with self._lock:
+            return len(self._flights)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Calls made and calls coalesced onto them."""
+        with self._lock:
+            requests = self.calls + self.coalesced
+            return {
+                'calls': self.calls,
+                'coalesced': self.coalesced,
+                'coalesced_rate': self.coalesced / requests if requests else 0.0,
+            }
+
+
+def load_cache_config(config_path: str = DEFAULT_CONFIG_PATH) -> Dict[str, Any]:
+    """make_cache() arguments from the ai_extraction section of config.yaml ({} without a config file)."""
+    path = Path(config_path)
+    if not path.exists():
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        section = (yaml.safe_load(f) or {}).get('ai_extraction') or {}
+    
+    options: Dict[str, Any] = {}
+    if section.get('cache_backend'):
+        options['backend'] = section['cache_backend']
+    if section.get('cache_ttl_days') is not None:
+        options['ttl_seconds'] = float(section['cache_ttl_days']) * 86400
+    if section.get('cache_max_mb') is not None:
+        options['max_bytes'] = int(float(section['cache_max_mb']) * 1024 * 1024)
+    return options
+
+
+def make_cache(backend: str = 'sqlite', cache_dir: str = "data/cache", **options):
+    """
+    Cache backend by name. Options: ttl_seconds and max_bytes for 'sqlite',
+    shard_depth for 'file'. The 'sqlite' backend imports responses the file
+    backend left in ``cache_dir`` as they are requested.
+    """
+    if backend == 'sqlite':
+        return SQLiteResponseCache(str(Path(cache_dir) / "responses.db"),
+                                   ttl_seconds=options.get('ttl_seconds'),
+                                   max_bytes=options.get('max_bytes', 256 * 1024 * 1024),
+                                   legacy_dir=cache_dir)
+    if backend == 'file':
+        return FileResponseCache(cache_dir, shard_depth=options.get('shard_depth', 0))
+    raise ValueError(f"Unknown cache backend: {backend} (choose from {', '.join(CACHE_BACKENDS)})")
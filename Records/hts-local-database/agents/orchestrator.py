@@ -0,0 +1,206 @@
+"""
+Concurrent extraction orchestrator for the populate_* agents.
+
+Extraction calls (one per section, chapter, ...) are fanned out to a
+bounded thread pool. A token bucket caps the request rate across all
+workers, failed calls are retried with exponential backoff in their own
+worker (the others keep going), and completed results are checkpointed to a
+JSON file every ``checkpoint_interval`` records so a crashed run resumes
+where it stopped.
+
+Settings come from config.yaml: ai_extraction.batch_sizes,
+ai_extraction.retry_attempts, ai_extraction.max_concurrency,
+ai_extraction.requests_per_second and progress.checkpoint_interval.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Any, Optional, Callable
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG_PATH = "config.yaml"
+DEFAULT_CHECKPOINT_DIR = "data/checkpoints"
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` tokens per second, bursts of up to ``capacity``."""
+    
+    def __init__(self, rate: Optional[float], capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate or 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until ``tokens`` are available; returns the seconds waited."""
+        if not self.rate:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return waited
+                delay = (tokens - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class Checkpoint:
+    """Results of completed records, persisted as JSON and replaced atomically."""
+    
+    def __init__(self, path: Optional[str]):
+        self.path = Path(path) if path else None
+        self.results: Dict[str, Any] = {}
+        if self.path and self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.results = json.load(f).get('results', {})
+                logger.info(f"Resuming from checkpoint {self.path}: {len(self.results)} records done")
+            except (json.JSONDecodeError, IOError) as e:
+                logger.warning(f"Ignoring unreadable checkpoint {self.path}: {e}")
+    
+    def save(self) -> None:
+        if not self.path:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'saved_at': time.time(), 'results': self.results}, f, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+    
+    def clear(self) -> None:
+        if self.path and self.path.exists():
+            self.path.unlink()
+
+
+def load_orchestrator_config(config_path: str = DEFAULT_CONFIG_PATH) -> Dict[str, Any]:
+    """ai_extraction and progress settings from config.yaml ({} without a config file)."""
+    path = Path(config_path)
+    if not path.exists():
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f) or {}
+    extraction = config.get('ai_extraction') or {}
+    progress = config.get('progress') or {}
+    return {
+        'batch_sizes': extraction.get('batch_sizes') or {},
+        'max_retries': extraction.get('retry_attempts', 3),
+        'max_workers': extraction.get('max_concurrency', 4),
+        'requests_per_second': extraction.get('requests_per_second'),
+        'checkpoint_interval': progress.get('checkpoint_interval', 100) if progress.get('save_checkpoints', True) else None,
+    }
+
+
+class ExtractionOrchestrator:
+    """
+    Run ``func(item)`` for every record with bounded concurrency, rate
+    limiting, retries and checkpoints. Records are submitted in batches of
+    ``batch_size``: the next batch starts when the previous one finished.
+    """
+    
+    def __init__(self, max_workers: int = 4, requests_per_second: Optional[float] = None,
+                 batch_size: Optional[int] = None, checkpoint_path: Optional[str] = None,
+                 checkpoint_interval: Optional[int] = 100, max_retries: int = 3, base_delay: float = 1.0):
+        self.max_workers = max(1, max_workers)
+        self.bucket = TokenBucket(requests_per_second)
+        self.batch_size = batch_size
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
+        self.max_retries = max(1, max_retries)
+        self.base_delay = base_delay
+        self.stats: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def from_config(cls, table: str, config_path: str = DEFAULT_CONFIG_PATH,
+                    checkpoint_dir: str = DEFAULT_CHECKPOINT_DIR, **overrides) -> 'ExtractionOrchestrator':
+        """Orchestrator for one table (sections, chapters, ...) with its batch size from config.yaml."""
+        config = load_orchestrator_config(config_path)
+        options = {
+            'max_workers': config.get('max_workers', 4),
+            'requests_per_second': config.get('requests_per_second'),
+            'batch_size': config.get('batch_sizes', {}).get(table),
+            'checkpoint_path': str(Path(checkpoint_dir) / f"{table}.json"),
+            'checkpoint_interval': config.get('checkpoint_interval', 100),
+            'max_retries': config.get('max_retries', 3),
+        }
+        options.update(overrides)
+        return cls(**options)
+    
+    def _call(self, func: Callable[[Any], Any], item: Any) -> Any:
+        """One rate-limited call, retried with backoff in this worker only."""
+        for attempt in range(self.max_retries):
+            waited = self.bucket.acquire()
+            with self._lock:
+                self.stats['rate_limited_seconds'] += waited
+            try:
+                return func(item)
+            except Exception as e:
+                if attempt == self.max_retries - 1:
+                    raise
+                delay = self.base_delay * (2 ** attempt)
+                with self._lock:
+                    self.stats['retries'] += 1
+                logger.warning(f"Attempt {attempt + 1} failed: {e}. Retrying in {delay}s...")
+                time.sleep(delay)
+    
+    def run(self, items: Dict[str, Any], func: Callable[[Any], Any]) -> Dict[str, Any]:
+        """
+        Results of ``func`` for each item, keyed like ``items``, skipping keys
+        already in the checkpoint. Records that still fail after retries are
+        left out (see stats['failed']). The checkpoint is removed once every
+        record has completed.
+        """
+        start = time.time()
+        checkpoint = Checkpoint(self.checkpoint_path)
+        pending = [key for key in items if key not in checkpoint.results]
+        self.stats = {
+            'records': len(items),
+            'resumed': len(items) - len(pending),
+            'completed': 0,
+            'failed': [],
+            'retries': 0,
+            'rate_limited_seconds': 0.0,
+        }
+        
+        since_checkpoint = 0
+        batch_size = self.batch_size or len(pending) or 1
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for offset in range(0, len(pending), batch_size):
+                futures = {executor.submit(self._call, func, items[key]): key
+                           for key in pending[offset:offset + batch_size]}
+                for future in as_completed(futures):
+                    key = futures[future]
+                    try:
+                        checkpoint.results[key] = future.result()
+                        self.stats['completed'] += 1
+                        since_checkpoint += 1
+                    except Exception as e:
+                        logger.error(f"Extraction of {key} failed: {e}")
+                        self.stats['failed'].append(key)
+                    if self.checkpoint_interval and since_checkpoint >= self.checkpoint_interval:
+                        checkpoint.save()
+                        since_checkpoint = 0
+        
+        if self.stats['failed']:
+            checkpoint.save()
+        else:
+            checkpoint.clear()
+        
+        self.stats['duration_seconds'] = round(time.time() - start, 4)
+        logger.info(f"Extraction finished: {self.stats['completed']} completed, {self.stats['resumed']} resumed, "
+                    f"{len(self.stats['failed'])} failed in {self.stats['duration_seconds']}s")
+        return {key: checkpoint.results[key] for key in items if key in checkpoint.results}
@@ -0,0 +1,55 @@
+-- Duty Rates Schema (SQLite)
+-- Structured duty rates compiled from the published rate text (see utils/duty_rates.py)
+-- Same columns as duty_rates in enhanced_schema_v2.sql, plus the compiled form
+-- Safe to re-run: all objects are created only if missing
+
+-- =====================================
+-- DUTY RATES
+-- =====================================
+
+CREATE TABLE IF NOT EXISTS duty_rates (
+    rate_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    country_id INTEGER,                      -- countries.country_id where that table exists
+    classification_type TEXT NOT NULL CHECK (classification_type IN ('subheading', 'national_8', 'national_10', 'national_12')),
+    classification_id INTEGER NOT NULL,      -- national_lines.line_id for national lines
+    classification_code TEXT NOT NULL,       -- Digits only: "01012100"
+    rate_type TEXT NOT NULL CHECK (rate_type IN ('MFN', 'general', 'preferential', 'GSP', 'anti_dumping', 'countervailing', 'column_2')),
+    agreement_id INTEGER,
+    ad_valorem_rate REAL,                    -- Percentage rate
+    specific_rate TEXT,                      -- e.g., "0.044/kg" (dollars per unit)
+    compound_rate TEXT,                      -- e.g., "4.4¢/kg + 6.8%"
+    rate_description TEXT,                   -- Rate as published
+    minimum_rate REAL,
+    maximum_rate REAL,
+    quota_quantity REAL,
+    quota_unit TEXT,
+    quota_period TEXT,
+    effective_date DATE NOT NULL,
+    expiry_date DATE,                        -- NULL while the rate is current
+    notes TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    rate_kind TEXT CHECK (rate_kind IN ('free', 'ad_valorem', 'specific', 'compound', 'reference')),
+    specific_amount REAL,                    -- Dollars per specific_unit of the first specific component
+    specific_unit TEXT,                      -- Canonical unit: "kg", "liter", "each", "doz."
+    rate_components TEXT,                    -- Compiled rate as JSON (CompiledRate.to_json)
+    program_codes TEXT                       -- JSON array of special program indicators, e.g. ["A+", "AU"]
+);
+
+-- One row per special program indicator listed for a rate, e.g. "Free (A+,AU,KR)"
+-- gives rows for A+, AU and KR, so eligibility is an indexed lookup
+CREATE TABLE IF NOT EXISTS duty_rate_programs (
+    rate_id INTEGER NOT NULL REFERENCES duty_rates(rate_id),
+    classification_code TEXT NOT NULL,       -- Same as duty_rates.classification_code
+    program_code TEXT NOT NULL,              -- As published: "A+", "E*", "KR"
+    program TEXT NOT NULL,                   -- Indicator without its qualifier, for grouping only: "A", "E", "KR"
+    is_free BOOLEAN NOT NULL DEFAULT 0,      -- The program rate is Free
+    PRIMARY KEY (rate_id, program_code)
+);
+
+-- =====================================
+-- INDEXES
+-- =====================================
+
+CREATE INDEX IF NOT EXISTS idx_duty_rates_code_type ON duty_rates(classification_code, rate_type);
+CREATE INDEX IF NOT EXISTS idx_duty_rate_programs_program ON duty_rate_programs(program, classification_code);
+CREATE INDEX IF NOT EXISTS idx_duty_rate_programs_code ON duty_rate_programs(classification_code);
@@ -267,7 +267,7 @@ CREATE TABLE duty_rates (
     classification_type TEXT NOT NULL CHECK (classification_type IN ('subheading', 'national_8', 'national_10', 'national_12')),
     classification_id INTEGER NOT NULL, -- Reference to appropriate table
     classification_code TEXT NOT NULL, -- The actual code for quick lookup
-    rate_type TEXT NOT NULL CHECK (rate_type IN ('MFN', 'general', 'preferential', 'GSP', 'anti_dumping', 'countervailing')),
+    rate_type TEXT NOT NULL CHECK (rate_type IN ('MFN', 'general', 'preferential', 'GSP', 'anti_dumping', 'countervailing', 'column_2')),
     agreement_id INTEGER REFERENCES trade_agreements(agreement_id),
     ad_valorem_rate REAL, -- Percentage rate
     specific_rate TEXT, -- e.g., "$0.05/kg"  
@@ -281,7 +281,13 @@ CREATE TABLE duty_rates (
     effective_date DATE NOT NULL,
     expiry_date DATE,
     notes TEXT,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- Compiled form of the rate (see utils/duty_rates.py)
+    rate_kind TEXT, -- 'free', 'ad_valorem', 'specific', 'compound', 'reference'
+    specific_amount REAL, -- Dollars per specific_unit
+    specific_unit TEXT,
+    rate_components TEXT, -- JSON, CompiledRate.to_json()
+    program_codes TEXT -- JSON array of special program indicators
 );
 
 -- Import/export restrictions and requirements
@@ -316,22 +322,8 @@ CREATE TABLE trade_restrictions (
 -- ENHANCED SEARCH AND INDEXING
 -- =====================================
 
--- Full-text search index (enhanced)
-DROP TABLE IF EXISTS search_index;
-CREATE VIRTUAL TABLE search_index USING fts5(
-    record_type,
-    record_id,
-    code,
-    title_en,
-    description,
-    keywords,
-    alternative_names,
-    notes_text,
-    product_names,
-    examples_text,
-    content='',
-    contentless_delete=1
-);
+-- Full-text search index (enhanced): search_documents + search_index are
+-- defined in search_index.sql and installed by SearchIndex.ensure_schema()
 
 -- Search suggestions and auto-complete
 CREATE TABLE search_suggestions (
@@ -552,32 +544,6 @@ BEGIN
     UPDATE classification_notes SET updated_at = CURRENT_TIMESTAMP WHERE note_id = NEW.note_id;
 END;
 
--- Maintain search index
-CREATE TRIGGER tr_search_index_products_insert
-AFTER INSERT ON products
-BEGIN
-    INSERT INTO search_index (record_type, record_id, code, title_en, description, product_names)
-    SELECT 'product', NEW.product_id, 
-           (SELECT sh.subheading_code FROM subheadings sh WHERE sh.subheading_id = NEW.subheading_id),
-           NEW.product_name, NEW.description, NEW.product_name || ' ' || COALESCE(NEW.common_name, '');
-END;
-
-CREATE TRIGGER tr_search_index_products_update
-AFTER UPDATE ON products
-BEGIN
-    UPDATE search_index 
-    SET title_en = NEW.product_name,
-        description = NEW.description,
-        product_names = NEW.product_name || ' ' || COALESCE(NEW.common_name, '')
-    WHERE record_type = 'product' AND record_id = NEW.product_id;
-END;
-
-CREATE TRIGGER tr_search_index_products_delete
-AFTER DELETE ON products
-BEGIN
-    DELETE FROM search_index WHERE record_type = 'product' AND record_id = OLD.product_id;
-END;
-
 -- Log changes for audit trail
 CREATE TRIGGER tr_products_change_log
 AFTER UPDATE ON products
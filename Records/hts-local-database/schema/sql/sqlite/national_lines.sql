@@ -0,0 +1,71 @@
+-- National Tariff Lines Schema (SQLite)
+-- 8-digit tariff lines and 10-digit statistical lines from the USITC chapter files
+-- Safe to re-run: all objects are created only if missing
+
+PRAGMA foreign_keys = ON;
+
+-- =====================================
+-- NATIONAL TARIFF LINES
+-- =====================================
+
+-- Unnumbered "superior" lines that group the numbered lines below them
+-- (e.g. "Horses:" between heading 0101 and subheading 0101.21.00)
+CREATE TABLE IF NOT EXISTS superior_lines (
+    superior_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chapter_code TEXT NOT NULL,
+    parent_code TEXT,                        -- Nearest numbered ancestor (4, 6 or 8 digits)
+    parent_superior_id INTEGER REFERENCES superior_lines(superior_id),
+    indent INTEGER NOT NULL,
+    description TEXT NOT NULL,
+    source_file TEXT,
+    source_row INTEGER NOT NULL,             -- Position of the line in the chapter file
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (chapter_code, source_row)
+);
+
+-- 8-digit tariff lines and 10-digit statistical reporting lines
+CREATE TABLE IF NOT EXISTS national_lines (
+    line_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    hts_code TEXT NOT NULL UNIQUE,           -- Digits only: "01012100", "0101210010"
+    hts_display TEXT NOT NULL,               -- As published: "0101.21.00.10"
+    code_level INTEGER NOT NULL CHECK (code_level IN (8, 10)),
+    chapter_code TEXT NOT NULL,              -- "01"
+    heading_code TEXT NOT NULL,              -- "0101"
+    subheading_code TEXT NOT NULL,           -- "010121", matches subheadings.subheading_code
+    parent_code TEXT,                        -- Nearest numbered ancestor (4, 6 or 8 digits)
+    superior_id INTEGER REFERENCES superior_lines(superior_id), -- Grouping line below the parent
+    indent INTEGER NOT NULL,
+    description TEXT NOT NULL,
+    full_description TEXT,                   -- Ancestor descriptions joined with the line's own
+    units TEXT,                              -- JSON array of units of quantity, e.g. ["No."]
+    general_rate TEXT,                       -- Column 1 General rate as published
+    special_rate TEXT,                       -- Column 1 Special rate as published
+    other_rate TEXT,                         -- Column 2 rate as published
+    rates_inherited BOOLEAN DEFAULT 0,       -- Rates copied from the 8-digit parent line
+    footnotes TEXT,                          -- JSON array of footnote objects
+    quota_quantity TEXT,
+    additional_duties TEXT,
+    source_file TEXT,
+    source_row INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- =====================================
+-- INDEXES
+-- =====================================
+
+CREATE INDEX IF NOT EXISTS idx_superior_lines_chapter ON superior_lines(chapter_code);
+CREATE INDEX IF NOT EXISTS idx_national_lines_chapter ON national_lines(chapter_code);
+CREATE INDEX IF NOT EXISTS idx_national_lines_subheading ON national_lines(subheading_code);
+CREATE INDEX IF NOT EXISTS idx_national_lines_parent ON national_lines(parent_code);
+
+-- =====================================
+-- TRIGGERS
+-- =====================================
+
+CREATE TRIGGER IF NOT EXISTS tr_national_lines_updated_at
+AFTER UPDATE ON national_lines
+BEGIN
+    UPDATE national_lines SET updated_at = CURRENT_TIMESTAMP WHERE line_id = NEW.line_id;
+END;
@@ -0,0 +1,392 @@
+-- Full-Text Search Schema (SQLite)
+-- search_documents holds one row per searchable record and is kept current by
+-- triggers on the source tables; search_index is an external-content FTS5 index
+-- over it, so a change to one record touches exactly one FTS row. Records
+-- without a title (title_en, or product_name for products) are not indexed.
+-- Safe to re-run: all objects are created only if missing
+
+PRAGMA foreign_keys = ON;
+
+-- =====================================
+-- SEARCH DOCUMENTS
+-- =====================================
+
+CREATE TABLE IF NOT EXISTS search_documents (
+    doc_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    record_type TEXT NOT NULL,               -- section, chapter, heading, subheading, product, national_line
+    record_id INTEGER NOT NULL,              -- Primary key in the source table
+    code TEXT,
+    title_en TEXT,
+    description TEXT,
+    keywords TEXT,
+    alternative_names TEXT,                  -- alternative_names joined with spaces
+    notes_text TEXT,                         -- classification_notes titles and text
+    product_names TEXT,                      -- Product, common and scientific names
+    examples_text TEXT,                      -- classification_examples titles and descriptions
+    UNIQUE (record_type, record_id)
+);
+
+-- Same column order as the original contentless index, so existing MATCH
+-- queries and column filters keep working. Unlike that index it stems words
+-- (porter), so "bottles" also matches "bottle" and "bottled"
+CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+    record_type UNINDEXED,
+    record_id UNINDEXED,
+    code,
+    title_en,
+    description,
+    keywords,
+    alternative_names,
+    notes_text,
+    product_names,
+    examples_text,
+    content='search_documents',
+    content_rowid='doc_id',
+    tokenize='porter unicode61 remove_diacritics 2'
+);
+
+-- Trigram index over the short title and name columns, for typo-tolerant
+-- lookup ("alumnium foil", "polyethylen"); long descriptions are left out to
+-- keep it small and its candidate sets tight
+CREATE VIRTUAL TABLE IF NOT EXISTS search_trigram USING fts5(
+    title_en,
+    alternative_names,
+    product_names,
+    content='search_documents',
+    content_rowid='doc_id',
+    tokenize='trigram'
+);
+
+-- =====================================
+-- FTS SYNCHRONISATION
+-- =====================================
+
+CREATE TRIGGER IF NOT EXISTS tr_search_documents_insert
+AFTER INSERT ON search_documents
+BEGIN
+    INSERT INTO search_index (rowid, record_type, record_id, code, title_en, description, keywords,
+                              alternative_names, notes_text, product_names, examples_text)
+    VALUES (NEW.doc_id, NEW.record_type, NEW.record_id, NEW.code, NEW.title_en, NEW.description, NEW.keywords,
+            NEW.alternative_names, NEW.notes_text, NEW.product_names, NEW.examples_text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_search_documents_delete
+AFTER DELETE ON search_documents
+BEGIN
+    INSERT INTO search_index (search_index, rowid, record_type, record_id, code, title_en, description, keywords,
+                              alternative_names, notes_text, product_names, examples_text)
+    VALUES ('delete', OLD.doc_id, OLD.record_type, OLD.record_id, OLD.code, OLD.title_en, OLD.description, OLD.keywords,
+            OLD.alternative_names, OLD.notes_text, OLD.product_names, OLD.examples_text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_search_documents_update
+AFTER UPDATE ON search_documents
+BEGIN
+    INSERT INTO search_index (search_index, rowid, record_type, record_id, code, title_en, description, keywords,
+                              alternative_names, notes_text, product_names, examples_text)
+    VALUES ('delete', OLD.doc_id, OLD.record_type, OLD.record_id, OLD.code, OLD.title_en, OLD.description, OLD.keywords,
+            OLD.alternative_names, OLD.notes_text, OLD.product_names, OLD.examples_text);
+    INSERT INTO search_index (rowid, record_type, record_id, code, title_en, description, keywords,
+                              alternative_names, notes_text, product_names, examples_text)
+    VALUES (NEW.doc_id, NEW.record_type, NEW.record_id, NEW.code, NEW.title_en, NEW.description, NEW.keywords,
+            NEW.alternative_names, NEW.notes_text, NEW.product_names, NEW.examples_text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_search_documents_trigram_insert
+AFTER INSERT ON search_documents
+BEGIN
+    INSERT INTO search_trigram (rowid, title_en, alternative_names, product_names)
+    VALUES (NEW.doc_id, NEW.title_en, NEW.alternative_names, NEW.product_names);
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_search_documents_trigram_delete
+AFTER DELETE ON search_documents
+BEGIN
+    INSERT INTO search_trigram (search_trigram, rowid, title_en, alternative_names, product_names)
+    VALUES ('delete', OLD.doc_id, OLD.title_en, OLD.alternative_names, OLD.product_names);
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_search_documents_trigram_update
+AFTER UPDATE OF title_en, alternative_names, product_names ON search_documents
+BEGIN
+    INSERT INTO search_trigram (search_trigram, rowid, title_en, alternative_names, product_names)
+    VALUES ('delete', OLD.doc_id, OLD.title_en, OLD.alternative_names, OLD.product_names);
+    INSERT INTO search_trigram (rowid, title_en, alternative_names, product_names)
+    VALUES (NEW.doc_id, NEW.title_en, NEW.alternative_names, NEW.product_names);
+END;
+
+-- =====================================
+-- CLASSIFICATION HIERARCHY
+-- =====================================
+
+CREATE TRIGGER IF NOT EXISTS tr_search_sections_insert
+AFTER INSERT ON sections
+WHEN NEW.title_en IS NOT NULL
+BEGIN
+    INSERT INTO search_documents (record_type, record_id, code, title_en, description)
+    VALUES ('section', NEW.section_id, NEW.section_number, NEW.title_en, NEW.description)
+    ON CONFLICT (record_type, record_id) DO UPDATE SET
+        code = excluded.code, title_en = excluded.title_en, description = excluded.description;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_search_sections_update
+AFTER UPDATE OF section_number, title_en, description ON sections
+BEGIN
+    DELETE FROM search_documents
+    WHERE record_type = 'section' AND record_id = NEW.section_id AND NEW.title_en IS NULL;
+    INSERT INTO search_documents (record_type, record_id, code, title_en, description, alternative_names, notes_text)
+    SELECT 'section', NEW.section_id, NEW.section_number, NEW.title_en, NEW.description,
+           (SELECT group_concat(alternative_name, ' ') FROM alternative_names
+                WHERE reference_type = 'section' AND reference_id = NEW.section_id),
+           (SELECT group_concat(COALESCE(title || ' ', '') || note_text, ' ') FROM classification_notes
+                WHERE reference_type = 'section' AND reference_id = NEW.section_id)
+    WHERE NEW.title_en IS NOT NULL
+    ON CONFLICT (record_type, record_id) DO UPDATE SET
+        code = excluded.code, title_en = excluded.title_en, description = excluded.description;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_search_sections_delete
+AFTER DELETE ON sections
+BEGIN
+    DELETE FROM search_documents WHERE record_type = 'section' AND record_id = OLD.section_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_search_chapters_insert
+AFTER INSERT ON chapters
+WHEN NEW.title_en IS NOT NULL
+BEGIN
+    INSERT INTO search_documents (record_type, record_id, code, title_en, description)
+    VALUES ('chapter', NEW.chapter_id, NEW.chapter_code, NEW.title_en, NEW.description)
+    ON CONFLICT (record_type, record_id) DO UPDATE SET
+        code = excluded.code, title_en = excluded.title_en, description = excluded.description;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_search_chapters_update
+AFTER UPDATE OF chapter_code, title_en, description ON chapters
+BEGIN
+    DELETE FROM search_documents
+    WHERE record_type = 'chapter' AND record_id = NEW.chapter_id AND NEW.title_en IS NULL;
+    INSERT INTO search_documents (record_type, record_id, code, title_en, description, alternative_names, notes_text)
+    SELECT 'chapter', NEW.chapter_id, NEW.chapter_code, NEW.title_en, NEW.description,
+           (SELECT group_concat(alternative_name, ' ') FROM alternative_names
+                WHERE reference_type = 'chapter' AND reference_id = NEW.chapter_id),
+           (SELECT group_concat(COALESCE(title || ' ', '') || note_text, ' ') FROM classification_notes
+                WHERE reference_type = 'chapter' AND reference_id = NEW.chapter_id)
+    WHERE NEW.title_en IS NOT NULL
+    ON CONFLICT (record_type, record_id) DO UPDATE SET
+        code = excluded.code, title_en = excluded.title_en, description = excluded.description;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_search_chapters_delete
+AFTER DELETE ON chapters
+BEGIN
+    DELETE FROM search_documents WHERE record_type = 'chapter' AND record_id = OLD.chapter_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_search_headings_insert
+AFTER INSERT ON headings
+WHEN NEW.title_en IS NOT NULL
+BEGIN
+    INSERT INTO search_documents (record_type, record_id, code, title_en, description)
+    VALUES ('heading', NEW.heading_id, NEW.heading_code, NEW.title_en, NEW.description)
+    ON CONFLICT (record_type, record_id) DO UPDATE SET
+        code = excluded.code, title_en = excluded.title_en, description = excluded.description;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_search_headings_update
+AFTER UPDATE OF heading_code, title_en, description ON headings
+BEGIN
+    DELETE FROM search_documents
+    WHERE record_type = 'heading' AND record_id = NEW.heading_id AND NEW.title_en IS NULL;
+    INSERT INTO search_documents (record_type, record_id, code, title_en, description, alternative_names, notes_text)
+    SELECT 'heading', NEW.heading_id, NEW.heading_code, NEW.title_en, NEW.description,
+           (SELECT group_concat(alternative_name, ' ') FROM alternative_names
+                WHERE reference_type = 'heading' AND reference_id = NEW.heading_id),
+           (SELECT group_concat(COALESCE(title || ' ', '') || note_text, ' ') FROM classification_notes
+                WHERE reference_type = 'heading' AND reference_id = NEW.heading_id)
+    WHERE NEW.title_en IS NOT NULL
+    ON CONFLICT (record_type, record_id) DO UPDATE SET
+        code = excluded.code, title_en = excluded.title_en, description = excluded.description;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_search_headings_delete
+AFTER DELETE ON headings
+BEGIN
+    DELETE FROM search_documents WHERE record_type = 'heading' AND record_id = OLD.heading_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_search_subheadings_insert
+AFTER INSERT ON subheadings
+WHEN NEW.title_en IS NOT NULL
+BEGIN
+    INSERT INTO search_documents (record_type, record_id, code, title_en, description)
+    VALUES ('subheading', NEW.subheading_id, NEW.subheading_code, NEW.title_en, NEW.description)
+    ON CONFLICT (record_type, record_id) DO UPDATE SET
+        code = excluded.code, title_en = excluded.title_en, description = excluded.description;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_search_subheadings_update
+AFTER UPDATE OF subheading_code, title_en, description ON subheadings
+BEGIN
+    DELETE FROM search_documents
+    WHERE record_type = 'subheading' AND record_id = NEW.subheading_id AND NEW.title_en IS NULL;
+    INSERT INTO search_documents (record_type, record_id, code, title_en, description, alternative_names, notes_text, examples_text)
+    SELECT 'subheading', NEW.subheading_id, NEW.subheading_code, NEW.title_en, NEW.description,
+           (SELECT group_concat(alternative_name, ' ') FROM alternative_names
+                WHERE reference_type = 'subheading' AND reference_id = NEW.subheading_id),
+           (SELECT group_concat(COALESCE(title || ' ', '') || note_text, ' ') FROM classification_notes
+                WHERE reference_type = 'subheading' AND reference_id = NEW.subheading_id),
+           (SELECT group_concat(title || ' ' || description, ' ') FROM classification_examples
+                WHERE subheading_id = NEW.subheading_id)
+    WHERE NEW.title_en IS NOT NULL
+    ON CONFLICT (record_type, record_id) DO UPDATE SET
+        code = excluded.code, title_en = excluded.title_en, description = excluded.description;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_search_subheadings_delete
+AFTER DELETE ON subheadings
+BEGIN
+    DELETE FROM search_documents WHERE record_type = 'subheading' AND record_id = OLD.subheading_id;
+END;
+
+-- =====================================
+-- PRODUCTS
+-- =====================================
+
+CREATE TRIGGER IF NOT EXISTS tr_search_products_insert
+AFTER INSERT ON products
+WHEN NEW.product_name IS NOT NULL
+BEGIN
+    INSERT INTO search_documents (record_type, record_id, code, title_en, description, product_names)
+    VALUES ('product', NEW.product_id,
+            (SELECT sh.subheading_code FROM subheadings sh WHERE sh.subheading_id = NEW.subheading_id),
+            NEW.product_name, NEW.description,
+            NEW.product_name || ' ' || COALESCE(NEW.common_name, '') || ' ' || COALESCE(NEW.scientific_name, ''))
+    ON CONFLICT (record_type, record_id) DO UPDATE SET
+        code = excluded.code, title_en = excluded.title_en, description = excluded.description,
+        product_names = excluded.product_names;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_search_products_update
+AFTER UPDATE OF product_name, common_name, scientific_name, description, subheading_id ON products
+BEGIN
+    DELETE FROM search_documents
+    WHERE record_type = 'product' AND record_id = NEW.product_id AND NEW.product_name IS NULL;
+    INSERT INTO search_documents (record_type, record_id, code, title_en, description, alternative_names,
+                                  notes_text, product_names)
+    SELECT 'product', NEW.product_id,
+           (SELECT sh.subheading_code FROM subheadings sh WHERE sh.subheading_id = NEW.subheading_id),
+           NEW.product_name, NEW.description,
+           (SELECT group_concat(alternative_name, ' ') FROM alternative_names
+                WHERE reference_type = 'product' AND reference_id = NEW.product_id),
+           (SELECT group_concat(COALESCE(title || ' ', '') || note_text, ' ') FROM classification_notes
+                WHERE reference_type = 'product' AND reference_id = NEW.product_id),
+           NEW.product_name || ' ' || COALESCE(NEW.common_name, '') || ' ' || COALESCE(NEW.scientific_name, '')
+    WHERE NEW.product_name IS NOT NULL
+    ON CONFLICT (record_type, record_id) DO UPDATE SET
+        code = excluded.code, title_en = excluded.title_en, description = excluded.description,
+        product_names = excluded.product_names;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_search_products_delete
+AFTER DELETE ON products
+BEGIN
+    DELETE FROM search_documents WHERE record_type = 'product' AND record_id = OLD.product_id;
+END;
+
+-- =====================================
+-- ALTERNATIVE NAMES, NOTES AND EXAMPLES
+-- =====================================
+
+CREATE TRIGGER IF NOT EXISTS tr_search_alternative_names_insert
+AFTER INSERT ON alternative_names
+BEGIN
+    UPDATE search_documents
+    SET alternative_names = (SELECT group_concat(alternative_name, ' ') FROM alternative_names
+                             WHERE reference_type = NEW.reference_type AND reference_id = NEW.reference_id)
+    WHERE record_type = NEW.reference_type AND record_id = NEW.reference_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_search_alternative_names_update
+AFTER UPDATE OF reference_type, reference_id, alternative_name ON alternative_names
+BEGIN
+    UPDATE search_documents
+    SET alternative_names = (SELECT group_concat(alternative_name, ' ') FROM alternative_names
+                             WHERE reference_type = OLD.reference_type AND reference_id = OLD.reference_id)
+    WHERE record_type = OLD.reference_type AND record_id = OLD.reference_id;
+    UPDATE search_documents
+    SET alternative_names = (SELECT group_concat(alternative_name, ' ') FROM alternative_names
+                             WHERE reference_type = NEW.reference_type AND reference_id = NEW.reference_id)
+    WHERE record_type = NEW.reference_type AND record_id = NEW.reference_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_search_alternative_names_delete
+AFTER DELETE ON alternative_names
+BEGIN
+    UPDATE search_documents
+    SET alternative_names = (SELECT group_concat(alternative_name, ' ') FROM alternative_names
+                             WHERE reference_type = OLD.reference_type AND reference_id = OLD.reference_id)
+    WHERE record_type = OLD.reference_type AND record_id = OLD.reference_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_search_classification_notes_insert
+AFTER INSERT ON classification_notes
+BEGIN
+    UPDATE search_documents
+    SET notes_text = (SELECT group_concat(COALESCE(title || ' ', '') || note_text, ' ') FROM classification_notes
+                      WHERE reference_type = NEW.reference_type AND reference_id = NEW.reference_id)
+    WHERE record_type = NEW.reference_type AND record_id = NEW.reference_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_search_classification_notes_update
+AFTER UPDATE OF reference_type, reference_id, title, note_text ON classification_notes
+BEGIN
+    UPDATE search_documents
+    SET notes_text = (SELECT group_concat(COALESCE(title || ' ', '') || note_text, ' ') FROM classification_notes
+                      WHERE reference_type = OLD.reference_type AND reference_id = OLD.reference_id)
+    WHERE record_type = OLD.reference_type AND record_id = OLD.reference_id;
+    UPDATE search_documents
+    SET notes_text = (SELECT group_concat(COALESCE(title || ' ', '') || note_text, ' ') FROM classification_notes
+                      WHERE reference_type = NEW.reference_type AND reference_id = NEW.reference_id)
+    WHERE record_type = NEW.reference_type AND record_id = NEW.reference_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_search_classification_notes_delete
+AFTER DELETE ON classification_notes
+BEGIN
+    UPDATE search_documents
+    SET notes_text = (SELECT group_concat(COALESCE(title || ' ', '') || note_text, ' ') FROM classification_notes
+                      WHERE reference_type = OLD.reference_type AND reference_id = OLD.reference_id)
+    WHERE record_type = OLD.reference_type AND record_id = OLD.reference_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_search_classification_examples_insert
+AFTER INSERT ON classification_examples
+BEGIN
+    UPDATE search_documents
+    SET examples_text = (SELECT group_concat(title || ' ' || description, ' ') FROM classification_examples
+                         WHERE subheading_id = NEW.subheading_id)
+    WHERE record_type = 'subheading' AND record_id = NEW.subheading_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_search_classification_examples_update
+AFTER UPDATE OF subheading_id, title, description ON classification_examples
+BEGIN
+    UPDATE search_documents
+    SET examples_text = (SELECT group_concat(title || ' ' || description, ' ') FROM classification_examples
+                         WHERE subheading_id = OLD.subheading_id)
+    WHERE record_type = 'subheading' AND record_id = OLD.subheading_id;
+    UPDATE search_documents
+    SET examples_text = (SELECT group_concat(title || ' ' || description, ' ') FROM classification_examples
+                         WHERE subheading_id = NEW.subheading_id)
+    WHERE record_type = 'subheading' AND record_id = NEW.subheading_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_search_classification_examples_delete
+AFTER DELETE ON classification_examples
+BEGIN
+    UPDATE search_documents
+    SET examples_text = (SELECT group_concat(title || ' ' || description, ' ') FROM classification_examples
+                         WHERE subheading_id = OLD.subheading_id)
+    WHERE record_type = 'subheading' AND record_id = OLD.subheading_id;
+END;
@@ -0,0 +1,27 @@
+-- Full-Text Search: national tariff lines (SQLite)
+-- Applied by SearchIndex.ensure_schema() once both search_index.sql and
+-- national_lines.sql are installed
+-- Safe to re-run: all objects are created only if missing
+
+CREATE TRIGGER IF NOT EXISTS tr_search_national_lines_insert
+AFTER INSERT ON national_lines
+BEGIN
+    INSERT INTO search_documents (record_type, record_id, code, title_en, description)
+    VALUES ('national_line', NEW.line_id, NEW.hts_code, NEW.description, NEW.full_description)
+    ON CONFLICT (record_type, record_id) DO UPDATE SET
+        code = excluded.code, title_en = excluded.title_en, description = excluded.description;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_search_national_lines_update
+AFTER UPDATE OF hts_code, description, full_description ON national_lines
+BEGIN
+    UPDATE search_documents
+    SET code = NEW.hts_code, title_en = NEW.description, description = NEW.full_description
+    WHERE record_type = 'national_line' AND record_id = NEW.line_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tr_search_national_lines_delete
+AFTER DELETE ON national_lines
+BEGIN
+    DELETE FROM search_documents WHERE record_type = 'national_line' AND record_id = OLD.line_id;
+END;
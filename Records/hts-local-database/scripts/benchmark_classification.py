@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Compare classification throughput of ProductManager.classify_batch() with
+calling classify_product_by_description() once per line.
+
+Descriptions are read one per line from a text file, or sampled from the
+national line and product descriptions already in the database.
+"""
+
+import logging
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.database import HTSDatabase
+from utils.product_manager import ProductManager
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+USAGE = "Usage: python benchmark_classification.py [descriptions.txt] [--lines N] [--batch-size N]"
+
+
+def sample_descriptions(conn, count: int):
+    """Invoice-like descriptions drawn from national lines and products."""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT description FROM (
+            SELECT description FROM national_lines
+            UNION ALL
+            SELECT product_name || ' ' || COALESCE(description, '') FROM products
+        )
+        ORDER BY random()
+        LIMIT ?
+    """, (count,))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def option(name: str, default: int) -> int:
+    """Integer value following a --flag on the command line."""
+    if name in sys.argv:
+        return int(sys.argv[sys.argv.index(name) + 1])
+    return default
+
+
+def main():
+    """Run the single-item and batch classification paths over the same lines."""
+    if "--help" in sys.argv:
+        print(USAGE)
+        return True
+    
+    line_count = option("--lines", 2000)
+    batch_size = option("--batch-size", 500)
+    
+    db = HTSDatabase()
+    
+    try:
+        conn = db.connect()
+        manager = ProductManager(conn)
+        
+        positional = [arg for i, arg in enumerate(sys.argv[1:], 1)
+                      if not arg.startswith("--") and not sys.argv[i - 1].startswith("--")]
+        if positional:
+            with open(positional[0], encoding="utf-8") as f:
+                descriptions = [line.strip() for line in f if line.strip()][:line_count]
+        else:
+            descriptions = sample_descriptions(conn, line_count)
+        
+        if not descriptions:
+            logger.error("❌ No descriptions to classify")
+            return False
+        logger.info(f"🚀 Classifying {len(descriptions):,} descriptions...")
+        
+        start = time.time()
+        single = [manager.classify_product_by_description(description) for description in descriptions]
+        single_seconds = time.time() - start
+        
+        start = time.time()
+        batched = []
+        for offset in range(0, len(descriptions), batch_size):
+            batched.extend(manager.classify_batch(descriptions[offset:offset + batch_size]))
+        batch_seconds = time.time() - start
+        
+        # How often both paths put the same subheading first
+        top_agreement = sum(
+            1 for one, many in zip(single, batched)
+            if (one[0]['subheading_code'] if one else None) == (many[0]['subheading_code'] if many else None)
+        )
+        
+        logger.info("📊 Classification benchmark")
+        for label, seconds in (("Single", single_seconds), (f"Batch ({batch_size})", batch_seconds)):
+            rate = len(descriptions) / seconds if seconds else float('inf')
+            logger.info(f"   • {label + ':':<14} {seconds:8.2f}s  {rate:10,.0f} lines/s  {rate * 3600:14,.0f} lines/h")
+        logger.info(f"   • Speed-up:      {single_seconds / batch_seconds if batch_seconds else float('inf'):.1f}x")
+        logger.info(f"   • Same top hit:  {top_agreement / len(descriptions):.1%}")
+        return True
+    
+    except Exception as e:
+        logger.error(f"❌ Error: {e}")
+        return False
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Compare serial extract_with_ai() calls with ExtractionOrchestrator.run()
+using a stub agent whose call_ai() sleeps for a fixed latency (and fails
+now and then), so no AI service is needed.
+"""
+
+import logging
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from agents.base_agent import BaseExtractorAgent
+from agents.orchestrator import ExtractionOrchestrator
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+USAGE = ("Usage: python benchmark_extraction.py [--records N] [--distinct N] [--latency-ms MS] "
+         "[--workers N] [--rate PER_SECOND] [--failure-rate P]")
+
+
+class StubExtractorAgent(BaseExtractorAgent):
+    """Agent whose AI call only waits ``latency`` seconds and fails with probability ``failure_rate``."""
+    
+    def __init__(self, cache_dir: str, latency: float, failure_rate: float = 0.0):
+        super().__init__(cache_dir)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self._random = random.Random(0)
+    
+    def call_ai(self, prompt: str) -> dict:
+        self.calls += 1
+        time.sleep(self.latency)
+        if self._random.random() < self.failure_rate:
+            raise RuntimeError("stub AI call failed")
+        return {"status": "stub", "data": [{"prompt": prompt}], "confidence": 1.0}
+
+
+def option(name: str, default: float) -> float:
+    """Numeric value following a --flag on the command line."""
+    if name in sys.argv:
+        return float(sys.argv[sys.argv.index(name) + 1])
+    return default
+
+
+def main():
+    """Run the serial loop and the orchestrator over the same prompts."""
+    if "--help" in sys.argv:
+        print(USAGE)
+        return True
+    
+    records = int(option("--records", 200))
+    distinct = int(option("--distinct", records))
+    latency = option("--latency-ms", 50) / 1000
+    workers = int(option("--workers", 8))
+    rate = option("--rate", 0) or None
+    failure_rate = option("--failure-rate", 0.0)
+    # With fewer distinct prompts than records, repeated prompts are served
+    # from the cache or coalesced with the call already in flight
+    prompts = {f"record-{i:05d}": f"Extract record {i % distinct}" for i in range(records)}
+    
+    with tempfile.TemporaryDirectory() as work_dir:
+        logger.info(f"🚀 Extracting {records:,} records at {latency * 1000:.0f} ms per call...")
+        
+        agent = StubExtractorAgent(f"{work_dir}/serial", latency)
+        start = time.time()
+        for prompt in prompts.values():
+            agent.retry_with_backoff(lambda: agent.extract_with_ai(prompt), base_delay=0.01)
+        serial_seconds = time.time() - start
+        serial_calls = agent.calls
+        
+        agent = StubExtractorAgent(f"{work_dir}/concurrent", latency, failure_rate)
+        orchestrator = ExtractionOrchestrator(
+            max_workers=workers, requests_per_second=rate, batch_size=None,
+            checkpoint_path=f"{work_dir}/checkpoint.json", checkpoint_interval=50, base_delay=0.01
+        )
+        start = time.time()
+        results = orchestrator.run(prompts, agent.extract_with_ai)
+        concurrent_seconds = time.time() - start
+        concurrent_calls = agent.calls
+    
+    stats = orchestrator.stats
+    logger.info("📊 Extraction benchmark")
+    for label, seconds in (("Serial", serial_seconds), ("Concurrent", concurrent_seconds)):
+        logger.info(f"   • {label + ':':<12} {seconds:8.2f}s  {records / seconds:10,.1f} records/s")
+    logger.info(f"   • Speed-up:    {serial_seconds / concurrent_seconds:.1f}x with {workers} workers")
+    logger.info(f"   • Completed:   {len(results):,} ({stats['retries']} retries, {len(stats['failed'])} failed, "
+                f"{stats['rate_limited_seconds']:.1f}s waiting on the rate limit)")
+    logger.info(f"   • AI calls:    {serial_calls:,} serial, {concurrent_calls:,} concurrent "
+                f"({BaseExtractorAgent.inflight.stats()['coalesced']:,} coalesced)")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
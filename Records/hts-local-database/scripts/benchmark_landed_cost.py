@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Compare LandedCostCalculator.calculate() over a whole manifest with
+looking up and evaluating the rates of each line one at a time.
+
+Manifest lines are read from a CSV file (hts_code, value, quantity, unit,
+origin) or generated from the codes that have rates in duty_rates.
+"""
+
+import csv
+import json
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.database import HTSDatabase
+from utils.duty_rates import DutyRatesLoader
+from utils.landed_cost import LandedCostCalculator
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+USAGE = "Usage: python benchmark_landed_cost.py [manifest.csv] [--lines N]"
+
+ORIGINS = ('CN', 'MX', 'CA', 'DE', 'KR', 'AU', 'VN', 'CL', 'RU', 'JP')
+
+
+def sample_manifest(conn, count: int):
+    """Random manifest lines over the national lines that have a general rate."""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT nl.hts_code, nl.units FROM national_lines nl
+        WHERE nl.code_level = 10
+        ORDER BY random()
+        LIMIT ?
+    """, (count,))
+    rows = cursor.fetchall()
+    generator = random.Random(0)
+    manifest = []
+    for i in range(count):
+        code, units = rows[i % len(rows)]
+        units = json.loads(units or '[]')
+        manifest.append({
+            'hts_code': code,
+            'value': round(generator.uniform(50, 50000), 2),
+            'quantity': round(generator.uniform(1, 2000), 1),
+            'unit': units[0] if units else None,
+            'origin': generator.choice(ORIGINS),
+        })
+    return manifest
+
+
+def read_manifest(path: str, count: int):
+    """Manifest lines from a CSV file with a header row."""
+    with open(path, encoding="utf-8", newline="") as f:
+        return [dict(row) for _, row in zip(range(count), csv.DictReader(f))]
+
+
+def option(name: str, default: int) -> int:
+    """Integer value following a --flag on the command line."""
+    if name in sys.argv:
+        return int(sys.argv[sys.argv.index(name) + 1])
+    return default
+
+
+def per_line_duty(calculator: LandedCostCalculator, loader: DutyRatesLoader, line):
+    """Duty of one line with its own rate lookups, as a caller without the batch API would."""
+    rates = {}
+    for rate_type in ('general', 'preferential', 'column_2'):
+        rows = loader.rates_for(str(line['hts_code']), rate_type)
+        rates[rate_type] = [(row['compiled'], json.loads(row['program_codes'] or '[]')) for row in rows]
+    
+    duties = []
+    for _, _, rate in calculator._candidates(rates, (line.get('origin') or '').upper() or None):
+        try:
+            duty = rate.duty(float(line['value']), float(line['quantity']), line.get('unit'))
+        except ValueError:
+            continue
+        if duty is not None:
+            duties.append(duty)
+    return min(duties) if duties else None
+
+
+def main():
+    """Run the per-line and batch paths over the same manifest."""
+    if "--help" in sys.argv:
+        print(USAGE)
+        return True
+    
+    line_count = option("--lines", 5000)
+    db = HTSDatabase()
+    
+    try:
+        conn = db.connect()
+        positional = [arg for i, arg in enumerate(sys.argv[1:], 1)
+                      if not arg.startswith("--") and not sys.argv[i - 1].startswith("--")]
+        manifest = read_manifest(positional[0], line_count) if positional else sample_manifest(conn, line_count)
+        if not manifest:
+            logger.error("❌ No manifest lines")
+            return False
+        logger.info(f"🚀 Calculating duty for {len(manifest):,} manifest lines...")
+        
+        calculator = LandedCostCalculator(conn)
+        loader = DutyRatesLoader(db)
+        
+        start = time.time()
+        single = [per_line_duty(calculator, loader, line) for line in manifest]
+        single_seconds = time.time() - start
+        
+        start = time.time()
+        batch = calculator.calculate(manifest)
+        batch_seconds = time.time() - start
+        
+        matching = sum(
+            1 for one, line in zip(single, batch['lines'])
+            if (one is None and line['duty'] is None)
+            or (one is not None and line['duty'] is not None and abs(one - line['duty']) < 0.01)
+        )
+        
+        logger.info("📊 Landed cost benchmark")
+        for label, seconds in (("Per line", single_seconds), ("Batch", batch_seconds)):
+            rate = len(manifest) / seconds if seconds else float('inf')
+            logger.info(f"   • {label + ':':<10} {seconds:8.2f}s  {rate:12,.0f} lines/s")
+        logger.info(f"   • Speed-up:  {single_seconds / batch_seconds if batch_seconds else float('inf'):.1f}x")
+        logger.info(f"   • Same duty: {matching / len(manifest):.1%}")
+        logger.info(f"   • Total duty {batch['total_duty']:,.2f} on value {batch['total_value']:,.2f} "
+                    f"({batch['unrated']:,} lines unrated)")
+        return True
+    
+    except Exception as e:
+        logger.error(f"❌ Error: {e}")
+        return False
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -18,6 +18,10 @@ sys.path.append(str(Path(__file__).parent.parent))
 from utils.database import HTSDatabase
 from utils.product_manager import ProductManager, NotesManager
 from utils.validation_engine import ValidationEngine
+from utils.national_lines import NationalLinesLoader, find_chapter_files, load_manifest_sources
+from utils.search_index import SearchIndex
+from utils.columnar_export import ColumnarExporter
+from utils.csv_export import CsvExporter, COMPRESSION_SUFFIXES
 from scripts.populate_sections import main as populate_sections_main
 from scripts.populate_chapters import main as populate_chapters_main
 from scripts.populate_headings import main as populate_headings_main
@@ -119,6 +123,44 @@ def populate_core_classification():
     return stats
 
 
+def populate_national_lines(db: HTSDatabase, incremental: bool = False):
+    """
+    Load 8-digit tariff lines and 10-digit statistical lines from the HTS chapter files.
+    
+    In incremental mode only chapter files whose hash differs from the last
+    manifest are re-parsed.
+    """
+    logger.info("\n🧾 PHASE 1.5: National Tariff Lines (8/10-digit)")
+    logger.info("-" * 50)
+    
+    stats = {}
+    
+    try:
+        chapter_files = find_chapter_files()
+        if not chapter_files:
+            logger.warning("⚠️  No HTS chapter files found, skipping national lines")
+            return stats
+        
+        previous_sources = load_manifest_sources() if incremental else None
+        loader = NationalLinesLoader(db)
+        results = loader.ingest(chapter_files, previous_sources=previous_sources)
+        
+        stats['chapters'] = results['chapters']
+        stats['skipped_chapters'] = results['skipped_chapters']
+        stats['deleted_lines'] = results['deleted_lines']
+        stats['source_files'] = results['source_files']
+        stats['lines'] = results['lines']
+        stats['superior_lines'] = results['superior_lines']
+        stats['errors'] = results['error_count']
+        logger.info(f"✅ {stats['lines']:,} national lines loaded from {stats['chapters']} chapter files "
+                    f"({stats['skipped_chapters']} unchanged)")
+        
+    except Exception as e:
+        logger.error(f"❌ National lines population failed: {e}")
+    
+    return stats
+
+
 def populate_enhanced_data(db: HTSDatabase):
     """Populate enhanced data (products, notes, examples)."""
     logger.info("\n🔬 PHASE 2: Enhanced Data Population")
@@ -271,58 +313,24 @@ def run_comprehensive_validation(db: HTSDatabase):
 
 
 def update_search_system(db: HTSDatabase):
-    """Update the enhanced search system."""
+    """
+    Update the enhanced search system.
+    
+    The index is kept current by triggers, so this only installs the schema,
+    backfills any records that predate the triggers and optimizes the index
+    after the bulk loads of the earlier phases.
+    """
     logger.info("\n🔍 PHASE 4: Search System Update")
     logger.info("-" * 50)
     
     try:
-        conn = db.connect()
-        cursor = conn.cursor()
+        search_index = SearchIndex(db)
+        sync_results = search_index.ensure_schema()
+        search_index.optimize()
         
-        # Clear and rebuild search index
-        cursor.execute("DELETE FROM search_index")
-        
-        # Add classifications to search index
-        cursor.execute("""
-            INSERT INTO search_index (record_type, record_id, code, title_en, description)
-            SELECT 'section', section_id, section_number, title_en, description
-            FROM sections WHERE title_en IS NOT NULL
-        """)
-        
-        cursor.execute("""
-            INSERT INTO search_index (record_type, record_id, code, title_en, description)
-            SELECT 'chapter', chapter_id, chapter_code, title_en, description
-            FROM chapters WHERE title_en IS NOT NULL
-        """)
-        
-        cursor.execute("""
-            INSERT INTO search_index (record_type, record_id, code, title_en, description)
-            SELECT 'heading', heading_id, heading_code, title_en, description
-            FROM headings WHERE title_en IS NOT NULL
-        """)
-        
-        cursor.execute("""
-            INSERT INTO search_index (record_type, record_id, code, title_en, description)
-            SELECT 'subheading', subheading_id, subheading_code, title_en, description
-            FROM subheadings WHERE title_en IS NOT NULL
-        """)
-        
-        # Add products to search index
-        cursor.execute("""
-            INSERT INTO search_index (record_type, record_id, code, title_en, description, product_names)
-            SELECT 'product', p.product_id, sh.subheading_code, p.product_name, p.description,
-                   p.product_name || ' ' || COALESCE(p.common_name, '') || ' ' || COALESCE(p.scientific_name, '')
-            FROM products p
-            JOIN subheadings sh ON p.subheading_id = sh.subheading_id
-            WHERE p.product_name IS NOT NULL
-        """)
-        
-        # Get count
-        cursor.execute("SELECT COUNT(*) FROM search_index")
-        search_records = cursor.fetchone()[0]
-        
-        conn.commit()
-        logger.info(f"✅ Search index updated: {search_records:,} records")
+        search_records = sync_results['documents']
+        logger.info(f"✅ Search index updated: {search_records:,} records "
+                    f"({sync_results['upserted']:,} written, {sync_results['deleted']:,} removed)")
         
         return search_records
         
@@ -331,7 +339,7 @@ def update_search_system(db: HTSDatabase):
         return 0
 
 
-def create_backup_and_export(db: HTSDatabase):
+def create_backup_and_export(db: HTSDatabase, csv_compression: str = None):
     """Create backup and export data."""
     logger.info("\n💾 PHASE 5: Backup & Export")
     logger.info("-" * 50)
@@ -344,38 +352,30 @@ def create_backup_and_export(db: HTSDatabase):
         stats['backup_path'] = backup_path
         logger.info(f"✅ Backup created: {backup_path}")
         
-        # Export basic CSV files
+        # Export basic CSV files, streamed in batches
         conn = db.connect()
-        cursor = conn.cursor()
-        
-        export_dir = Path("data/csv/core")
-        export_dir.mkdir(parents=True, exist_ok=True)
         
         # Export core tables
         tables = ['sections', 'chapters', 'headings', 'subheadings', 'products']
         
-        for table in tables:
-            try:
-                cursor.execute(f"SELECT * FROM {table}")
-                rows = cursor.fetchall()
-                
-                if rows:
-                    import csv
-                    csv_file = export_dir / f"{table}.csv"
-                    
-                    with open(csv_file, 'w', newline='', encoding='utf-8') as f:
-                        writer = csv.writer(f)
-                        # Write header
-                        writer.writerow([description[0] for description in cursor.description])
-                        # Write data
-                        writer.writerows(rows)
-                    
-                    logger.info(f"   ✅ Exported {table}: {len(rows):,} records")
-                else:
-                    logger.info(f"   ⚠️  {table}: No records to export")
-                    
-            except Exception as e:
-                logger.error(f"   ❌ Failed to export {table}: {e}")
+        csv_results = CsvExporter(conn, "data/csv/core", compression=csv_compression).export(tables)
+        for table, result in csv_results.items():
+            if result['rows']:
+                logger.info(f"   ✅ Exported {table}: {result['rows']:,} records")
+            else:
+                logger.info(f"   ⚠️  {table}: No records to export")
+        stats['csv_export'] = csv_results
+        
+        # Columnar snapshot for analytics (needs pyarrow)
+        try:
+            snapshot = ColumnarExporter(conn).export()
+            stats['parquet_export'] = snapshot
+            logger.info(f"✅ Parquet snapshot: {len(snapshot['tables'])} tables, {snapshot['rows']:,} rows "
+                        f"in {snapshot['output_dir']}")
+        except ImportError as e:
+            logger.warning(f"⚠️  Parquet snapshot skipped: {e}")
+        except Exception as e:
+            logger.error(f"   ❌ Parquet snapshot failed: {e}")
         
         return stats
         
@@ -396,6 +396,7 @@ def print_comprehensive_summary(stats: dict):
     print(f"   • Chapters:     {stats.get('core_stats', {}).get('chapters', 0):,}")
     print(f"   • Headings:     {stats.get('core_stats', {}).get('headings', 0):,}")
     print(f"   • Subheadings:  {stats.get('core_stats', {}).get('subheadings', 0):,}")
+    print(f"   • National:     {stats.get('national_stats', {}).get('lines', 0):,} (8/10-digit lines)")
     
     # Enhanced data stats
     print(f"\n🔬 Enhanced Data Records:")
@@ -434,7 +435,6 @@ def print_comprehensive_summary(stats: dict):
     print(f"\n🎯 Next Steps:")
     print(f"   • Add more products via ProductManager API")
     print(f"   • Populate subheadings for complete HS6 coverage")
-    print(f"   • Add country-specific tariff codes (8/10/12 digits)")
     print(f"   • Integrate with external APIs for live data")
     
     print("=" * 80)
@@ -446,8 +446,12 @@ def save_comprehensive_manifest(stats: dict):
     
     core_stats = stats.get('core_stats', {})
     enhanced_stats = stats.get('enhanced_stats', {})
+    national_stats = stats.get('national_stats', {})
     validation = stats.get('validation_results', {})
     
+    # Keep the previous source hashes if the national lines phase did not run
+    source_files = national_stats.get('source_files') or load_manifest_sources()
+    
     manifest = {
         "version": "2.0",
         "build_date": datetime.now().isoformat(),
@@ -459,6 +463,7 @@ def save_comprehensive_manifest(stats: dict):
             "headings": core_stats.get('headings', 0),
             "subheadings": core_stats.get('subheadings', 0)
         },
+        "national_lines": national_lines_manifest(national_stats, source_files),
         "enhanced_data": {
             "products": enhanced_stats.get('products', 0),
             "notes": enhanced_stats.get('notes', 0),
@@ -479,8 +484,18 @@ def save_comprehensive_manifest(stats: dict):
                 "classification_notes",
                 "validation_engine",
                 "csv_export"
-            ]
-        }
+            ] + (["parquet_export"] if stats.get('parquet_export') else [])
+        },
+        "csv_export": {
+            table: {"file": result['file'], "rows": result['rows'], "sha256": result['sha256'],
+                    "compression": result['compression']}
+            for table, result in stats.get('csv_export', {}).items()
+        },
+        "parquet_export": {
+            table: {"rows": result['rows'], "bytes": result['bytes']}
+            for table, result in stats.get('parquet_export', {}).get('tables', {}).items()
+        },
+        "source_files": source_files
     }
     
     manifest_path = Path("data/csv/manifest_v2.json")
@@ -492,8 +507,76 @@ def save_comprehensive_manifest(stats: dict):
     logger.info(f"✅ Manifest saved to {manifest_path}")
 
 
-def main():
-    """Main comprehensive orchestrator function."""
+def national_lines_manifest(national_stats: dict, source_files: dict) -> dict:
+    """Manifest totals for the national lines, covering unchanged chapters too."""
+    return {
+        "chapters": len(source_files),
+        "lines": sum(entry.get('lines', 0) for entry in source_files.values()),
+        "superior_lines": sum(entry.get('superior_lines', 0) for entry in source_files.values()),
+        "chapters_reloaded": national_stats.get('chapters', 0),
+        "lines_removed": national_stats.get('deleted_lines', 0),
+        "errors": national_stats.get('errors', 0)
+    }
+
+
+def save_incremental_manifest(stats: dict):
+    """Update the national lines and source hashes of the existing manifest."""
+    logger.info("📋 Updating manifest...")
+    
+    manifest_path = Path("data/csv/manifest_v2.json")
+    manifest = {}
+    if manifest_path.exists():
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    
+    national_stats = stats.get('national_stats', {})
+    source_files = national_stats.get('source_files') or manifest.get('source_files', {})
+    
+    manifest['build_date'] = datetime.now().isoformat()
+    manifest['national_lines'] = national_lines_manifest(national_stats, source_files)
+    manifest.setdefault('build_info', {})['last_incremental_duration'] = stats.get('duration', 'Unknown')
+    manifest['source_files'] = source_files
+    
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    
+    logger.info(f"✅ Manifest updated at {manifest_path}")
+
+
+def incremental_build():
+    """Re-ingest only the chapter files that changed since the last build."""
+    start_time = datetime.now()
+    stats = {"start_time": start_time}
+    
+    logger.info("🔁 Incremental build: checking HTS chapter files for changes")
+    
+    db = HTSDatabase()
+    try:
+        stats['national_stats'] = populate_national_lines(db, incremental=True)
+        if not stats['national_stats']:
+            return False
+        
+        stats['duration'] = str(datetime.now() - start_time)
+        save_incremental_manifest(stats)
+        
+        national_stats = stats['national_stats']
+        logger.info(f"🎉 Incremental build completed in {stats['duration']}: "
+                    f"{national_stats['chapters']} chapters reloaded, "
+                    f"{national_stats['skipped_chapters']} unchanged, "
+                    f"{national_stats['deleted_lines']:,} lines removed")
+        return True
+        
+    except Exception as e:
+        logger.error(f"\n💥 Incremental build failed: {e}")
+        return False
+    
+    finally:
+        db.close()
+
+
+def main(csv_compression: str = None):
+    """Main comprehensive orchestrator function; CSV files are compressed with gzip or zstd if given."""
     start_time = datetime.now()
     stats = {"start_time": start_time}
     
@@ -509,6 +592,9 @@ def main():
         # Phase 1: Core Classification
         stats['core_stats'] = populate_core_classification()
         
+        # Phase 1.5: National Tariff Lines
+        stats['national_stats'] = populate_national_lines(db)
+        
         # Phase 2: Enhanced Data
         stats['enhanced_stats'] = populate_enhanced_data(db)
         
@@ -519,7 +605,7 @@ def main():
         stats['search_records'] = update_search_system(db)
         
         # Phase 5: Backup & Export
-        backup_stats = create_backup_and_export(db)
+        backup_stats = create_backup_and_export(db, csv_compression)
         stats.update(backup_stats)
         
         # Calculate duration
@@ -551,5 +637,17 @@ def main():
 
 
 if __name__ == "__main__":
-    success = main()
+    if len(sys.argv) > 1 and sys.argv[1] == "--incremental":
+        success = incremental_build()
+    elif len(sys.argv) > 1 and sys.argv[1] == "--help":
+        print("Usage: python build_database_v2.py [--incremental|--compress gzip|zstd|--help]")
+        success = True
+    elif len(sys.argv) > 1 and sys.argv[1] == "--compress":
+        # Reject a missing or unknown compression before the build runs
+        if len(sys.argv) < 3 or sys.argv[2] not in COMPRESSION_SUFFIXES:
+            print("Usage: python build_database_v2.py [--incremental|--compress gzip|zstd|--help]")
+            sys.exit(2)
+        success = main(csv_compression=sys.argv[2])
+    else:
+        success = main()
     sys.exit(0 if success else 1)
\ No newline at end of file
@@ -4,10 +4,8 @@ Integration with official data sources for complete HS code population.
 Supports USITC API, World Bank WITS API, and web scraping fallbacks.
 """
 
-import requests
 import json
 import logging
-import time
 import sqlite3
 from typing import Dict, List, Optional, Any
 from pathlib import Path
@@ -17,6 +15,7 @@ import sys
 sys.path.append(str(Path(__file__).parent.parent))
 
 from utils.database import HTSDatabase
+from utils.http_fetch import Fetcher
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -25,12 +24,10 @@ logger = logging.getLogger(__name__)
 class HTSDataExtractor:
     """Extracts HS classification data from official sources."""
     
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'HTS-Database-Builder/2.0 (Academic Research)'
-        })
-        self.rate_limit_delay = 1.0  # seconds between requests
+    def __init__(self, fetcher: Fetcher = None):
+        # Pooled, rate-limited conditional GETs cached under data/http_cache
+        self.fetcher = fetcher or Fetcher(requests_per_second=1.0)
+        self.session = self.fetcher.session
     
     def get_usitc_data(self, endpoint: str = None) -> Optional[Dict]:
         """
@@ -45,25 +42,23 @@ class HTSDataExtractor:
             "https://api.usitc.gov/hts",
         ]
         
+        # Endpoints are fetched in parallel; the first one in order that answers JSON wins
+        logger.info(f"Trying {len(base_urls)} USITC endpoints")
+        responses = self.fetcher.fetch_many(base_urls, timeout=10)
         for base_url in base_urls:
-            try:
-                logger.info(f"Trying USITC endpoint: {base_url}")
-                response = self.session.get(base_url, timeout=10)
-                
-                if response.status_code == 200:
-                    try:
-                        data = response.json()
-                        logger.info(f"✅ Successfully connected to USITC API at {base_url}")
-                        return data
-                    except json.JSONDecodeError:
-                        logger.debug(f"Response not JSON from {base_url}")
-                        continue
-                        
-                time.sleep(self.rate_limit_delay)
-                
-            except Exception as e:
-                logger.debug(f"Failed to connect to {base_url}: {e}")
+            response = responses[base_url]
+            if isinstance(response, Exception):
+                logger.debug(f"Failed to connect to {base_url}: {response}")
                 continue
+            
+            if response.status_code == 200:
+                try:
+                    data = response.json()
+                    logger.info(f"✅ Successfully connected to USITC API at {base_url}")
+                    return data
+                except json.JSONDecodeError:
+                    logger.debug(f"Response not JSON from {base_url}")
+                    continue
         
         logger.warning("❌ Could not connect to USITC API")
         return None
@@ -76,7 +71,7 @@ class HTSDataExtractor:
             else:
                 endpoint = "https://hts.usitc.gov/api/headings"
             
-            response = self.session.get(endpoint, timeout=15)
+            response = self.fetcher.get(endpoint, timeout=15)
             if response.status_code == 200:
                 data = response.json()
                 logger.info(f"✅ Retrieved headings from USITC API")
@@ -87,6 +82,27 @@ class HTSDataExtractor:
         
         return None
     
+    def get_usitc_headings_for_chapters(self, chapter_codes: List[str]) -> Optional[List[Dict]]:
+        """Get the headings of many chapters from USITC API, fetching chapters in parallel."""
+        urls = {f"https://hts.usitc.gov/api/chapters/{code}/headings": code for code in chapter_codes}
+        responses = self.fetcher.fetch_many(urls, timeout=15)
+        
+        headings = []
+        for url, code in urls.items():
+            response = responses[url]
+            if isinstance(response, Exception) or response.status_code != 200:
+                continue
+            try:
+                data = response.json()
+            except json.JSONDecodeError:
+                logger.debug(f"Response not JSON for chapter {code} headings")
+                continue
+            headings.extend(data if isinstance(data, list) else [data])
+        
+        if headings:
+            logger.info(f"✅ Retrieved {len(headings)} headings for {len(chapter_codes)} chapters from USITC API")
+        return headings or None
+    
     def get_usitc_subheadings(self, heading_code: str = None) -> Optional[List[Dict]]:
         """Get subheadings data from USITC API for a specific heading or all."""
         try:
@@ -95,7 +111,7 @@ class HTSDataExtractor:
             else:
                 endpoint = "https://hts.usitc.gov/api/subheadings"
             
-            response = self.session.get(endpoint, timeout=15)
+            response = self.fetcher.get(endpoint, timeout=15)
             if response.status_code == 200:
                 data = response.json()
                 logger.info(f"✅ Retrieved subheadings from USITC API")
@@ -117,25 +133,22 @@ class HTSDataExtractor:
             "https://wits.worldbank.org/API/V1/data/product"
         ]
         
+        logger.info(f"Trying {len(wits_endpoints)} WITS endpoints")
+        responses = self.fetcher.fetch_many(wits_endpoints, timeout=15)
         for endpoint in wits_endpoints:
-            try:
-                logger.info(f"Trying WITS endpoint: {endpoint}")
-                response = self.session.get(endpoint, timeout=15)
-                
-                if response.status_code == 200:
-                    try:
-                        data = response.json()
-                        logger.info(f"✅ Successfully connected to WITS API")
-                        return data
-                    except json.JSONDecodeError:
-                        logger.debug(f"Response not JSON from {endpoint}")
-                        continue
-                        
-                time.sleep(self.rate_limit_delay)
-                
-            except Exception as e:
-                logger.debug(f"Failed WITS endpoint {endpoint}: {e}")
+            response = responses[endpoint]
+            if isinstance(response, Exception):
+                logger.debug(f"Failed WITS endpoint {endpoint}: {response}")
                 continue
+            
+            if response.status_code == 200:
+                try:
+                    data = response.json()
+                    logger.info(f"✅ Successfully connected to WITS API")
+                    return data
+                except json.JSONDecodeError:
+                    logger.debug(f"Response not JSON from {endpoint}")
+                    continue
         
         logger.warning("❌ Could not connect to WITS API")
         return None
@@ -145,7 +158,7 @@ class HTSDataExtractor:
         try:
             # WITS API for HS nomenclature
             endpoint = f"https://wits.worldbank.org/API/V1/SDMX/V21/rest/codelist/all/CL_HS_{level}/?format=json"
-            response = self.session.get(endpoint, timeout=20)
+            response = self.fetcher.get(endpoint, timeout=20)
             
             if response.status_code == 200:
                 data = response.json()
@@ -237,7 +250,7 @@ class HTSDataExtractor:
         try:
             # Try to get chapters listing
             url = "https://hts.usitc.gov/"
-            response = self.session.get(url, timeout=10)
+            response = self.fetcher.get(url, timeout=10)
             
             if response.status_code == 200:
                 logger.info("✅ Connected to USITC website for scraping")
@@ -407,9 +420,9 @@ class HTSDataExtractor:
 class CompleteHTSPopulator:
     """Populates complete HTS data using multiple sources."""
     
-    def __init__(self, db: HTSDatabase):
+    def __init__(self, db: HTSDatabase, fetcher: Fetcher = None):
         self.db = db
-        self.extractor = HTSDataExtractor()
+        self.extractor = HTSDataExtractor(fetcher)
     
     def populate_all_headings(self) -> Dict[str, int]:
         """Populate all headings from official sources or generate systematically."""
@@ -421,6 +434,12 @@ class CompleteHTSPopulator:
         # Try API sources first
         headings_data = self.extractor.get_usitc_headings()
         
+        if not headings_data:
+            cursor.execute("SELECT chapter_code FROM chapters ORDER BY chapter_code")
+            chapter_codes = [row[0] for row in cursor.fetchall()]
+            if chapter_codes:
+                headings_data = self.extractor.get_usitc_headings_for_chapters(chapter_codes)
+        
         if not headings_data:
             headings_data = self.extractor.get_wits_hs_codes("HS4")
         
@@ -683,17 +702,26 @@ class CompleteHTSPopulator:
         return result
 
 
+USAGE = "Usage: python data_sources_integration.py [--record|--replay] [--stand-in URL]"
+
+
 def main():
     """Main function to populate complete HTS system."""
     logger.info("🚀 Starting Complete HTS System Population")
     logger.info("=" * 60)
     
+    # --record keeps every response for --replay, which runs without network;
+    # --stand-in sends requests to a local server in place of the real hosts
+    mode = 'replay' if "--replay" in sys.argv else 'record' if "--record" in sys.argv else 'live'
+    stand_in = sys.argv[sys.argv.index("--stand-in") + 1] if "--stand-in" in sys.argv else None
+    
     try:
         # Initialize database
         db = HTSDatabase()
         
         # Initialize populator
-        populator = CompleteHTSPopulator(db)
+        fetcher = Fetcher(mode=mode, stand_in=stand_in)
+        populator = CompleteHTSPopulator(db, fetcher)
         
         # Step 1: Populate all chapters
         logger.info("📋 Step 1: Populating all 96 chapters...")
@@ -722,6 +750,8 @@ def main():
         logger.info(f"   • Total Headings: {stats.get('total_headings', 0)}")
         logger.info(f"   • Total Subheadings: {stats.get('total_subheadings', 0)}")
         logger.info("=" * 60)
+        logger.info(f"🌐 Fetches ({mode}): {fetcher.stats['requests']} requests, "
+                    f"{fetcher.stats['not_modified']} not modified, {fetcher.stats['replayed']} replayed")
         logger.info("✅ Complete HTS System Population Finished!")
         
         return {
@@ -739,4 +769,7 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if "--help" in sys.argv:
+        print(USAGE)
+    else:
+        main()
\ No newline at end of file
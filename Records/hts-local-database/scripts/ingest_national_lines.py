@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Load 8-digit tariff lines and 10-digit statistical lines from the
+USITC chapter files under HTS/ into the national_lines tables.
+"""
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.database import HTSDatabase
+from utils.search_index import SearchIndex
+from utils.national_lines import (
+    NationalLinesLoader, find_chapter_files, load_manifest_sources, save_manifest_sources,
+    DEFAULT_SOURCE_DIR, MANIFEST_PATH
+)
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Main function to ingest national tariff lines."""
+    parser = argparse.ArgumentParser(description="Ingest 8/10-digit HTS lines from chapter files")
+    parser.add_argument("--source", default=DEFAULT_SOURCE_DIR, help="Directory containing Section_*/Chapter_* folders")
+    parser.add_argument("--db", default="database/hts.db", help="SQLite database path")
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes (default: CPU count)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only re-ingest chapter files whose content hash changed since the last build")
+    parser.add_argument("--manifest", default=MANIFEST_PATH, help="Build manifest holding the source file hashes")
+    args = parser.parse_args()
+    
+    logger.info("🚀 Starting national tariff line ingestion...")
+    
+    db = HTSDatabase(args.db)
+    
+    try:
+        chapter_files = find_chapter_files(args.source)
+        if not chapter_files:
+            raise FileNotFoundError(f"No chapter files found under {args.source}")
+        logger.info(f"📂 Found {len(chapter_files)} chapter files")
+        
+        loader = NationalLinesLoader(db)
+        previous_sources = load_manifest_sources(args.manifest) if args.incremental else None
+        results = loader.ingest(chapter_files, workers=args.workers, previous_sources=previous_sources)
+        save_manifest_sources(results['source_files'], args.manifest)
+        
+        # Triggers indexed the new lines row by row; compact the FTS segments
+        search_index = SearchIndex(db)
+        if results['chapters'] and search_index.is_installed():
+            search_index.optimize()
+        
+        logger.info("📊 National lines populated successfully!")
+        logger.info(f"   • Chapters:       {results['chapters']} ({results['skipped_chapters']} unchanged)")
+        logger.info(f"   • National lines: {results['lines']:,}")
+        logger.info(f"   • Superior lines: {results['superior_lines']:,}")
+        logger.info(f"   • Lines removed:  {results['deleted_lines']:,}")
+        logger.info(f"   • Duty rates:     {results['duty_rates']:,} new or changed")
+        logger.info(f"   • Errors:         {results['error_count']}")
+        logger.info(f"   • Duration:       {results['duration_seconds']}s")
+        
+        return results
+    
+    except Exception as e:
+        logger.error(f"❌ Error: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
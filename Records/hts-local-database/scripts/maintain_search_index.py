@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Maintenance commands for the full-text search index.
+
+The index is kept current by triggers; run `optimize` (or a few `merge`
+steps) after bulk loads, `sync` to backfill records that predate the
+triggers, and `rebuild` if the FTS index ever disagrees with search_documents.
+"""
+
+import logging
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.database import HTSDatabase
+from utils.search_index import SearchIndex
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+USAGE = "Usage: python maintain_search_index.py [install|sync|optimize|merge [pages]|rebuild|check]"
+
+
+def main():
+    """Run one search index maintenance command."""
+    if len(sys.argv) < 2 or sys.argv[1] == "--help":
+        print(USAGE)
+        return True
+    
+    command = sys.argv[1]
+    db = HTSDatabase()
+    search_index = SearchIndex(db)
+    
+    try:
+        if command != "install" and not search_index.is_installed():
+            logger.error("❌ Search index not installed; run the 'install' command first")
+            return False
+        
+        if command == "install":
+            results = search_index.ensure_schema()
+            search_index.optimize()
+            logger.info(f"✅ Search index installed: {results['documents']:,} documents")
+        elif command == "sync":
+            results = search_index.sync()
+            logger.info(f"✅ {results['upserted']:,} documents written, {results['deleted']:,} removed")
+        elif command == "optimize":
+            search_index.optimize()
+        elif command == "merge":
+            pages = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+            search_index.merge(pages)
+        elif command == "rebuild":
+            search_index.rebuild()
+        elif command == "check":
+            ok = search_index.integrity_check()
+            logger.info("✅ Search index is consistent" if ok else "❌ Search index is inconsistent, run 'rebuild'")
+            return ok
+        else:
+            print(USAGE)
+            return False
+        
+        return True
+    
+    except Exception as e:
+        logger.error(f"❌ Error: {e}")
+        return False
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -16,6 +16,7 @@ import shutil
 sys.path.append(str(Path(__file__).parent.parent))
 
 from utils.database import HTSDatabase
+from utils.search_index import SearchIndex
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -341,34 +342,13 @@ class DatabaseMigrationV2:
         return inserted_count
     
     def update_search_index(self):
-        """Populate the enhanced search index."""
+        """Install the trigger-maintained search index and backfill it."""
         logger.info("Updating search index...")
         
-        conn = self.db.connect()
-        cursor = conn.cursor()
+        search_index = SearchIndex(self.db)
+        search_index.ensure_schema()
+        search_index.optimize()
         
-        # Clear existing search index
-        cursor.execute("DELETE FROM search_index")
-        
-        # Add subheadings to search index
-        cursor.execute("""
-            INSERT INTO search_index (record_type, record_id, code, title_en, description)
-            SELECT 'subheading', subheading_id, subheading_code, title_en, description
-            FROM subheadings
-            WHERE title_en IS NOT NULL
-        """)
-        
-        # Add products to search index
-        cursor.execute("""
-            INSERT INTO search_index (record_type, record_id, code, title_en, description, product_names)
-            SELECT 'product', p.product_id, sh.subheading_code, p.product_name, p.description,
-                   p.product_name || ' ' || COALESCE(p.common_name, '') || ' ' || COALESCE(p.scientific_name, '')
-            FROM products p
-            JOIN subheadings sh ON p.subheading_id = sh.subheading_id
-            WHERE p.product_name IS NOT NULL
-        """)
-        
-        conn.commit()
         logger.info("✅ Search index updated")
     
     def validate_migration(self) -> dict:
@@ -398,7 +378,7 @@ class DatabaseMigrationV2:
                 validation_results[table] = -1
         
         # Check search index
-        cursor.execute("SELECT COUNT(*) FROM search_index")
+        cursor.execute("SELECT COUNT(*) FROM search_documents")
         validation_results['search_index'] = cursor.fetchone()[0]
         
         logger.info("Validation results:")
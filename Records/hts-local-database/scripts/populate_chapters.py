@@ -7,12 +7,14 @@ Note: Chapter 77 is reserved and should be skipped.
 import json
 import logging
 import sys
+from functools import partial
 from pathlib import Path
 
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent))
 
 from agents.base_agent import ClaudeExtractorAgent
+from agents.orchestrator import ExtractionOrchestrator
 from utils.database import HTSDatabase
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -132,8 +134,12 @@ class ChapterExtractorAgent(ClaudeExtractorAgent):
             {"chapter_code": "97", "section_number": "XXI", "title_en": "Works of art, collectors' pieces and antiques", "title_short": "Works of art & antiques", "description": "Paintings, drawings, engravings, sculptures, stamps, collections, antiques of archaeological, historical, or ethnographic interest", "heading_count": 6, "general_notes": "This chapter covers works of art, collectors' pieces and antiques"}
         ]
     
-    def extract_chapters_for_section(self, section: dict) -> list:
-        """Extract chapters for a specific section."""
+    def extract_chapters_for_section(self, section: dict, raise_errors: bool = False) -> list:
+        """
+        Extract chapters for a specific section. Errors are logged and give
+        an empty list unless ``raise_errors`` is set, which the orchestrator
+        uses so that a failed section is retried and not checkpointed.
+        """
         try:
             prompt = CHAPTERS_PROMPT_TEMPLATE.format(
                 section_number=section['section_number'],
@@ -152,6 +158,8 @@ class ChapterExtractorAgent(ClaudeExtractorAgent):
             
         except Exception as e:
             logger.error(f"Failed to extract chapters for section {section['section_number']}: {e}")
+            if raise_errors:
+                raise
             return []
     
     def extract_all_chapters(self) -> list:
@@ -168,10 +176,13 @@ class ChapterExtractorAgent(ClaudeExtractorAgent):
                 logger.warning("No sections found in database. Please populate sections first.")
                 return []
             
+            # Sections are extracted concurrently; a crashed run resumes from its checkpoint
+            orchestrator = ExtractionOrchestrator.from_config('chapters')
+            results = orchestrator.run({section['section_number']: section for section in sections},
+                                       partial(self.extract_chapters_for_section, raise_errors=True))
             all_chapters = []
             for section in sections:
-                section_chapters = self.extract_chapters_for_section(section)
-                all_chapters.extend(section_chapters)
+                all_chapters.extend(results.get(section['section_number'], []))
             
             logger.info(f"Extracted {len(all_chapters)} chapters total")
             self.chapters_data = all_chapters
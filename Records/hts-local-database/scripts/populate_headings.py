@@ -7,12 +7,14 @@ Enhanced version with comprehensive data and product examples.
 import json
 import logging
 import sys
+from functools import partial
 from pathlib import Path
 
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent))
 
 from agents.base_agent import ClaudeExtractorAgent
+from agents.orchestrator import ExtractionOrchestrator
 from utils.database import HTSDatabase
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -103,8 +105,12 @@ class HeadingExtractorAgent(ClaudeExtractorAgent):
             {"chapter_code": "97", "heading_code": "9701", "title_en": "Paintings, drawings and pastels", "title_short": "Paintings & drawings", "description": "Original paintings, drawings and pastels executed entirely by hand", "subheading_count": 2, "is_residual": 0},
         ]
     
-    def extract_headings_for_chapter(self, chapter: dict) -> list:
-        """Extract headings for a specific chapter."""
+    def extract_headings_for_chapter(self, chapter: dict, raise_errors: bool = False) -> list:
+        """
+        Extract headings for a specific chapter. Errors are logged and give
+        an empty list unless ``raise_errors`` is set, which the orchestrator
+        uses so that a failed chapter is retried and not checkpointed.
+        """
         try:
             logger.info(f"Extracting headings for Chapter {chapter['chapter_code']}: {chapter['title_en']}")
             
@@ -126,6 +132,8 @@ class HeadingExtractorAgent(ClaudeExtractorAgent):
             
         except Exception as e:
             logger.error(f"Failed to extract headings for chapter {chapter['chapter_code']}: {e}")
+            if raise_errors:
+                raise
             return []
     
     def extract_all_headings(self) -> list:
@@ -142,10 +150,13 @@ class HeadingExtractorAgent(ClaudeExtractorAgent):
                 logger.warning("No chapters found in database. Please populate chapters first.")
                 return []
             
+            # Chapters are extracted concurrently; a crashed run resumes from its checkpoint
+            orchestrator = ExtractionOrchestrator.from_config('headings')
+            results = orchestrator.run({chapter['chapter_code']: chapter for chapter in chapters},
+                                       partial(self.extract_headings_for_chapter, raise_errors=True))
             all_headings = []
             for chapter in chapters:
-                chapter_headings = self.extract_headings_for_chapter(chapter)
-                all_headings.extend(chapter_headings)
+                all_headings.extend(results.get(chapter['chapter_code'], []))
             
             logger.info(f"Extracted {len(all_headings)} headings total")
             self.headings_data = all_headings
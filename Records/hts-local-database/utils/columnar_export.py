@@ -0,0 +1,199 @@
+"""
+Columnar (Parquet) snapshot of the tariff for analytics jobs.
+
+Each table is read with fetchmany() and written batch by batch as Arrow
+record batches, so memory stays bounded by the batch size rather than the
+table size. Code columns (chapter_code, hts_code, rate_type, ...) repeat a
+small set of values and are written as Arrow dictionary columns, which
+pandas reads back as categoricals and DuckDB as dictionary-encoded strings.
+
+Besides the tables themselves, a denormalized ``hierarchy`` table carries
+one row per national line with its section, chapter, heading and
+subheading codes and titles, so a consumer needs no joins.
+
+pyarrow is only needed when this exporter is used.
+"""
+
+import logging
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterable
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+from utils.database import table_exists
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TABLES = ['sections', 'chapters', 'headings', 'subheadings', 'products',
+                  'national_lines', 'duty_rates', 'duty_rate_programs']
+
+# Low-cardinality text columns written as dictionary columns
+DICTIONARY_COLUMNS = {
+    'section_number', 'section_range', 'chapter_code', 'heading_code', 'subheading_code',
+    'hts_code', 'parent_code', 'classification_code', 'classification_type', 'rate_type',
+    'rate_kind', 'specific_unit', 'program_code', 'program', 'status', 'source_file',
+}
+
+# Rows per fetchmany() call and per record batch
+DEFAULT_BATCH_SIZE = 50000
+
+HIERARCHY_SQL = """
+    SELECT s.section_number, s.title_en AS section_title,
+           nl.chapter_code, c.title_en AS chapter_title,
+           nl.heading_code, h.title_en AS heading_title,
+           nl.subheading_code, sh.title_en AS subheading_title,
+           nl.hts_code, nl.hts_display, nl.code_level, nl.parent_code, nl.indent,
+           nl.description, nl.full_description, nl.units,
+           nl.general_rate, nl.special_rate, nl.other_rate, nl.rates_inherited
+    FROM national_lines nl
+    LEFT JOIN chapters c ON c.chapter_code = nl.chapter_code
+    LEFT JOIN sections s ON s.section_id = c.section_id
+    LEFT JOIN headings h ON h.heading_code = nl.heading_code
+    LEFT JOIN subheadings sh ON sh.subheading_code = nl.subheading_code
+    ORDER BY nl.hts_code
+"""
+
+# Without national lines the hierarchy ends at the subheadings
+SUBHEADING_HIERARCHY_SQL = """
+    SELECT s.section_number, s.title_en AS section_title,
+           c.chapter_code, c.title_en AS chapter_title,
+           h.heading_code, h.title_en AS heading_title,
+           sh.subheading_code, sh.title_en AS subheading_title
+    FROM subheadings sh
+    JOIN headings h ON h.heading_id = sh.heading_id
+    JOIN chapters c ON c.chapter_id = h.chapter_id
+    LEFT JOIN sections s ON s.section_id = c.section_id
+    ORDER BY sh.subheading_code
+"""
+
+
+def require_pyarrow():
+    """Fail with an actionable message when pyarrow is missing."""
+    if pa is None:
+        raise ImportError("The Parquet export requires pyarrow: pip install pyarrow")
+
+
+def arrow_type(declared_type: Optional[str]):
+    """Arrow type for a declared SQLite column type, following SQLite's affinity rules."""
+    declared = (declared_type or '').upper()
+    if 'INT' in declared or declared == 'BOOLEAN':
+        return pa.int64()
+    if any(name in declared for name in ('REAL', 'FLOA', 'DOUB', 'DECIMAL', 'NUMERIC')):
+        return pa.float64()
+    return pa.string()
+
+
+class ColumnarExporter:
+    """Stream SQLite tables into one Parquet file per table."""
+    
+    def __init__(self, conn, output_dir: str = "data/parquet", batch_size: int = DEFAULT_BATCH_SIZE,
+                 compression: str = 'zstd'):
+        require_pyarrow()
+        self.conn = conn
+        self.output_dir = Path(output_dir)
+        self.batch_size = batch_size
+        self.compression = compression
+    
+    def _schema(self, cursor, declared: Dict[str, str]):
+        """Arrow schema of a cursor's result columns; unknown (computed) columns are strings."""
+        fields = []
+        for description in cursor.description:
+            name = description[0]
+            if name in DICTIONARY_COLUMNS:
+                fields.append(pa.field(name, pa.dictionary(pa.int32(), pa.string())))
+            else:
+                fields.append(pa.field(name, arrow_type(declared.get(name))))
+        return pa.schema(fields)
+    
+    def _column(self, values: List[Any], field):
+        """Arrow array for one column of a batch, coercing values SQLite stored with another type."""
+        if pa.types.is_dictionary(field.type):
+            values = [None if value is None else str(value) for value in values]
+            return pa.array(values, pa.string()).dictionary_encode()
+        try:
+            return pa.array(values, field.type)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+            if pa.types.is_string(field.type):
+                return pa.array([None if value is None else str(value) for value in values], field.type)
+            raise
+    
+    def export_query(self, name: str, select_sql: str, params: Iterable = (),
+                     declared: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Write the rows of a query to ``<output_dir>/<name>.parquet``; returns rows, batches and path."""
+        start = time.time()
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        path = self.output_dir / f"{name}.parquet"
+        cursor = self.conn.cursor()
+        cursor.execute(select_sql, tuple(params))
+        schema = self._schema(cursor, declared or {})
+        
+        rows = batches = 0
+        with pq.ParquetWriter(path, schema, compression=self.compression) as writer:
+            while True:
+                chunk = cursor.fetchmany(self.batch_size)
+                if not chunk:
+                    break
+                columns = list(zip(*chunk))
+                arrays = [self._column(list(column), field) for column, field in zip(columns, schema)]
+                writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+                rows += len(chunk)
+                batches += 1
+        
+        return {
+            'path': str(path),
+            'rows': rows,
+            'batches': batches,
+            'bytes': path.stat().st_size,
+            'duration_seconds': round(time.time() - start, 4),
+        }
+    
+    def export_table(self, table: str) -> Dict[str, Any]:
+        """Write a whole table, typed from its declared column types."""
+        if not re.fullmatch(r'\w+', table):
+            raise ValueError(f"Invalid table name: {table}")
+        cursor = self.conn.cursor()
+        declared = {row[1]: row[2] for row in cursor.execute(f"PRAGMA table_info({table})")}
+        return self.export_query(table, f"SELECT * FROM {table}", declared=declared)
+    
+    def export_hierarchy(self) -> Dict[str, Any]:
+        """Write the denormalized section-to-national-line table."""
+        if table_exists(self.conn, 'national_lines'):
+            select_sql = HIERARCHY_SQL
+            declared = {'code_level': 'INTEGER', 'indent': 'INTEGER', 'rates_inherited': 'BOOLEAN'}
+        else:
+            select_sql = SUBHEADING_HIERARCHY_SQL
+            declared = {}
+        return self.export_query('hierarchy', select_sql, declared=declared)
+    
+    def export(self, tables: Optional[List[str]] = None, hierarchy: bool = True) -> Dict[str, Any]:
+        """
+        Snapshot the given tables (default: DEFAULT_TABLES that exist) and the
+        hierarchy table. Returns per-table results and totals.
+        """
+        start = time.time()
+        results: Dict[str, Dict[str, Any]] = {}
+        for table in tables or DEFAULT_TABLES:
+            if not table_exists(self.conn, table):
+                logger.debug(f"Skipping {table}: table does not exist")
+                continue
+            results[table] = self.export_table(table)
+            logger.info(f"Exported {table} to Parquet: {results[table]['rows']:,} rows")
+        
+        if hierarchy:
+            results['hierarchy'] = self.export_hierarchy()
+            logger.info(f"Exported hierarchy to Parquet: {results['hierarchy']['rows']:,} rows")
+        
+        return {
+            'output_dir': str(self.output_dir),
+            'tables': results,
+            'rows': sum(result['rows'] for result in results.values()),
+            'bytes': sum(result['bytes'] for result in results.values()),
+            'duration_seconds': round(time.time() - start, 4),
+        }
@@ -4,21 +4,165 @@ Database utility functions for HTS database management.
 
 import sqlite3
 import logging
+import re
+import threading
 import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Iterable, Iterator, Callable, Tuple
 import json
 
+import yaml
+
 logger = logging.getLogger(__name__)
 
+DEFAULT_CONFIG_PATH = "config.yaml"
+
+# Pragmas for pooled connections, overridden by database.pragmas in config.yaml
+DEFAULT_PRAGMAS = {
+    'synchronous': 'NORMAL',
+    'cache_size': -65536,
+    'mmap_size': 268435456,
+    'busy_timeout': 5000,
+}
+
+
+def load_database_config(config_path: str = DEFAULT_CONFIG_PATH) -> Dict[str, Any]:
+    """The ``database`` section of config.yaml, or {} if there is no config file."""
+    path = Path(config_path)
+    if not path.exists():
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f) or {}
+    return config.get('database') or {}
+
+
+def table_exists(conn: sqlite3.Connection, name: str) -> bool:
+    """True if the database of ``conn`` has a table (virtual tables included) called ``name``."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,))
+    return cursor.fetchone() is not None
+
+
+class ConnectionPool:
+    """
+    Connections for multi-threaded use of one database file.
+    
+    Each thread gets its own read-only connection (opened with a ``mode=ro``
+    URI), while all writes go through a single writer connection guarded by
+    a lock. The database is switched to WAL journaling so readers never
+    block the writer or each other. A reader stays open while its thread
+    lives; readers of threads that have exited are closed when another
+    thread opens one (or by reap()), so short-lived threads do not pile up
+    connections.
+    """
+    
+    def __init__(self, db_path: Path, pragmas: Optional[Dict[str, Any]] = None,
+                 journal_mode: str = 'wal'):
+        self.db_path = Path(db_path).resolve()
+        self.pragmas = {**DEFAULT_PRAGMAS, **(pragmas or {})}
+        for name, value in self.pragmas.items():
+            if not re.fullmatch(r'\w+', name) or not re.fullmatch(r'-?\w+', str(value)):
+                raise ValueError(f"Invalid pragma: {name} = {value}")
+        if not re.fullmatch(r'\w+', journal_mode):
+            raise ValueError(f"Invalid journal mode: {journal_mode}")
+        
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writer_lock = threading.RLock()
+        self._readers: Dict[threading.Thread, sqlite3.Connection] = {}
+        
+        # The writer is opened first: it creates the file if needed and sets
+        # the journal mode, which read-only connections cannot change
+        self._writer = self._open(read_only=False)
+        mode = self._writer.execute(f"PRAGMA journal_mode = {journal_mode}").fetchone()[0]
+        logger.info(f"Connection pool for {self.db_path.name}: journal_mode={mode}")
+    
+    def _open(self, read_only: bool) -> sqlite3.Connection:
+        if read_only:
+            conn = sqlite3.connect(f"{self.db_path.as_uri()}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA foreign_keys = ON")
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """Check out this thread's read-only connection."""
+        conn = getattr(self._local, 'reader', None)
+        if conn is None:
+            conn = self._local.reader = self._open(read_only=True)
+            with self._lock:
+                self._reap()
+                self._readers[threading.current_thread()] = conn
+        yield conn
+    
+    def _reap(self) -> int:
+        exited = [thread for thread in self._readers if not thread.is_alive()]
+        for thread in exited:
+            self._readers.pop(thread).close()
+        return len(exited)
+    
+    def reap(self) -> int:
+        """Close the readers of threads that have exited; returns how many were closed."""
+        with self._lock:
+            return self._reap()
+    
+    def reader_count(self) -> int:
+        """Number of open reader connections."""
+        with self._lock:
+            return len(self._readers)
+    
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """
+        Check out the writer connection. Other threads wait until the block
+        ends; it commits on success and rolls back on error.
+        """
+        with self._writer_lock:
+            try:
+                yield self._writer
+                self._writer.commit()
+            except Exception:
+                self._writer.rollback()
+                raise
+    
+    def close(self):
+        """Close the writer and every reader the pool has opened."""
+        with self._lock:
+            for conn in self._readers.values():
+                conn.close()
+            self._readers = {}
+        with self._writer_lock:
+            self._writer.close()
+        self._local = threading.local()
+
 
 class HTSDatabase:
     """Database connection and utility class for HTS database."""
     
-    def __init__(self, db_path: str = "database/hts.db"):
+    # Default number of rows sent to executemany per batch in bulk-load mode
+    BULK_BATCH_SIZE = 500
+    
+    # Code column and primary key for each level of the hierarchy
+    CODE_COLUMNS = {
+        'sections': ('section_number', 'section_id'),
+        'chapters': ('chapter_code', 'chapter_id'),
+        'headings': ('heading_code', 'heading_id'),
+        'subheadings': ('subheading_code', 'subheading_id'),
+    }
+    
+    def __init__(self, db_path: str = "database/hts.db", config: Optional[Dict[str, Any]] = None):
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
         self._connection = None
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        # database section of config.yaml; read when the pool is first used
+        self._config = config
     
     def connect(self) -> sqlite3.Connection:
         """Create or get database connection."""
@@ -34,6 +178,29 @@ class HTSDatabase:
         if self._connection:
             self._connection.close()
             self._connection = None
+        if self._pool:
+            self._pool.close()
+            self._pool = None
+    
+    def pool(self) -> ConnectionPool:
+        """Create or get the connection pool used by reader() and writer()."""
+        with self._pool_lock:
+            if self._pool is None:
+                config = self._config if self._config is not None else load_database_config()
+                self._pool = ConnectionPool(
+                    self.db_path,
+                    pragmas=config.get('pragmas'),
+                    journal_mode=config.get('journal_mode', 'wal')
+                )
+            return self._pool
+    
+    def reader(self):
+        """Context manager yielding a read-only connection for the calling thread."""
+        return self.pool().reader()
+    
+    def writer(self):
+        """Context manager yielding the shared writer connection; commits on exit."""
+        return self.pool().writer()
     
     def create_tables(self, schema_file: str = "schema/sql/sqlite/create_tables.sql"):
         """Create database tables from schema file."""
@@ -205,6 +372,235 @@ class HTSDatabase:
         logger.info(f"Inserted {inserted} subheadings")
         return inserted
     
+    def get_code_map(self, table_name: str) -> Dict[str, int]:
+        """Load a code -> primary key map for one level of the hierarchy."""
+        if table_name not in self.CODE_COLUMNS:
+            raise ValueError(f"No code column known for table: {table_name}")
+        
+        code_column, id_column = self.CODE_COLUMNS[table_name]
+        cursor = self.connect().cursor()
+        cursor.execute(f"SELECT {code_column}, {id_column} FROM {table_name}")
+        return {row[0]: row[1] for row in cursor.fetchall()}
+    
+    def executemany_batched(self, sql: str, rows: Iterable[Tuple[Any, tuple]],
+                            batch_size: int = None) -> Dict[str, Any]:
+        """
+        Execute a statement for many rows in batches inside one transaction,
+        committed here unless the caller already had a transaction open.
+        
+        ``rows`` yields ``(label, params)`` pairs, where ``label`` identifies the
+        row in the error report. Each batch goes through ``executemany`` under a
+        savepoint; if the batch fails it is rolled back and replayed row by row
+        so that a single bad row is reported without discarding the others.
+        """
+        batch_size = batch_size or self.BULK_BATCH_SIZE
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        results = {
+            'success_count': 0,
+            'error_count': 0,
+            'errors': []
+        }
+        
+        def flush(batch: List[Tuple[int, Any, tuple]]):
+            cursor.execute("SAVEPOINT bulk_batch")
+            try:
+                cursor.executemany(sql, [params for _, _, params in batch])
+                cursor.execute("RELEASE SAVEPOINT bulk_batch")
+                results['success_count'] += len(batch)
+                return
+            except sqlite3.Error:
+                cursor.execute("ROLLBACK TO SAVEPOINT bulk_batch")
+                cursor.execute("RELEASE SAVEPOINT bulk_batch")
+            
+            # Replay the failed batch one row at a time to isolate the bad rows
+            for row_number, label, params in batch:
+                try:
+                    cursor.execute(sql, params)
+                    results['success_count'] += 1
+                except sqlite3.Error as e:
+                    results['error_count'] += 1
+                    results['errors'].append({
+                        'row_number': row_number,
+                        'label': label,
+                        'error': str(e)
+                    })
+        
+        # Inside a transaction the caller opened, work under a savepoint and
+        # leave the commit (or rollback) of that transaction to the caller
+        owns_transaction = not conn.in_transaction
+        cursor.execute("BEGIN" if owns_transaction else "SAVEPOINT bulk_load")
+        
+        try:
+            batch = []
+            for row_number, (label, params) in enumerate(rows, start=1):
+                batch.append((row_number, label, params))
+                if len(batch) >= batch_size:
+                    flush(batch)
+                    batch = []
+            if batch:
+                flush(batch)
+            if owns_transaction:
+                conn.commit()
+            else:
+                cursor.execute("RELEASE SAVEPOINT bulk_load")
+        except Exception:
+            if owns_transaction:
+                conn.rollback()
+            else:
+                cursor.execute("ROLLBACK TO SAVEPOINT bulk_load")
+                cursor.execute("RELEASE SAVEPOINT bulk_load")
+            raise
+        
+        return results
+    
+    def _bulk_insert(self, table_name: str, sql: str, records: List[Dict],
+                     code_field: str, to_params: Callable[[Dict], tuple],
+                     batch_size: int = None) -> Dict[str, Any]:
+        """Run a bulk insert, reporting records whose parameters cannot be built."""
+        skipped = []
+        
+        def rows():
+            for row_number, record in enumerate(records, start=1):
+                try:
+                    yield row_number, to_params(record)
+                except (KeyError, ValueError) as e:
+                    skipped.append({
+                        'row_number': row_number,
+                        'code': record.get(code_field),
+                        'error': str(e)
+                    })
+        
+        results = self.executemany_batched(sql, rows(), batch_size)
+        
+        # Report failures against positions in the original records list
+        failed = [{
+            'row_number': issue['label'],
+            'code': records[issue['label'] - 1].get(code_field),
+            'error': issue['error']
+        } for issue in results['errors']]
+        results['errors'] = sorted(failed + skipped, key=lambda issue: issue['row_number'])
+        results['error_count'] = len(results['errors'])
+        
+        for issue in results['errors']:
+            logger.error(f"Failed to insert {table_name} row {issue['row_number']} ({issue['code']}): {issue['error']}")
+        logger.info(f"Bulk inserted {results['success_count']} {table_name}, {results['error_count']} errors")
+        return results
+    
+    def bulk_insert_sections(self, sections: List[Dict], batch_size: int = None) -> Dict[str, Any]:
+        """Insert sections data in bulk-load mode."""
+        sql = """
+            INSERT INTO sections (
+                section_number, section_range, title_en, title_short,
+                description, chapter_count, confidence_score, source_reference
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """
+        
+        def to_params(section: Dict) -> tuple:
+            return (
+                section.get('section_number'),
+                section.get('section_range'),
+                section.get('title_en'),
+                section.get('title_short'),
+                section.get('description'),
+                section.get('chapter_count'),
+                section.get('confidence_score', 1.0),
+                section.get('source_reference', 'AI_generated')
+            )
+        
+        return self._bulk_insert('sections', sql, sections, 'section_number', to_params, batch_size)
+    
+    def bulk_insert_chapters(self, chapters: List[Dict], batch_size: int = None) -> Dict[str, Any]:
+        """Insert chapters data in bulk-load mode, resolving sections from a preloaded map."""
+        section_ids = self.get_code_map('sections')
+        sql = """
+            INSERT INTO chapters (
+                section_id, chapter_code, title_en, title_short,
+                description, heading_count, general_notes,
+                confidence_score, source_reference
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """
+        
+        def to_params(chapter: Dict) -> tuple:
+            section_id = section_ids.get(chapter.get('section_number'))
+            if not section_id:
+                raise ValueError(f"Section not found for chapter {chapter.get('chapter_code')}")
+            return (
+                section_id,
+                chapter.get('chapter_code'),
+                chapter.get('title_en'),
+                chapter.get('title_short'),
+                chapter.get('description'),
+                chapter.get('heading_count'),
+                chapter.get('general_notes'),
+                chapter.get('confidence_score', 1.0),
+                chapter.get('source_reference', 'AI_generated')
+            )
+        
+        return self._bulk_insert('chapters', sql, chapters, 'chapter_code', to_params, batch_size)
+    
+    def bulk_insert_headings(self, headings: List[Dict], batch_size: int = None) -> Dict[str, Any]:
+        """Insert headings data in bulk-load mode, resolving chapters from a preloaded map."""
+        chapter_ids = self.get_code_map('chapters')
+        sql = """
+            INSERT INTO headings (
+                chapter_id, heading_code, title_en, title_short,
+                description, subheading_count, is_residual,
+                confidence_score, source_reference
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """
+        
+        def to_params(heading: Dict) -> tuple:
+            heading_code = heading.get('heading_code') or ''
+            chapter_id = chapter_ids.get(heading_code[:2])
+            if not chapter_id:
+                raise ValueError(f"Chapter not found for heading {heading.get('heading_code')}")
+            return (
+                chapter_id,
+                heading.get('heading_code'),
+                heading.get('title_en'),
+                heading.get('title_short'),
+                heading.get('description'),
+                heading.get('subheading_count'),
+                heading.get('is_residual', False),
+                heading.get('confidence_score', 1.0),
+                heading.get('source_reference', 'AI_generated')
+            )
+        
+        return self._bulk_insert('headings', sql, headings, 'heading_code', to_params, batch_size)
+    
+    def bulk_insert_subheadings(self, subheadings: List[Dict], batch_size: int = None) -> Dict[str, Any]:
+        """Insert subheadings data in bulk-load mode, resolving headings from a preloaded map."""
+        heading_ids = self.get_code_map('headings')
+        sql = """
+            INSERT INTO subheadings (
+                heading_id, subheading_code, title_en, title_short,
+                description, unit_of_quantity, is_leaf_node, is_residual,
+                confidence_score, source_reference
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """
+        
+        def to_params(subheading: Dict) -> tuple:
+            subheading_code = subheading.get('subheading_code') or ''
+            heading_id = heading_ids.get(subheading_code[:4])
+            if not heading_id:
+                raise ValueError(f"Heading not found for subheading {subheading.get('subheading_code')}")
+            return (
+                heading_id,
+                subheading.get('subheading_code'),
+                subheading.get('title_en'),
+                subheading.get('title_short'),
+                subheading.get('description'),
+                subheading.get('unit_of_quantity'),
+                subheading.get('is_leaf_node', True),
+                subheading.get('is_residual', False),
+                subheading.get('confidence_score', 1.0),
+                subheading.get('source_reference', 'AI_generated')
+            )
+        
+        return self._bulk_insert('subheadings', sql, subheadings, 'subheading_code', to_params, batch_size)
+    
     def get_section_id(self, section_number: str) -> Optional[int]:
         """Get section ID by section number."""
         conn = self.connect()
@@ -229,6 +625,10 @@ class HTSDatabase:
         result = cursor.fetchone()
         return result[0] if result else None
     
+    def table_exists(self, table_name: str) -> bool:
+        """Check whether a table exists."""
+        return table_exists(self.connect(), table_name)
+    
     def count_records(self, table_name: str) -> int:
         """Count records in a table."""
         conn = self.connect()
@@ -0,0 +1,617 @@
+"""
+Compiled duty-rate expressions.
+
+The rate columns of the tariff are published as text: "6.8%", "4.4¢/kg + 6.8%",
+"$1.35/doz.", "33 1/3%", "Free (A,AU,BH,...) 3.5% (KR)". compile_rate() parses
+such a string once into a CompiledRate, a list of ad valorem and specific
+components with optional minimum and maximum, which evaluates the duty for a
+customs value and quantity without looking at the text again.
+
+DutyRatesLoader stores the compiled rates of every national line in duty_rates
+(one row per rate column, and per program group of the special column), so
+callers read structured rates instead of re-parsing the published strings.
+"""
+
+import json
+import logging
+import re
+import sqlite3
+import time
+from datetime import date
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Tuple
+
+from utils.database import HTSDatabase
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_FILE = "schema/sql/sqlite/duty_rates.sql"
+
+# duty_rates.rate_type of each national_lines rate column
+RATE_COLUMNS = {
+    'general_rate': 'general',
+    'special_rate': 'preferential',
+    'other_rate': 'column_2',
+}
+
+# Columns added to duty_rates for the compiled form; older databases get them by ALTER TABLE
+COMPILED_COLUMNS = {
+    'rate_kind': 'TEXT',
+    'specific_amount': 'REAL',
+    'specific_unit': 'TEXT',
+    'rate_components': 'TEXT',
+    'program_codes': 'TEXT',
+}
+
+# Columns derived from the compiled rate alone, refreshed when the compiler changes
+RECOMPILED_COLUMNS = ('minimum_rate', 'maximum_rate', 'rate_kind', 'specific_amount', 'specific_unit',
+                      'rate_components')
+
+# Published unit spellings mapped to one canonical name
+UNIT_ALIASES = {
+    'no.': 'each', 'no': 'each', 'pcs': 'each', 'article': 'each',
+    'liters': 'liter', 'l': 'liter',
+    'pf.liter': 'pf. liter', 'pf.liters': 'pf. liter', 'pf. liters': 'pf. liter',
+    'prs.': 'pr.', 'prs': 'pr.', 'pr': 'pr.',
+    'doz': 'doz.', 'dz': 'doz.',
+    'doz. prs.': 'doz. pr.', 'doz. prs': 'doz. pr.',
+    'm²': 'm2', 'm³': 'm3',
+    'thousand': '1,000', 'thousands': '1,000', '1,000 pins': '1,000',
+    'line/gross': 'line gross', 'line/ gross': 'line gross', 'gr.lines': 'line gross',
+    'jwls.': 'jewel',
+    'clean kg': 'kg',
+}
+
+# Canonical unit -> (dimension, size in the dimension's base unit), so a
+# quantity declared in one unit can be applied to a rate quoted in another
+UNIT_DIMENSIONS = {
+    'kg': ('mass', 1.0),
+    'g': ('mass', 0.001),
+    't': ('mass', 1000.0),
+    'lb': ('mass', 0.45359237),
+    'each': ('count', 1.0),
+    'doz.': ('count', 12.0),
+    'gross': ('count', 144.0),
+    '1,000': ('count', 1000.0),
+    'pr.': ('pairs', 1.0),
+    'doz. pr.': ('pairs', 12.0),
+    'liter': ('volume', 1.0),
+    'm3': ('volume', 1000.0),
+    'bbl': ('volume', 158.987294928),
+    'm2': ('area', 1.0),
+}
+
+RATE_KINDS = ('free', 'ad_valorem', 'specific', 'compound', 'reference')
+
+TAG_RE = re.compile(r'<[^>]*>')
+PERCENT_RE = re.compile(r'^(\d+(?:\.\d+)?(?:\s+\d+/\d+)?|\d+/\d+)\s*%\s*(.*)$')
+SPECIFIC_RE = re.compile(
+    r'^(\$)?\s*(\d[\d,]*(?:\.\d+)?)\s*(¢)?\s*'
+    r'(?:/\s*(.+?)|\s+(each|for each other piece or part))'
+    r'(?=$|\s+(?:on|of|less|over|including)\b|,\s)(.*)$'
+)
+MINIMUM_RE = re.compile(r'but not less(?:\s+than)?\s+(\$)?\s*(\d[\d,]*(?:\.\d+)?)\s*(¢)?', re.IGNORECASE)
+SPECIAL_GROUP_RE = re.compile(r'\s*([^()]+?)\s*\(([^()]*)\)')
+
+
+def clean_rate_text(text: str) -> str:
+    """Published rate text without markup and with single spaces: 'm<sup>3</sup>' -> 'm3'."""
+    text = TAG_RE.sub('', text or '')
+    text = text.replace('thou- sand', 'thousand')
+    return ' '.join(text.split())
+
+
+def normalize_unit(unit: str) -> str:
+    """Canonical name of a unit of quantity, as used by UNIT_DIMENSIONS."""
+    unit = clean_rate_text(unit).lower().rstrip(',')
+    return UNIT_ALIASES.get(unit, unit)
+
+
+def _number(text: str) -> float:
+    """Decimal or mixed-fraction number: '6.8', '1,000', '33 1/3'."""
+    total = 0.0
+    for part in text.replace(',', '').split():
+        if '/' in part:
+            numerator, denominator = part.split('/')
+            total += float(numerator) / float(denominator)
+        else:
+            total += float(part)
+    return total
+
+
+def _basis(tail: str) -> Tuple[Optional[str], bool]:
+    """
+    What a component is charged on, from the text after its rate:
+    'on the case' -> 'case', 'on drained weight' -> 'drained weight'.
+    Returns the basis and whether the whole tail was understood.
+    """
+    tail = tail.strip().rstrip(',').strip()
+    if tail.endswith(', if any'):
+        tail = tail[:-len(', if any')]
+    if not tail:
+        return None, True
+    match = re.match(r'^(?:,\s*)?(?:on|of|including)\s+(?:the\s+)?(.+)$', tail)
+    if match:
+        return match.group(1).strip(), True
+    return tail, False
+
+
+class CompiledRate:
+    """
+    A rate expression compiled into components. Each component is
+    (type, amount, unit, basis): ('ad_valorem', 6.8, None, None) is 6.8% of
+    the value, ('specific', 0.044, 'kg', None) is $0.044 per kg. Amounts of
+    specific components are in dollars; ad valorem amounts are percentages.
+    
+    ``minimum`` and ``maximum`` are per unit of the first specific component
+    (or of value). compile_rate() only fills ``minimum``: the caps published
+    in the tariff ("the total duty shall not exceed the duty for the
+    complete movement") refer to the duty of another article rather than an
+    amount, so they are not compiled and leave ``exact`` False.
+    """
+    
+    __slots__ = ('text', 'kind', 'components', 'minimum', 'maximum', 'exact', 'ad_valorem')
+    
+    def __init__(self, text: str, kind: str, components: Tuple[tuple, ...] = (),
+                 minimum: Optional[float] = None, maximum: Optional[float] = None, exact: bool = True):
+        self.text = text
+        self.kind = kind
+        self.components = tuple(tuple(component) for component in components)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.exact = exact
+        # Fraction of the whole value charged by the unqualified ad valorem components
+        self.ad_valorem = sum(amount for component_type, amount, _, basis in self.components
+                              if component_type == 'ad_valorem' and basis is None) / 100.0
+    
+    @property
+    def ad_valorem_percent(self) -> Optional[float]:
+        """Total ad valorem percentage, or None for a rate without one."""
+        percents = [amount for component_type, amount, _, _ in self.components if component_type == 'ad_valorem']
+        if self.kind == 'free':
+            return 0.0
+        return sum(percents) if percents else None
+    
+    @property
+    def specific(self) -> Optional[tuple]:
+        """The first specific component (type, amount, unit, basis), if any."""
+        return next((c for c in self.components if c[0] == 'specific'), None)
+    
+    def to_json(self) -> str:
+        """Compact form stored in duty_rates.rate_components."""
+        return json.dumps({
+            'kind': self.kind,
+            'components': [list(component) for component in self.components],
+            'minimum': self.minimum,
+            'maximum': self.maximum,
+            'exact': self.exact,
+        }, ensure_ascii=False, separators=(',', ':'))
+    
+    @classmethod
+    def from_json(cls, data: str, text: str = '') -> 'CompiledRate':
+        """Rebuild a compiled rate from duty_rates.rate_components."""
+        return _from_json(data, text)
+    
+    def duty(self, value: float, quantity: Optional[float] = None, unit: Optional[str] = None,
+             amounts: Optional[Dict[str, float]] = None) -> Optional[float]:
+        """
+        Duty in dollars for goods of customs ``value`` and ``quantity``.
+        
+        ``unit`` is the unit of ``quantity``; it defaults to the unit of the
+        rate and is converted when both measure the same thing (g -> kg,
+        doz. -> each). ``amounts`` overrides the base of components charged on
+        something else, keyed by basis or unit: {'battery': 4.10} for
+        "35% on the battery", {'jewel': 17} for "25¢/jewel". Returns None for a
+        rate that only refers to another provision.
+        """
+        if self.kind == 'reference':
+            return None
+        amounts = amounts or {}
+        total = 0.0
+        
+        for component_type, amount, component_unit, basis in self.components:
+            if component_type == 'ad_valorem':
+                base = amounts.get(basis, value) if basis else value
+                total += base * amount / 100.0
+                continue
+            
+            if basis in amounts or component_unit in amounts:
+                base = amounts.get(basis, amounts.get(component_unit))
+            else:
+                base = _convert(quantity, unit, component_unit)
+            total += base * amount
+        
+        if self.minimum is not None or self.maximum is not None:
+            specific = self.specific
+            units = _convert(quantity, unit, specific[2]) if specific else value
+            if self.minimum is not None:
+                total = max(total, self.minimum * units)
+            if self.maximum is not None:
+                total = min(total, self.maximum * units)
+        return total
+    
+    def __repr__(self):
+        return f"CompiledRate({self.text!r}, kind={self.kind!r}, components={self.components!r})"
+
+
+def _convert(quantity: Optional[float], unit: Optional[str], rate_unit: str) -> float:
+    """A quantity in ``unit`` expressed in ``rate_unit``."""
+    if quantity is None:
+        raise ValueError(f"A quantity in {rate_unit} is needed for this rate")
+    if unit is None:
+        return quantity
+    unit = normalize_unit(unit)
+    if unit == rate_unit:
+        return quantity
+    source = UNIT_DIMENSIONS.get(unit)
+    target = UNIT_DIMENSIONS.get(rate_unit)
+    if source is None or target is None or source[0] != target[0]:
+        raise ValueError(f"Cannot apply a quantity in {unit} to a rate per {rate_unit}")
+    return quantity * source[1] / target[1]
+
+
+@lru_cache(maxsize=4096)
+def _from_json(data: str, text: str) -> CompiledRate:
+    compiled = json.loads(data)
+    return CompiledRate(text, compiled['kind'], compiled['components'],
+                        compiled.get('minimum'), compiled.get('maximum'), compiled.get('exact', True))
+
+
+def _parse_term(term: str) -> Tuple[Optional[tuple], bool, Optional[float]]:
+    """One '+'-separated term: (component, understood, minimum per unit)."""
+    match = PERCENT_RE.match(term)
+    if match:
+        basis, understood = _basis(match.group(2))
+        return ('ad_valorem', _number(match.group(1)), None, basis), understood, None
+    
+    match = SPECIFIC_RE.match(term)
+    if not match:
+        return None, False, None
+    dollars, amount, cents, unit, each, tail = match.groups()
+    amount = round(_number(amount) / (100.0 if cents else 1.0), 10)
+    if dollars and cents:
+        return None, False, None
+    unit = normalize_unit(unit if unit else 'each')
+    
+    minimum = None
+    understood = True
+    if tail.strip().startswith('less'):
+        # Sugar polarity scales: the rate at 100 degrees, with its floor
+        found = MINIMUM_RE.search(tail)
+        if found:
+            minimum = round(_number(found.group(2)) / (100.0 if found.group(3) else 1.0), 10)
+        return ('specific', amount, unit, None), False, minimum
+    
+    basis, understood = _basis(tail)
+    if unit == 'kg' and 'clean' in term:
+        basis = 'clean'
+    if each and each != 'each':
+        basis, understood = 'other piece or part', False
+    return ('specific', amount, unit, basis), understood, minimum
+
+
+@lru_cache(maxsize=16384)
+def compile_rate(text: str) -> CompiledRate:
+    """
+    Compile one published rate (not a special-program list; see
+    parse_special_rate). Text that cannot be read as components, such as
+    "The rate applicable to the article of which it is a part", compiles to
+    a 'reference' rate. ``exact`` is False when part of the text (a sliding
+    scale, a cap worded in prose) is not reflected in the components; caps
+    are never compiled into ``maximum`` (see CompiledRate).
+    """
+    cleaned = clean_rate_text(text)
+    if not cleaned:
+        return CompiledRate(text, 'reference', exact=False)
+    if cleaned.lower().startswith('free'):
+        return CompiledRate(text, 'free', exact=cleaned.lower() == 'free')
+    
+    exact = True
+    maximum_clause = re.search(r',?\s*but if .*shall not exceed.*$', cleaned)
+    if maximum_clause:
+        cleaned = cleaned[:maximum_clause.start()]
+        exact = False
+    
+    components = []
+    minimum = None
+    for term in cleaned.split('+'):
+        term = term.strip()
+        if not term:
+            continue
+        component, understood, term_minimum = _parse_term(term)
+        if component is None:
+            return CompiledRate(text, 'reference', exact=False)
+        components.append(component)
+        exact = exact and understood
+        if term_minimum is not None:
+            minimum = term_minimum
+    
+    types = {component[0] for component in components}
+    if types == {'ad_valorem'}:
+        kind = 'ad_valorem'
+    elif types == {'specific'}:
+        kind = 'specific'
+    else:
+        kind = 'compound'
+    return CompiledRate(text, kind, components, minimum=minimum, exact=exact)
+
+
+def parse_special_rate(text: str) -> List[Tuple[CompiledRate, List[str]]]:
+    """
+    Split a special rate column into (rate, program codes) groups:
+    "Free (A+,AU,BH) 3.5% (KR)" -> [(Free, ['A+', 'AU', 'BH']), (3.5%, ['KR'])].
+    A cross-reference such as "See 9822.05.20 (P+)" becomes a 'reference' group.
+    """
+    cleaned = clean_rate_text(text)
+    groups = []
+    for match in SPECIAL_GROUP_RE.finditer(cleaned):
+        codes = [code.strip() for code in match.group(2).split(',') if code.strip()]
+        groups.append((compile_rate(match.group(1)), codes))
+    if not groups and cleaned:
+        groups.append((compile_rate(cleaned), []))
+    return groups
+
+
+def compiled_rate_from_row(row: Dict[str, Any]) -> CompiledRate:
+    """CompiledRate for a duty_rates row, compiling the text for rows loaded before rate_components existed."""
+    if row.get('rate_components'):
+        return CompiledRate.from_json(row['rate_components'], row.get('rate_description') or '')
+    return compile_rate(row.get('rate_description') or '')
+
+
+class DutyRatesLoader:
+    """
+    Keeps duty_rates in step with the rates published on national_lines.
+    
+    Rows are never rewritten in place: a rate whose text or programs
+    changed gets its current row closed (expiry_date set) and a new row
+    from today, so duty_rates keeps the rate history of every line.
+    """
+    
+    INSERT_SQL = f"""
+        INSERT INTO duty_rates (
+            country_id, classification_type, classification_id, classification_code, rate_type,
+            ad_valorem_rate, specific_rate, compound_rate, rate_description,
+            minimum_rate, maximum_rate, effective_date, {', '.join(COMPILED_COLUMNS)}
+        ) VALUES ({', '.join('?' for _ in range(12 + len(COMPILED_COLUMNS)))})
+    """
+    
+    def __init__(self, db: HTSDatabase):
+        self.db = db
+    
+    def ensure_schema(self) -> bool:
+        """
+        Create duty_rates if missing, or upgrade one created by
+        enhanced_schema_v2.sql: allow the 'column_2' rate type and add the
+        compiled columns. Returns True when the table was created or
+        upgraded, so the caller can backfill it.
+        """
+        changed = not self.db.table_exists('duty_rates')
+        index_programs = not self.db.table_exists('duty_rate_programs')
+        self.db.create_tables(SCHEMA_FILE)
+        
+        conn = self.db.connect()
+        cursor = conn.cursor()
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'duty_rates'")
+        table_sql = cursor.fetchone()[0]
+        if "'column_2'" not in table_sql:
+            self._rebuild_table(table_sql.replace("'countervailing')", "'countervailing', 'column_2')"))
+            changed = True
+        
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(duty_rates)")}
+        for column, column_type in COMPILED_COLUMNS.items():
+            if column not in existing:
+                conn.execute(f"ALTER TABLE duty_rates ADD COLUMN {column} {column_type}")
+                changed = True
+        
+        # duty_rate_programs was added after duty_rates; fill it once
+        if index_programs and not changed:
+            self._index_programs(cursor)
+        conn.commit()
+        return changed
+    
+    @staticmethod
+    def _index_programs(cursor, after_rate_id: int = 0) -> int:
+        """Add duty_rate_programs rows for the program codes of rates newer than ``after_rate_id``."""
+        cursor.execute("""
+            INSERT OR IGNORE INTO duty_rate_programs (rate_id, classification_code, program_code, program, is_free)
+            SELECT d.rate_id, d.classification_code, p.value, rtrim(p.value, '+*'), d.rate_kind = 'free'
+            FROM duty_rates d, json_each(d.program_codes) p
+            WHERE d.rate_id > ? AND d.program_codes IS NOT NULL
+        """, (after_rate_id,))
+        return cursor.rowcount
+    
+    def _rebuild_table(self, table_sql: str):
+        """
+        Recreate duty_rates from new CREATE TABLE text, keeping its rows and
+        indexes: SQLite cannot change a CHECK constraint in place.
+        """
+        conn = self.db.connect()
+        cursor = conn.cursor()
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'duty_rates' AND sql IS NOT NULL")
+        indexes = [row[0] for row in cursor.fetchall()]
+        columns = ', '.join(row[1] for row in conn.execute("PRAGMA table_info(duty_rates)"))
+        
+        # Views over duty_rates (v_trade_summary) must not be rewritten by the rename
+        conn.execute("PRAGMA legacy_alter_table = ON")
+        try:
+            cursor.execute(re.sub(r'CREATE TABLE\s+(IF NOT EXISTS\s+)?duty_rates', 'CREATE TABLE duty_rates_rebuild',
+                                  table_sql, count=1))
+            cursor.execute(f"INSERT INTO duty_rates_rebuild ({columns}) SELECT {columns} FROM duty_rates")
+            cursor.execute("DROP TABLE duty_rates")
+            cursor.execute("ALTER TABLE duty_rates_rebuild RENAME TO duty_rates")
+            for index_sql in indexes:
+                cursor.execute(index_sql)
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        finally:
+            conn.execute("PRAGMA legacy_alter_table = OFF")
+        logger.info("duty_rates rebuilt to accept column 2 rates")
+    
+    def _country_id(self) -> Optional[int]:
+        """countries row of the United States, when the database has one."""
+        if not self.db.table_exists('countries'):
+            return None
+        cursor = self.db.connect().cursor()
+        cursor.execute("SELECT country_id FROM countries WHERE country_code = 'US'")
+        row = cursor.fetchone()
+        return row[0] if row else None
+    
+    @staticmethod
+    def _rate_key(code: str, rate_type: str, text: str, program_codes: Optional[str]) -> tuple:
+        """
+        Identity of a rate row: a special-column group is also identified by
+        its programs, as its text alone ("Free") does not change when a
+        program is added to or removed from the group.
+        """
+        return code, rate_type, text, tuple(sorted(json.loads(program_codes))) if program_codes else ()
+    
+    @staticmethod
+    def rate_rows(line: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """duty_rates values for the rates published on one national line."""
+        rows = []
+        for column, rate_type in RATE_COLUMNS.items():
+            text = clean_rate_text(line.get(column))
+            if not text:
+                continue
+            groups = parse_special_rate(text) if rate_type == 'preferential' else [(compile_rate(text), [])]
+            for compiled, programs in groups:
+                specific = compiled.specific
+                rows.append({
+                    'classification_type': f"national_{line['code_level']}",
+                    'classification_id': line['line_id'],
+                    'classification_code': line['hts_code'],
+                    'rate_type': rate_type,
+                    'ad_valorem_rate': compiled.ad_valorem_percent,
+                    'specific_rate': ' + '.join(
+                        f"{amount:g}/{unit}" for kind, amount, unit, _ in compiled.components if kind == 'specific'
+                    ) or None,
+                    'compound_rate': clean_rate_text(compiled.text) if compiled.kind == 'compound' else None,
+                    'rate_description': clean_rate_text(compiled.text),
+                    'minimum_rate': compiled.minimum,
+                    'maximum_rate': compiled.maximum,
+                    'rate_kind': compiled.kind,
+                    'specific_amount': specific[1] if specific else None,
+                    'specific_unit': specific[2] if specific else None,
+                    'rate_components': compiled.to_json(),
+                    'program_codes': json.dumps(programs) if programs else None,
+                })
+        return rows
+    
+    def sync(self, chapter_code: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Bring the current duty_rates rows of one chapter (or all of them) in
+        line with national_lines. Lines that inherit their rates from the
+        8-digit parent get no rows of their own.
+        """
+        start = time.time()
+        conn = self.db.connect()
+        cursor = conn.cursor()
+        results = {'inserted': 0, 'expired': 0}
+        today = date.today().isoformat()
+        country_id = self._country_id()
+        
+        line_filter = "WHERE rates_inherited = 0" + (" AND chapter_code = ?" if chapter_code else "")
+        code_filter = "AND classification_code LIKE ? || '%'" if chapter_code else ""
+        params = (chapter_code,) if chapter_code else ()
+        
+        # Inside a caller's transaction, work under a savepoint and leave the
+        # commit (or rollback) of that transaction to the caller
+        owns_transaction = not conn.in_transaction
+        cursor.execute("BEGIN" if owns_transaction else "SAVEPOINT duty_rates_sync")
+        try:
+            
+            cursor.execute(f"""
+                SELECT line_id, hts_code, code_level, general_rate, special_rate, other_rate
+                FROM national_lines {line_filter}
+            """, params)
+            columns = [description[0] for description in cursor.description]
+            wanted = {}
+            for values in cursor.fetchall():
+                for row in self.rate_rows(dict(zip(columns, values))):
+                    wanted[self._rate_key(row['classification_code'], row['rate_type'],
+                                          row['rate_description'], row['program_codes'])] = row
+            
+            cursor.execute(f"""
+                SELECT rate_id, classification_code, rate_type, rate_description, program_codes, rate_components
+                FROM duty_rates
+                WHERE classification_type IN ('national_8', 'national_10') AND expiry_date IS NULL {code_filter}
+            """, params)
+            current = {}
+            compiled_forms = {}
+            for rate_id, code, rate_type, text, program_codes, components in cursor.fetchall():
+                current[self._rate_key(code, rate_type, text, program_codes)] = rate_id
+                compiled_forms[rate_id] = components
+            
+            expired = [(today, rate_id) for key, rate_id in current.items() if key not in wanted]
+            cursor.executemany("UPDATE duty_rates SET expiry_date = ? WHERE rate_id = ?", expired)
+            results['expired'] = len(expired)
+            
+            # Same text compiled differently by a newer compiler: the compiled
+            # columns are derived data, so they are refreshed in place
+            recompiled = [tuple(wanted[key][column] for column in RECOMPILED_COLUMNS) + (rate_id,)
+                          for key, rate_id in current.items()
+                          if key in wanted and compiled_forms[rate_id] != wanted[key]['rate_components']]
+            cursor.executemany(f"""
+                UPDATE duty_rates SET {', '.join(f'{column} = ?' for column in RECOMPILED_COLUMNS)}
+                WHERE rate_id = ?
+            """, recompiled)
+            results['recompiled'] = len(recompiled)
+            
+            cursor.execute("SELECT COALESCE(MAX(rate_id), 0) FROM duty_rates")
+            last_rate_id = cursor.fetchone()[0]
+            new_rows = [row for key, row in wanted.items() if key not in current]
+            cursor.executemany(self.INSERT_SQL, [
+                (country_id, row['classification_type'], row['classification_id'], row['classification_code'],
+                 row['rate_type'], row['ad_valorem_rate'], row['specific_rate'], row['compound_rate'],
+                 row['rate_description'], row['minimum_rate'], row['maximum_rate'], today,
+                 *(row[column] for column in COMPILED_COLUMNS))
+                for row in new_rows
+            ])
+            results['inserted'] = len(new_rows)
+            results['programs'] = self._index_programs(cursor, last_rate_id)
+            if owns_transaction:
+                conn.commit()
+            else:
+                cursor.execute("RELEASE SAVEPOINT duty_rates_sync")
+        except sqlite3.Error:
+            if owns_transaction:
+                conn.rollback()
+            else:
+                cursor.execute("ROLLBACK TO SAVEPOINT duty_rates_sync")
+                cursor.execute("RELEASE SAVEPOINT duty_rates_sync")
+            raise
+        
+        results['current'] = len(wanted)
+        results['duration_seconds'] = round(time.time() - start, 2)
+        logger.info(f"Duty rates synced{f' for chapter {chapter_code}' if chapter_code else ''}: "
+                    f"{results['inserted']:,} added, {results['expired']:,} expired, "
+                    f"{results['recompiled']:,} recompiled")
+        return results
+    
+    def rates_for(self, hts_code: str, rate_type: str = 'general',
+                  as_of: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Rates of a code (digits, with or without dots) on a date, default
+        today. A 10-digit line without rates of its own falls back to its
+        8-digit line. Each row carries its CompiledRate under 'compiled'.
+        """
+        digits = re.sub(r'\D', '', hts_code)
+        as_of = as_of or date.today().isoformat()
+        cursor = self.db.connect().cursor()
+        for code in dict.fromkeys((digits, digits[:8])):
+            cursor.execute("""
+                SELECT * FROM duty_rates
+                WHERE classification_code = ? AND rate_type = ?
+                  AND effective_date <= ? AND (expiry_date IS NULL OR expiry_date > ?)
+                ORDER BY rate_id
+            """, (code, rate_type, as_of, as_of))
+            columns = [description[0] for description in cursor.description]
+            rows = [dict(zip(columns, values)) for values in cursor.fetchall()]
+            if rows:
+                for row in rows:
+                    row['compiled'] = compiled_rate_from_row(row)
+                return rows
+        return []
@@ -0,0 +1,279 @@
+"""
+As-of lookups over duty_rates and trade_restrictions.
+
+Both tables give every row an effective_date and an optional expiry_date.
+EffectiveDateIndex turns the rows of each key (a code and rate type, or a
+code prefix) into sorted breakpoint dates with the rows in force between
+consecutive breakpoints, so "what applied on date D" is one bisect. AsOfLookup
+keeps these indexes in process and answers single or batched (code, date)
+queries without SQL per query.
+
+Dates are ISO strings ('2024-07-01'), which sort chronologically. A row is
+in force from its effective_date up to, but not including, its expiry_date.
+
+DutyRatesLoader.sync() stamps new rows with the date they were loaded, as
+the published rate columns carry no effective dates of their own. Rate
+history therefore starts at the first build: a date before it finds no
+rates rather than today's rates presented as historic ones.
+"""
+
+import bisect
+import json
+import logging
+import re
+import sqlite3
+import time
+from datetime import date
+from typing import Dict, List, Any, Optional, Iterable, Tuple, Hashable
+
+from utils.database import table_exists
+from utils.duty_rates import compiled_rate_from_row
+
+logger = logging.getLogger(__name__)
+
+# Open ends of an interval
+BEGINNING = '0000-01-01'
+END_OF_TIME = '9999-12-31'
+
+# Lengths of the code prefixes restrictions are attached to (chapter, heading, subheading)
+RESTRICTION_PREFIX_LENGTHS = (2, 4, 6)
+
+
+class EffectiveDateIndex:
+    """
+    Interval index: for each key, sorted breakpoints and the tuple of rows in
+    force from each breakpoint to the next. Overlapping rows (several
+    special-program groups of one line) are all returned.
+    """
+    
+    def __init__(self):
+        self._rows: Dict[Hashable, List[Tuple[str, str, Any]]] = {}
+        self._breakpoints: Dict[Hashable, List[str]] = {}
+        self._active: Dict[Hashable, List[tuple]] = {}
+        self.size = 0
+    
+    def add(self, key: Hashable, effective: Optional[str], expiry: Optional[str], row: Any):
+        """Add a row in force from ``effective`` (None: always) until ``expiry`` (None: open)."""
+        self._rows.setdefault(key, []).append((effective or BEGINNING, expiry or END_OF_TIME, row))
+        self.size += 1
+    
+    def build(self) -> 'EffectiveDateIndex':
+        """Precompute the breakpoints of every key; call once after the last add()."""
+        for key, rows in self._rows.items():
+            points = sorted({start for start, _, _ in rows} | {end for _, end, _ in rows})
+            active = []
+            for point in points:
+                active.append(tuple(row for start, end, row in rows if start <= point < end))
+            self._breakpoints[key] = points
+            self._active[key] = active
+        self._rows.clear()
+        return self
+    
+    def lookup(self, key: Hashable, as_of: str) -> tuple:
+        """Rows of ``key`` in force on ``as_of``."""
+        points = self._breakpoints.get(key)
+        if not points:
+            return ()
+        position = bisect.bisect_right(points, as_of) - 1
+        return self._active[key][position] if position >= 0 else ()
+    
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._breakpoints
+    
+    def __len__(self) -> int:
+        return len(self._breakpoints)
+
+
+def _table_fingerprint(conn, table: str, id_column: str) -> str:
+    """Row count, newest row and expiry markers of a table, to notice when it changed."""
+    if not table_exists(conn, table):
+        return ''
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT COUNT(*), MAX({id_column}), COUNT(expiry_date), MAX(expiry_date), MAX(effective_date)
+        FROM {table}
+    """)
+    return ':'.join(str(value) for value in cursor.fetchone())
+
+
+class AsOfLookup:
+    """
+    Rates and restrictions in force on a date, from indexes built once per
+    process and rebuilt when the underlying table changes (see refresh()).
+    """
+    
+    def __init__(self, conn):
+        self.conn = conn
+        self.rates = EffectiveDateIndex()
+        self.restrictions = EffectiveDateIndex()
+        self._fingerprints = {}
+        self.refresh()
+    
+    def refresh(self, force: bool = False) -> bool:
+        """Rebuild the indexes whose table changed since they were built; True if any was."""
+        rebuilt = False
+        fingerprint = _table_fingerprint(self.conn, 'duty_rates', 'rate_id')
+        if force or fingerprint != self._fingerprints.get('duty_rates'):
+            self.rates = self._build_rates()
+            self._fingerprints['duty_rates'] = fingerprint
+            rebuilt = True
+        
+        fingerprint = _table_fingerprint(self.conn, 'trade_restrictions', 'restriction_id')
+        if force or fingerprint != self._fingerprints.get('trade_restrictions'):
+            self.restrictions = self._build_restrictions()
+            self._fingerprints['trade_restrictions'] = fingerprint
+            rebuilt = True
+        return rebuilt
+    
+    def _build_rates(self) -> EffectiveDateIndex:
+        """Index duty_rates by (classification_code, rate_type)."""
+        start = time.time()
+        index = EffectiveDateIndex()
+        if not _table_fingerprint(self.conn, 'duty_rates', 'rate_id'):
+            return index.build()
+        
+        cursor = self.conn.cursor()
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(duty_rates)")}
+        optional = [column for column in ('rate_components', 'program_codes') if column in columns]
+        cursor.execute(f"""
+            SELECT rate_id, classification_code, rate_type, rate_description, ad_valorem_rate,
+                   effective_date, expiry_date{''.join(', ' + column for column in optional)}
+            FROM duty_rates
+        """)
+        names = [description[0] for description in cursor.description]
+        for values in cursor.fetchall():
+            row = dict(zip(names, values))
+            row['compiled'] = compiled_rate_from_row(row)
+            row['program_codes'] = json.loads(row['program_codes']) if row.get('program_codes') else []
+            index.add((row['classification_code'], row['rate_type']),
+                      row.pop('effective_date'), row.pop('expiry_date'), row)
+        
+        index.build()
+        logger.info(f"Duty rate date index built: {index.size:,} rates over {len(index):,} keys "
+                    f"in {time.time() - start:.2f}s")
+        return index
+    
+    def _restriction_prefixes(self) -> Dict[str, Dict[int, List[str]]]:
+        """Code prefixes of each record a restriction can be attached to, by classification_type."""
+        cursor = self.conn.cursor()
+        sources = {
+            'chapter': "SELECT chapter_id, chapter_code FROM chapters",
+            'heading': "SELECT heading_id, heading_code FROM headings",
+            'subheading': "SELECT subheading_id, subheading_code FROM subheadings",
+            'product': """SELECT p.product_id, sh.subheading_code FROM products p
+                          JOIN subheadings sh ON sh.subheading_id = p.subheading_id""",
+            'section': """SELECT c.section_id, c.chapter_code FROM chapters c""",
+        }
+        prefixes: Dict[str, Dict[int, List[str]]] = {}
+        for classification_type, select_sql in sources.items():
+            try:
+                cursor.execute(select_sql)
+            except sqlite3.Error as e:
+                logger.debug(f"No {classification_type} codes for restrictions: {e}")
+                continue
+            for record_id, code in cursor.fetchall():
+                prefixes.setdefault(classification_type, {}).setdefault(record_id, []).append(
+                    re.sub(r'\D', '', code or ''))
+        return prefixes
+    
+    def _build_restrictions(self) -> EffectiveDateIndex:
+        """Index active trade_restrictions by the code prefix they apply to."""
+        start = time.time()
+        index = EffectiveDateIndex()
+        if not _table_fingerprint(self.conn, 'trade_restrictions', 'restriction_id'):
+            return index.build()
+        
+        prefixes = self._restriction_prefixes()
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT r.restriction_id, r.classification_type, r.classification_id, r.restriction_type,
+                   r.restriction_category, r.title, r.legal_authority, r.effective_date, r.expiry_date,
+                   c.country_code
+            FROM trade_restrictions r
+            LEFT JOIN countries c ON c.country_id = r.country_id
+            WHERE COALESCE(r.is_active, 1) = 1
+        """)
+        names = [description[0] for description in cursor.description]
+        for values in cursor.fetchall():
+            row = dict(zip(names, values))
+            effective, expiry = row.pop('effective_date'), row.pop('expiry_date')
+            for prefix in prefixes.get(row['classification_type'], {}).get(row['classification_id'], []):
+                if prefix:
+                    index.add(prefix, effective, expiry, row)
+        
+        index.build()
+        logger.info(f"Trade restriction date index built: {index.size:,} entries over {len(index):,} "
+                    f"code prefixes in {time.time() - start:.2f}s")
+        return index
+    
+    def rates_on(self, hts_code: str, as_of: Optional[str] = None, rate_type: str = 'general') -> tuple:
+        """
+        Rates of a code in force on a date (default today); a 10-digit line
+        without rates of its own falls back to its 8-digit line.
+        """
+        digits = re.sub(r'\D', '', hts_code)
+        as_of = as_of or date.today().isoformat()
+        rows = self.rates.lookup((digits, rate_type), as_of)
+        if not rows and len(digits) > 8:
+            rows = self.rates.lookup((digits[:8], rate_type), as_of)
+        return rows
+    
+    def restrictions_on(self, hts_code: str, as_of: Optional[str] = None,
+                        country_code: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Restrictions in force on a date for a code, gathered from its chapter,
+        heading and subheading (and products classified there), optionally
+        only those of one country.
+        """
+        digits = re.sub(r'\D', '', hts_code)
+        as_of = as_of or date.today().isoformat()
+        found = {}
+        for length in RESTRICTION_PREFIX_LENGTHS:
+            if len(digits) < length:
+                break
+            for row in self.restrictions.lookup(digits[:length], as_of):
+                if country_code is None or row['country_code'] == country_code:
+                    found[row['restriction_id']] = row
+        return list(found.values())
+    
+    def rates_batch(self, queries: Iterable[Tuple[str, str]], rate_type: str = 'general') -> List[tuple]:
+        """
+        Rates for many (code, date) pairs, e.g. the lines of historic entries
+        under audit, with the same fallback as rates_on(): a 10-digit line
+        without rates in force on the date falls back to its 8-digit line.
+        Codes are normalized once per distinct code, so the cost per pair is
+        one or two bisects.
+        """
+        keys: Dict[str, Tuple[Hashable, Optional[Hashable]]] = {}
+        results = []
+        for hts_code, as_of in queries:
+            code_keys = keys.get(hts_code)
+            if code_keys is None:
+                digits = re.sub(r'\D', '', hts_code)
+                code_keys = keys[hts_code] = ((digits, rate_type),
+                                              (digits[:8], rate_type) if len(digits) > 8 else None)
+            key, parent_key = code_keys
+            rows = self.rates.lookup(key, as_of)
+            if not rows and parent_key is not None:
+                rows = self.rates.lookup(parent_key, as_of)
+            results.append(rows)
+        return results
+    
+    def duty_batch(self, entries: Iterable[Dict[str, Any]], rate_type: str = 'general') -> List[Optional[float]]:
+        """
+        Duty at the rate in force on each entry's date: entries have hts_code,
+        entry_date, value and optionally quantity and unit. None where no rate
+        applied or the rate cannot be evaluated.
+        """
+        entries = list(entries)
+        rates = self.rates_batch(((entry['hts_code'], entry['entry_date']) for entry in entries), rate_type)
+        duties = []
+        for entry, rows in zip(entries, rates):
+            duty = None
+            if rows:
+                try:
+                    duty = rows[0]['compiled'].duty(float(entry['value']), entry.get('quantity'), entry.get('unit'))
+                except ValueError:
+                    duty = None
+            duties.append(duty)
+        return duties
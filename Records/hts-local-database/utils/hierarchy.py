@@ -0,0 +1,274 @@
+"""
+In-memory prefix trie over the HTS code hierarchy.
+
+Every chapter, heading, subheading and national line is a node keyed by its
+digits, so resolving a code to its ancestors, listing the descendants of a
+prefix or finding the nearest valid code for a partial code walks at most
+ten nodes instead of joining the hierarchy tables. The trie is loaded once
+from the database or from a JSON snapshot written by save().
+"""
+
+import json
+import logging
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Iterator, Any
+
+from utils.database import table_exists
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SNAPSHOT_PATH = "database/hierarchy_snapshot.json"
+
+# Level name of a record by the number of digits in its code
+LEVELS = {2: 'chapter', 4: 'heading', 6: 'subheading', 8: 'tariff_line', 10: 'statistical_line'}
+
+# Tables the trie is built from: (table, SELECT of code, record id, title)
+SOURCES = (
+    ('chapters', "SELECT chapter_code, chapter_id, title_en FROM chapters"),
+    ('headings', "SELECT heading_code, heading_id, title_en FROM headings"),
+    ('subheadings', "SELECT subheading_code, subheading_id, title_en FROM subheadings"),
+    ('national_lines', "SELECT hts_code, line_id, description FROM national_lines"),
+)
+
+
+def normalize_code(code: str) -> str:
+    """Digits of an HTS code, so '0101.21.00.10' and '0101210010' are the same key."""
+    return re.sub(r'\D', '', str(code or ''))
+
+
+class HierarchyNode:
+    """One digit position in the trie; ``code`` is set when a record ends here."""
+    
+    __slots__ = ('children', 'code', 'record_id', 'title', 'section')
+    
+    def __init__(self):
+        self.children = {}
+        self.code = None
+        self.record_id = None
+        self.title = None
+        self.section = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'code': self.code,
+            'level': LEVELS.get(len(self.code)),
+            'record_id': self.record_id,
+            'title': self.title,
+        }
+
+
+class HierarchyTrie:
+    """Prefix trie answering ancestor, descendant and nearest-code queries."""
+    
+    def __init__(self):
+        self.root = HierarchyNode()
+        self.sections: Dict[str, Dict[str, Any]] = {}
+        self.fingerprint = ''
+        self.size = 0
+    
+    def insert(self, code: str, record_id: Optional[int] = None, title: Optional[str] = None,
+               section: Optional[str] = None):
+        """Add or replace the record for a code."""
+        digits = normalize_code(code)
+        if not digits:
+            return
+        
+        node = self.root
+        for digit in digits:
+            child = node.children.get(digit)
+            if child is None:
+                child = node.children[digit] = HierarchyNode()
+            node = child
+        
+        if node.code is None:
+            self.size += 1
+        node.code = digits
+        node.record_id = record_id
+        node.title = title
+        if section is not None:
+            node.section = section
+    
+    def _walk(self, code: str) -> Iterator[HierarchyNode]:
+        """Nodes along the path of a code, for as many digits as the trie has."""
+        node = self.root
+        for digit in normalize_code(code):
+            node = node.children.get(digit)
+            if node is None:
+                return
+            yield node
+    
+    def find(self, code: str) -> Optional[Dict[str, Any]]:
+        """The record for exactly this code, or None."""
+        digits = normalize_code(code)
+        node = None
+        for node in self._walk(digits):
+            pass
+        if node is None or node.code != digits:
+            return None
+        return node.to_dict()
+    
+    def __contains__(self, code: str) -> bool:
+        return self.find(code) is not None
+    
+    def ancestors(self, code: str, include_self: bool = True) -> List[Dict[str, Any]]:
+        """
+        Records above a code from the section down, e.g. for 0101.21.00.10:
+        section I, chapter 01, heading 0101, subheading 010121, line 01012100.
+        Levels with no record in the database are skipped.
+        """
+        digits = normalize_code(code)
+        path = []
+        section = None
+        for node in self._walk(digits):
+            if node.section is not None:
+                section = node.section
+            if node.code is not None and (include_self or node.code != digits):
+                path.append(node.to_dict())
+        
+        if section in self.sections:
+            path.insert(0, self.sections[section])
+        return path
+    
+    def _subtree(self, code: str, max_digits: Optional[int] = None) -> Iterator[HierarchyNode]:
+        """Record nodes below a code (not the code itself), depth-first in code order."""
+        digits = normalize_code(code)
+        start = self.root
+        depth = 0
+        for start in self._walk(digits):
+            depth += 1
+        if depth < len(digits):
+            return
+        
+        stack = [(start, depth)]
+        while stack:
+            node, node_depth = stack.pop()
+            if node.code is not None and node is not start:
+                yield node
+            if max_digits is None or node_depth < max_digits:
+                for digit in sorted(node.children, reverse=True):
+                    stack.append((node.children[digit], node_depth + 1))
+    
+    def descendants(self, code: str, max_digits: Optional[int] = None) -> List[Dict[str, Any]]:
+        """All records below a code (not the code itself), in code order."""
+        return [node.to_dict() for node in self._subtree(code, max_digits)]
+    
+    def nearest(self, code: str) -> Optional[Dict[str, Any]]:
+        """
+        Nearest valid code for a partial or over-specific code: the code
+        itself if it exists, else its longest valid prefix, else (for a
+        prefix of valid codes such as '847') the first record below it.
+        """
+        best = None
+        for node in self._walk(code):
+            if node.code is not None:
+                best = node
+        if best is None:
+            best = next(self._subtree(code), None) if normalize_code(code) else None
+        return best.to_dict() if best is not None else None
+    
+    def rollup(self, values: Dict[str, float], level: str = 'heading') -> Dict[Optional[str], float]:
+        """
+        Sum values keyed by code up to their ancestor at ``level``; codes
+        with no such ancestor are summed under None.
+        """
+        totals: Dict[Optional[str], float] = {}
+        for code, value in values.items():
+            target = None
+            for node in self._walk(code):
+                if node.code is not None and LEVELS.get(len(node.code)) == level:
+                    target = node.code
+                    break
+            totals[target] = totals.get(target, 0) + value
+        return totals
+    
+    def codes(self, level: Optional[str] = None) -> Iterator[str]:
+        """Every record code, optionally only those of one level."""
+        for node in self._subtree(''):
+            if level is None or LEVELS.get(len(node.code)) == level:
+                yield node.code
+    
+    @staticmethod
+    def source_fingerprint(conn) -> str:
+        """Row counts and last update per source table, to detect a stale snapshot."""
+        cursor = conn.cursor()
+        parts = []
+        for table in ('sections',) + tuple(table for table, _ in SOURCES):
+            if not table_exists(conn, table):
+                continue
+            cursor.execute(f"SELECT COUNT(*), MAX(updated_at) FROM {table}")
+            count, updated = cursor.fetchone()
+            parts.append(f"{table}={count}@{updated}")
+        return ';'.join(parts)
+    
+    @classmethod
+    def from_database(cls, conn) -> 'HierarchyTrie':
+        """Build the trie from the hierarchy tables (national_lines if present)."""
+        start = time.time()
+        trie = cls()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT section_number, section_id, title_en FROM sections")
+        for number, section_id, title in cursor.fetchall():
+            trie.sections[number] = {'code': number, 'level': 'section', 'record_id': section_id, 'title': title}
+        
+        cursor.execute("""
+            SELECT c.chapter_code, s.section_number FROM chapters c
+            JOIN sections s ON c.section_id = s.section_id
+        """)
+        chapter_sections = dict(cursor.fetchall())
+        
+        for table, select_sql in SOURCES:
+            if not table_exists(conn, table):
+                continue
+            cursor.execute(select_sql)
+            for code, record_id, title in cursor.fetchall():
+                trie.insert(code, record_id, title, chapter_sections.get(code) if table == 'chapters' else None)
+        
+        trie.fingerprint = cls.source_fingerprint(conn)
+        logger.info(f"Hierarchy trie loaded: {trie.size:,} codes in {time.time() - start:.2f}s")
+        return trie
+    
+    def save(self, path: str = DEFAULT_SNAPSHOT_PATH):
+        """Write the trie as a JSON snapshot."""
+        records = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node.code is not None:
+                records.append([node.code, node.record_id, node.title, node.section])
+            stack.extend(node.children.values())
+        
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'fingerprint': self.fingerprint, 'sections': self.sections, 'records': records},
+                      f, ensure_ascii=False)
+        logger.info(f"Hierarchy snapshot saved to {path}")
+    
+    @classmethod
+    def load(cls, path: str = DEFAULT_SNAPSHOT_PATH) -> 'HierarchyTrie':
+        """Read a snapshot written by save()."""
+        with open(path, encoding='utf-8') as f:
+            snapshot = json.load(f)
+        
+        trie = cls()
+        trie.sections = snapshot['sections']
+        trie.fingerprint = snapshot['fingerprint']
+        for code, record_id, title, section in snapshot['records']:
+            trie.insert(code, record_id, title, section)
+        return trie
+    
+    @classmethod
+    def load_or_build(cls, conn, path: str = DEFAULT_SNAPSHOT_PATH) -> 'HierarchyTrie':
+        """Load the snapshot, rebuilding and saving it if the hierarchy tables changed."""
+        if Path(path).exists():
+            trie = cls.load(path)
+            if trie.fingerprint == cls.source_fingerprint(conn):
+                return trie
+            logger.info("Hierarchy snapshot is out of date, rebuilding")
+        
+        trie = cls.from_database(conn)
+        trie.save(path)
+        return trie
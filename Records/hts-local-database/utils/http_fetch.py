@@ -0,0 +1,218 @@
+"""
+HTTP fetch layer for the official data sources (USITC, WITS).
+
+Fetcher wraps one requests.Session with a connection pool sized for
+parallel fetching and urllib3 retries on transient errors. It spaces
+requests to a global rate across all threads and keeps every response in an
+on-disk HTTP cache. A later GET of a cached URL is sent with If-None-Match
+/ If-Modified-Since, so an unchanged source answers 304 and the cached body
+is reused instead of downloading it again.
+
+Modes:
+
+- 'live': fetch from the network, caching successful responses.
+- 'record': as live, but every response (404s too) is kept so that a
+  replay sees exactly what the live run saw.
+- 'replay': never touch the network; serve the recorded responses and
+  raise ReplayMissError for URLs that were not recorded.
+
+``stand_in`` sends all requests to a local server instead
+(https://hts.usitc.gov/api/x -> <stand_in>/hts.usitc.gov/api/x); cache
+entries stay keyed by the original URL.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, Optional, Iterable
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+FETCH_MODES = ('live', 'record', 'replay')
+
+DEFAULT_USER_AGENT = 'HTS-Database-Builder/2.0 (Academic Research)'
+
+# Response headers kept in the cache
+CACHED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Cache-Control')
+
+
+class ReplayMissError(LookupError):
+    """A URL requested in replay mode has no recorded response."""
+
+
+class FetchResult:
+    """A fetched (or cached) response: the subset of requests.Response the extractors use."""
+    
+    __slots__ = ('url', 'status_code', 'content', 'headers', 'from_cache', 'not_modified')
+    
+    def __init__(self, url: str, status_code: int, content: bytes, headers: Dict[str, str],
+                 from_cache: bool = False, not_modified: bool = False):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.from_cache = from_cache
+        self.not_modified = not_modified
+    
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', errors='replace')
+    
+    def json(self) -> Any:
+        """Decoded JSON body; raises json.JSONDecodeError like requests does."""
+        return json.loads(self.content)
+
+
+class HTTPCache:
+    """Responses on disk: <sha256 of URL>.json (status, headers) and .body, one pair per URL."""
+    
+    def __init__(self, cache_dir: str = "data/http_cache"):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+    
+    def _paths(self, url: str):
+        key = hashlib.sha256(url.encode()).hexdigest()
+        return self.cache_dir / f"{key}.json", self.cache_dir / f"{key}.body"
+    
+    def get(self, url: str) -> Optional[FetchResult]:
+        meta_path, body_path = self._paths(url)
+        if not meta_path.exists() or not body_path.exists():
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            content = body_path.read_bytes()
+        except (json.JSONDecodeError, IOError) as e:
+            logger.warning(f"Ignoring unreadable cached response for {url}: {e}")
+            return None
+        return FetchResult(url, meta['status_code'], content, meta.get('headers', {}), from_cache=True)
+    
+    def put(self, url: str, status_code: int, content: bytes, headers: Dict[str, str]) -> None:
+        meta_path, body_path = self._paths(url)
+        try:
+            # Body first: a metadata file always has its body next to it
+            body_path.write_bytes(content)
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump({'url': url, 'status_code': status_code, 'headers': headers,
+                           'fetched_at': time.time()}, f, indent=2)
+        except IOError as e:
+            logger.error(f"Failed to cache response for {url}: {e}")
+
+
+class _RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across all threads."""
+    
+    def __init__(self, requests_per_second: Optional[float]):
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self.next_slot = 0.0
+        self._lock = threading.Lock()
+    
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class Fetcher:
+    """Pooled, rate-limited, conditional GETs with an on-disk cache and record/replay."""
+    
+    def __init__(self, cache_dir: str = "data/http_cache", mode: str = 'live',
+                 requests_per_second: Optional[float] = 1.0, max_workers: int = 8,
+                 pool_size: int = 16, retries: int = 2, stand_in: Optional[str] = None,
+                 user_agent: str = DEFAULT_USER_AGENT):
+        if mode not in FETCH_MODES:
+            raise ValueError(f"Unknown fetch mode: {mode} (choose from {', '.join(FETCH_MODES)})")
+        self.mode = mode
+        self.cache = HTTPCache(cache_dir)
+        self.max_workers = max_workers
+        self.stand_in = stand_in.rstrip('/') if stand_in else None
+        self.limiter = _RateLimiter(requests_per_second)
+        self.stats = {'requests': 0, 'not_modified': 0, 'replayed': 0, 'errors': 0}
+        self._lock = threading.Lock()
+        
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': user_agent})
+        retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=('GET', 'HEAD'), respect_retry_after_header=True)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+    
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+    
+    def _target(self, url: str) -> str:
+        """URL actually requested: the original or its path on the stand-in server."""
+        if not self.stand_in:
+            return url
+        parts = urlsplit(url)
+        return f"{self.stand_in}/{parts.netloc}{parts.path}" + (f"?{parts.query}" if parts.query else "")
+    
+    def get(self, url: str, timeout: float = 15) -> FetchResult:
+        """GET a URL, revalidating a cached copy; raises ReplayMissError in replay mode when not recorded."""
+        cached = self.cache.get(url)
+        if self.mode == 'replay':
+            if cached is None:
+                raise ReplayMissError(f"No recorded response for {url}")
+            self._count('replayed')
+            return cached
+        
+        headers = {}
+        if cached is not None and cached.status_code == 200:
+            if cached.headers.get('ETag'):
+                headers['If-None-Match'] = cached.headers['ETag']
+            if cached.headers.get('Last-Modified'):
+                headers['If-Modified-Since'] = cached.headers['Last-Modified']
+        
+        self.limiter.wait()
+        self._count('requests')
+        try:
+            response = self.session.get(self._target(url), headers=headers, timeout=timeout)
+        except requests.RequestException:
+            self._count('errors')
+            raise
+        
+        if response.status_code == 304 and cached is not None:
+            self._count('not_modified')
+            cached.not_modified = True
+            return cached
+        
+        kept = {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+        if response.status_code == 200 or self.mode == 'record':
+            self.cache.put(url, response.status_code, response.content, kept)
+        return FetchResult(url, response.status_code, response.content, kept)
+    
+    def fetch_many(self, urls: Iterable[str], timeout: float = 15) -> Dict[str, Any]:
+        """
+        GET many URLs in parallel under the global rate limit. Each URL maps
+        to its FetchResult, or to the exception raised fetching it.
+        """
+        urls = list(dict.fromkeys(urls))
+        
+        def fetch(url):
+            try:
+                return self.get(url, timeout)
+            except Exception as e:
+                logger.debug(f"Failed to fetch {url}: {e}")
+                return e
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return dict(zip(urls, executor.map(fetch, urls)))
+    
+    def close(self) -> None:
+        self.session.close()
@@ -0,0 +1,272 @@
+"""
+Duty and landed cost for whole shipment manifests.
+
+The compiled rates of every code in a manifest are read from duty_rates in
+one query (see utils/duty_rates.py). Each line then gets the general rate, or
+the cheapest special-program rate its country of origin qualifies for, or
+the column 2 rate for column 2 countries; ad valorem and specific duty are
+computed for all lines at once as NumPy arrays. Rates that NumPy cannot
+express (components charged on part of the goods, minimums) are evaluated
+line by line with CompiledRate.duty().
+
+NumPy is only needed when this calculator is used.
+"""
+
+import json
+import logging
+import re
+import time
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Iterable, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from utils.database import table_exists
+from utils.duty_rates import CompiledRate, UNIT_DIMENSIONS, compiled_rate_from_row, normalize_unit
+from utils.special_programs import program_indicator
+
+logger = logging.getLogger(__name__)
+
+# Origins charged the column 2 rate (Cuba, North Korea, Russia, Belarus)
+COLUMN_2_COUNTRIES = frozenset({'CU', 'KP', 'RU', 'BY'})
+
+# Partner countries of the special program indicators with a fixed membership.
+# Programs with long beneficiary lists (A: GSP, D: AGOA, E: CBERA, R: CBTPA)
+# are taken from trade_agreements, which also overrides these defaults.
+# Indicators are matched as published: a line listing "A+" or "A*" is only
+# open to the countries trade_agreements lists under that exact code, not
+# to every country of "A".
+DEFAULT_PROGRAM_COUNTRIES = {
+    'AU': ('AU',),
+    'BH': ('BH',),
+    'CA': ('CA',),
+    'CL': ('CL',),
+    'CO': ('CO',),
+    'IL': ('IL',),
+    'JO': ('JO',),
+    'JP': ('JP',),
+    'KR': ('KR',),
+    'MA': ('MA',),
+    'MX': ('MX',),
+    'OM': ('OM',),
+    'P': ('CR', 'DO', 'GT', 'HN', 'NI', 'SV'),
+    'PA': ('PA',),
+    'PE': ('PE',),
+    'S': ('CA', 'MX'),
+    'SG': ('SG',),
+}
+
+
+def require_numpy():
+    """Fail with an actionable message when NumPy is missing."""
+    if np is None:
+        raise ImportError("The landed cost calculator requires numpy: pip install numpy")
+
+
+def load_program_countries(conn) -> Dict[str, frozenset]:
+    """
+    Country codes eligible under each program indicator: the defaults above,
+    overridden by trade_agreements rows whose agreement_code is an indicator.
+    """
+    programs = {code: frozenset(countries) for code, countries in DEFAULT_PROGRAM_COUNTRIES.items()}
+    if not table_exists(conn, 'trade_agreements'):
+        return programs
+    
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT agreement_code, member_countries FROM trade_agreements
+        WHERE COALESCE(status, 'active') = 'active'
+    """)
+    for code, members in cursor.fetchall():
+        try:
+            programs[program_indicator(code)] = frozenset(json.loads(members or '[]'))
+        except json.JSONDecodeError:
+            logger.warning(f"trade_agreements {code}: member_countries is not a JSON array")
+    return programs
+
+
+@lru_cache(maxsize=1024)
+def unit_factor(unit: Optional[str], rate_unit: str) -> float:
+    """Multiplier turning a quantity in ``unit`` into ``rate_unit``; NaN when they measure different things."""
+    if unit is None:
+        return 1.0
+    unit = normalize_unit(unit)
+    if unit == rate_unit:
+        return 1.0
+    source = UNIT_DIMENSIONS.get(unit)
+    target = UNIT_DIMENSIONS.get(rate_unit)
+    if source is None or target is None or source[0] != target[0]:
+        return float('nan')
+    return source[1] / target[1]
+
+
+def _vector_terms(rate: CompiledRate) -> Optional[Tuple[float, float, Optional[str]]]:
+    """
+    (ad valorem fraction, dollars per unit, unit) when the rate is a plain
+    sum over the whole value and one quantity; None when it needs
+    CompiledRate.duty().
+    """
+    if rate.kind == 'reference' or rate.minimum is not None or rate.maximum is not None:
+        return None
+    specific = [c for c in rate.components if c[0] == 'specific']
+    if any(basis is not None for _, _, _, basis in rate.components) or len({c[2] for c in specific}) > 1:
+        return None
+    amount = sum(c[1] for c in specific)
+    return rate.ad_valorem, amount, specific[0][2] if specific else None
+
+
+class LandedCostCalculator:
+    """Batch duty calculation over manifests of (code, value, quantity, unit, origin) lines."""
+    
+    def __init__(self, conn):
+        require_numpy()
+        self.conn = conn
+        self.program_countries = load_program_countries(conn)
+    
+    def load_rates(self, codes: Iterable[str]) -> Dict[str, Dict[str, list]]:
+        """
+        Current rates for a set of codes (and their 8-digit lines) in one
+        query: {code: {'general': [rows], 'preferential': [rows], 'column_2': [rows]}}.
+        Each row is (CompiledRate, program codes).
+        """
+        wanted = set()
+        for code in codes:
+            wanted.add(code)
+            wanted.add(code[:8])
+        
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT classification_code, rate_type, rate_description, rate_components, program_codes
+            FROM duty_rates
+            WHERE classification_code IN (SELECT value FROM json_each(?))
+              AND rate_type IN ('general', 'preferential', 'column_2')
+              AND expiry_date IS NULL
+            ORDER BY rate_id
+        """, (json.dumps(sorted(wanted)),))
+        
+        rates: Dict[str, Dict[str, list]] = {}
+        for code, rate_type, description, components, programs in cursor.fetchall():
+            compiled = compiled_rate_from_row({'rate_description': description, 'rate_components': components})
+            rates.setdefault(code, {}).setdefault(rate_type, []).append(
+                (compiled, json.loads(programs) if programs else [])
+            )
+        return rates
+    
+    def _candidates(self, rates: Dict[str, list], origin: Optional[str]) -> List[Tuple[str, Optional[str], CompiledRate]]:
+        """(rate_type, program, rate) options open to goods from ``origin``."""
+        if origin in COLUMN_2_COUNTRIES and rates.get('column_2'):
+            return [('column_2', None, rates['column_2'][0][0])]
+        
+        candidates = [('general', None, rate) for rate, _ in rates.get('general', [])[:1]]
+        if origin:
+            for rate, programs in rates.get('preferential', []):
+                if rate.kind == 'reference':
+                    continue
+                program = next((p for p in programs if origin in self.program_countries.get(p, ())), None)
+                if program is not None:
+                    candidates.append(('preferential', program, rate))
+        return candidates
+    
+    def calculate(self, lines: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Duty per line and for the manifest. Each line has hts_code, value,
+        quantity, unit and origin (ISO alpha-2); freight and insurance, when
+        given, are added to the landed cost. Lines whose rate cannot be
+        evaluated (no rate, a reference rate, a quantity in the wrong unit)
+        get duty None and are counted in 'unrated'.
+        """
+        start = time.time()
+        count = len(lines)
+        codes = [re.sub(r'\D', '', str(line['hts_code'])) for line in lines]
+        values = np.array([float(line.get('value') or 0) for line in lines], dtype=np.float64)
+        quantities = np.array([float(line['quantity']) if line.get('quantity') is not None else np.nan
+                               for line in lines], dtype=np.float64)
+        extras = np.array([float(line.get('freight') or 0) + float(line.get('insurance') or 0)
+                           for line in lines], dtype=np.float64)
+        
+        rates = self.load_rates(set(codes))
+        
+        # Candidate rates are resolved once per distinct (code, origin, unit)
+        # and laid out as columns: one row per line, one column per candidate
+        resolved: Dict[tuple, list] = {}
+        line_candidates = []
+        for code, line in zip(codes, lines):
+            origin = (line.get('origin') or '').upper() or None
+            unit = line.get('unit')
+            key = (code, origin, unit)
+            if key not in resolved:
+                # Each rate column falls back to the 8-digit line on its own
+                own, parent = rates.get(code, {}), rates.get(code[:8], {})
+                code_rates = {rate_type: own.get(rate_type) or parent.get(rate_type) or []
+                              for rate_type in ('general', 'preferential', 'column_2')}
+                resolved[key] = self._candidates(code_rates, origin)
+            line_candidates.append(resolved[key])
+        
+        width = max((len(candidates) for candidates in line_candidates), default=0)
+        ad_valorem = np.zeros((count, width))
+        specific = np.zeros((count, width))
+        factors = np.ones((count, width))
+        has_rate = np.zeros((count, width), dtype=bool)
+        scalar = []  # (line, column) pairs needing CompiledRate.duty()
+        
+        for i, (candidates, line) in enumerate(zip(line_candidates, lines)):
+            for j, (_, _, rate) in enumerate(candidates):
+                terms = _vector_terms(rate)
+                if terms is None:
+                    if rate.kind != 'reference':
+                        scalar.append((i, j))
+                    continue
+                ad_valorem[i, j], specific[i, j], rate_unit = terms
+                if rate_unit is not None:
+                    factors[i, j] = unit_factor(line.get('unit'), rate_unit)
+                has_rate[i, j] = True
+        
+        # Specific duty on a line without a usable quantity is NaN and the
+        # candidate is dropped, unless its specific amount is zero
+        specific_duty = np.where(specific != 0, specific * quantities[:, None] * factors, 0.0)
+        duties = values[:, None] * ad_valorem + specific_duty
+        duties[~has_rate] = np.nan
+        
+        for i, j in scalar:
+            quantity = None if np.isnan(quantities[i]) else quantities[i]
+            try:
+                duties[i, j] = line_candidates[i][j][2].duty(values[i], quantity, lines[i].get('unit'))
+            except ValueError:
+                duties[i, j] = np.nan
+        
+        # Cheapest usable candidate per line
+        usable = ~np.isnan(duties)
+        rated = usable.any(axis=1) if width else np.zeros(count, dtype=bool)
+        best = np.argmin(np.where(usable, duties, np.inf), axis=1) if width else np.zeros(count, dtype=int)
+        line_duty = np.where(rated, duties[np.arange(count), best] if width else 0.0, np.nan)
+        
+        results = []
+        for i, line in enumerate(lines):
+            rate_type, program, rate = line_candidates[i][best[i]] if rated[i] else (None, None, None)
+            results.append({
+                'hts_code': codes[i],
+                'origin': line.get('origin'),
+                'value': float(values[i]),
+                'rate_type': rate_type,
+                'program': program,
+                'rate': rate.text if rate else None,
+                'duty': round(float(line_duty[i]), 2) if rated[i] else None,
+                'landed_cost': round(float(values[i] + extras[i] + line_duty[i]), 2) if rated[i] else None,
+            })
+        
+        total_duty = float(np.nansum(line_duty))
+        summary = {
+            'lines': results,
+            'line_count': count,
+            'unrated': int(count - rated.sum()),
+            'total_value': round(float(values.sum()), 2),
+            'total_duty': round(total_duty, 2),
+            'total_landed_cost': round(float(values.sum() + extras.sum()) + total_duty, 2),
+            'duration_seconds': round(time.time() - start, 4),
+        }
+        logger.info(f"Landed cost for {count:,} lines: duty {summary['total_duty']:,.2f} "
+                    f"({summary['unrated']:,} unrated) in {summary['duration_seconds']}s")
+        return summary
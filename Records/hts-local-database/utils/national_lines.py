@@ -0,0 +1,499 @@
+"""
+Ingestion of 8-digit tariff lines and 10-digit statistical lines
+from the USITC chapter files (HTS/Section_*/Chapter_*/chapter-*.json).
+"""
+
+import csv
+import hashlib
+import json
+import logging
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterable
+
+from utils.database import HTSDatabase
+from utils.duty_rates import DutyRatesLoader
+from utils.search_index import SearchIndex
+
+logger = logging.getLogger(__name__)
+
+# Default location of the chapter files, relative to hts-local-database/
+DEFAULT_SOURCE_DIR = "../../HTS"
+SCHEMA_FILE = "schema/sql/sqlite/national_lines.sql"
+MANIFEST_PATH = "data/csv/manifest_v2.json"
+
+# national_lines columns written by the loader, in parameter order
+LINE_COLUMNS = (
+    'hts_code', 'hts_display', 'code_level', 'chapter_code', 'heading_code',
+    'subheading_code', 'parent_code', 'superior_id', 'indent', 'description',
+    'full_description', 'units', 'general_rate', 'special_rate', 'other_rate',
+    'rates_inherited', 'footnotes', 'quota_quantity', 'additional_duties',
+    'source_file', 'source_row'
+)
+
+SUPERIOR_COLUMNS = (
+    'chapter_code', 'source_row', 'parent_code', 'parent_superior_id',
+    'indent', 'description', 'source_file'
+)
+
+# Column headers used by the USITC CSV export
+CSV_COLUMNS = {
+    'HTS Number': 'htsno',
+    'Indent': 'indent',
+    'Description': 'description',
+    'Unit of Quantity': 'units',
+    'General Rate of Duty': 'general',
+    'Special Rate of Duty': 'special',
+    'Column 2 Rate of Duty': 'other',
+    'Quota Quantity': 'quotaQuantity',
+    'Additional Duties': 'additionalDuties',
+}
+
+CHAPTER_FILE_RE = re.compile(r'chapter-(\d{2})')
+
+
+def find_chapter_files(source_dir: str = DEFAULT_SOURCE_DIR) -> List[Path]:
+    """Find one source file per chapter directory, preferring JSON over CSV."""
+    files = []
+    for chapter_dir in sorted(Path(source_dir).glob("Section_*/Chapter_*")):
+        json_files = sorted(chapter_dir.glob("chapter-*.json"))
+        csv_files = sorted(chapter_dir.glob("chapter-*.csv"))
+        if json_files:
+            files.append(json_files[0])
+        elif csv_files:
+            files.append(csv_files[0])
+        else:
+            logger.debug(f"No chapter data file in {chapter_dir}")
+    return files
+
+
+def source_key(path) -> str:
+    """Manifest key for a chapter file: its Section_*/Chapter_*/file path."""
+    return '/'.join(Path(path).parts[-3:])
+
+
+def file_sha256(path) -> str:
+    """Content hash of a source file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest_sources(manifest_path: str = MANIFEST_PATH) -> Dict[str, Dict]:
+    """Read the per-file hashes recorded by the previous build, if any."""
+    path = Path(manifest_path)
+    if not path.exists():
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('source_files', {})
+    except (json.JSONDecodeError, OSError) as e:
+        logger.warning(f"Could not read source hashes from {path}: {e}")
+        return {}
+
+
+def save_manifest_sources(source_files: Dict[str, Dict], manifest_path: str = MANIFEST_PATH):
+    """Record per-file hashes in the manifest, keeping its other sections."""
+    path = Path(manifest_path)
+    manifest = {}
+    if path.exists():
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    
+    manifest['source_files'] = source_files
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+
+def _upsert_sql(table: str, columns: tuple, key: tuple) -> str:
+    """INSERT ... ON CONFLICT that only rewrites rows whose values changed."""
+    updated = [c for c in columns if c not in key]
+    return f"""
+        INSERT INTO {table} ({', '.join(columns)})
+        VALUES ({', '.join('?' for _ in columns)})
+        ON CONFLICT ({', '.join(key)}) DO UPDATE SET
+            {', '.join(f'{c} = excluded.{c}' for c in updated)}
+        WHERE ({', '.join(f'{table}.{c}' for c in updated)})
+            IS NOT ({', '.join(f'excluded.{c}' for c in updated)})
+    """
+
+
+def _read_rows(path: Path) -> List[Dict]:
+    """Read raw rows from a chapter JSON or CSV file in a common shape."""
+    if path.suffix.lower() == '.json':
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    rows = []
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        for record in csv.DictReader(f):
+            row = {key: record.get(column, '') for column, key in CSV_COLUMNS.items()}
+            try:
+                row['units'] = json.loads(row['units']) if row['units'] else []
+            except json.JSONDecodeError:
+                row['units'] = [row['units']]
+            row['footnotes'] = []
+            rows.append(row)
+    return rows
+
+
+def parse_chapter_file(path: str) -> Dict[str, Any]:
+    """
+    Parse one chapter file into national lines and superior lines.
+    
+    The files list every line in document order with an ``indent`` level, so the
+    parent of a line is the closest preceding line with a smaller indent. A stack
+    of open ancestors rebuilds that tree in a single pass. Runs in worker
+    processes, so it only takes and returns plain picklable values.
+    """
+    path = Path(path)
+    rows = _read_rows(path)
+    
+    chapter_code = None
+    for row in rows:
+        digits = (row.get('htsno') or '').replace('.', '')
+        if len(digits) >= 2:
+            chapter_code = digits[:2]
+            break
+    if chapter_code is None:
+        match = CHAPTER_FILE_RE.search(path.name)
+        chapter_code = match.group(1) if match else None
+    
+    lines = []
+    superiors = []
+    stack = []  # Open ancestors: dicts with indent, code, description, rates, superior_row
+    
+    for source_row, row in enumerate(rows, start=1):
+        try:
+            indent = int(row.get('indent') or 0)
+        except (TypeError, ValueError):
+            indent = 0
+        
+        while stack and stack[-1]['indent'] >= indent:
+            stack.pop()
+        
+        display = (row.get('htsno') or '').strip()
+        code = display.replace('.', '')
+        description = ' '.join((row.get('description') or '').split())
+        
+        numbered_parent = next((a for a in reversed(stack) if a['code']), None)
+        parent_code = numbered_parent['code'] if numbered_parent else None
+        
+        # A superior line directly above this one groups it below the numbered parent
+        superior_row = stack[-1]['superior_row'] if stack else None
+        
+        node = {
+            'indent': indent,
+            'code': code or None,
+            'description': description,
+            'rates': None,
+            'superior_row': source_row if not code else None,
+        }
+        
+        if not code:
+            superiors.append({
+                'chapter_code': chapter_code,
+                'parent_code': parent_code,
+                'parent_superior_row': superior_row,
+                'indent': indent,
+                'description': description,
+                'source_row': source_row,
+            })
+        elif len(code) in (8, 10):
+            rates = (row.get('general') or '', row.get('special') or '', row.get('other') or '')
+            rates_inherited = False
+            if not any(rates):
+                rate_parent = next((a for a in reversed(stack) if a['rates']), None)
+                if rate_parent:
+                    rates = rate_parent['rates']
+                    rates_inherited = True
+            elif len(code) == 8:
+                node['rates'] = rates
+            
+            path_descriptions = [a['description'] for a in stack if a['description']]
+            units = [unit for unit in (row.get('units') or []) if unit]
+            
+            lines.append({
+                'hts_code': code,
+                'hts_display': display,
+                'code_level': len(code),
+                'chapter_code': code[:2],
+                'heading_code': code[:4],
+                'subheading_code': code[:6],
+                'parent_code': parent_code,
+                'superior_row': superior_row,
+                'indent': indent,
+                'description': description,
+                'full_description': ' > '.join(path_descriptions + [description]),
+                'units': units,
+                'general_rate': rates[0],
+                'special_rate': rates[1],
+                'other_rate': rates[2],
+                'rates_inherited': rates_inherited,
+                'footnotes': row.get('footnotes') or [],
+                'quota_quantity': row.get('quotaQuantity') or None,
+                'additional_duties': row.get('additionalDuties') or None,
+                'source_row': source_row,
+            })
+        elif len(code) not in (4, 6):
+            logger.warning(f"{path.name} row {source_row}: unexpected code length {display!r}")
+        
+        stack.append(node)
+    
+    return {
+        'chapter_code': chapter_code,
+        'source_file': str(path),
+        'lines': lines,
+        'superiors': superiors,
+    }
+
+
+class NationalLinesLoader:
+    """
+    Loads parsed chapter files into the national_lines and superior_lines tables.
+    
+    Chapters are upserted rather than replaced: unchanged rows are left alone
+    (so their updated_at stays put), changed rows are rewritten and rows that
+    disappeared from the file are deleted.
+    """
+    
+    LINE_UPSERT_SQL = _upsert_sql('national_lines', LINE_COLUMNS, ('hts_code',))
+    SUPERIOR_UPSERT_SQL = _upsert_sql('superior_lines', SUPERIOR_COLUMNS, ('chapter_code', 'source_row'))
+    
+    def __init__(self, db: HTSDatabase, batch_size: int = None):
+        self.db = db
+        self.batch_size = batch_size
+        self.duty_rates = DutyRatesLoader(db)
+    
+    def ensure_schema(self, schema_file: str = SCHEMA_FILE):
+        """
+        Create the national lines tables if they do not exist yet, and hook
+        them into the search index when that is installed. Compiled duty
+        rates are backfilled once for lines loaded before duty_rates existed.
+        """
+        self.db.create_tables(schema_file)
+        
+        SearchIndex(self.db).install_national_lines()
+        
+        if self.duty_rates.ensure_schema():
+            self.duty_rates.sync()
+    
+    def load_chapter(self, parsed: Dict[str, Any]) -> Dict[str, Any]:
+        """Upsert all lines of one chapter in a single transaction."""
+        conn = self.db.connect()
+        cursor = conn.cursor()
+        chapter_code = parsed['chapter_code']
+        source_file = parsed['source_file']
+        
+        owns_transaction = not conn.in_transaction
+        if owns_transaction:
+            cursor.execute("BEGIN")
+        try:
+            loaded = self._load_chapter_rows(cursor, parsed)
+            if owns_transaction:
+                conn.commit()
+        except Exception:
+            if owns_transaction:
+                conn.rollback()
+            raise
+        
+        for issue in loaded['errors']:
+            logger.error(f"Chapter {chapter_code}: failed to load line {issue['label']}: {issue['error']}")
+        
+        rates = self.duty_rates.sync(chapter_code)
+        
+        return {
+            'chapter_code': chapter_code,
+            'source_file': source_file,
+            'lines': loaded['success_count'],
+            'superior_lines': loaded['superior_lines'],
+            'deleted_lines': loaded['deleted_lines'],
+            'duty_rates': rates['inserted'],
+            'errors': loaded['errors'],
+        }
+    
+    def _load_chapter_rows(self, cursor, parsed: Dict[str, Any]) -> Dict[str, Any]:
+        """Superior and numbered lines of one chapter, written in the caller's transaction."""
+        chapter_code = parsed['chapter_code']
+        source_file = parsed['source_file']
+        
+        # Superior lines first; their IDs are needed to link the numbered lines.
+        # They have no code of their own, so they are keyed on their file position.
+        superior_ids = {}
+        for superior in parsed['superiors']:
+            cursor.execute(self.SUPERIOR_UPSERT_SQL, (
+                superior['chapter_code'],
+                superior['source_row'],
+                superior['parent_code'],
+                superior_ids.get(superior['parent_superior_row']),
+                superior['indent'],
+                superior['description'],
+                source_file
+            ))
+            cursor.execute(
+                "SELECT superior_id FROM superior_lines WHERE chapter_code = ? AND source_row = ?",
+                (chapter_code, superior['source_row'])
+            )
+            superior_ids[superior['source_row']] = cursor.fetchone()[0]
+        
+        # Drop rows that are no longer in the file. Numbered lines still pointing
+        # at a vanished superior line are unlinked here and relinked by the upsert.
+        cursor.execute("""
+            DELETE FROM national_lines
+            WHERE chapter_code = ? AND hts_code NOT IN (SELECT value FROM json_each(?))
+        """, (chapter_code, json.dumps([line['hts_code'] for line in parsed['lines']])))
+        deleted_lines = cursor.rowcount
+        stale_superiors = """
+            SELECT superior_id FROM superior_lines
+            WHERE chapter_code = ? AND source_row NOT IN (SELECT value FROM json_each(?))
+        """
+        stale_params = (chapter_code, json.dumps(list(superior_ids)))
+        cursor.execute(f"UPDATE national_lines SET superior_id = NULL WHERE superior_id IN ({stale_superiors})",
+                       stale_params)
+        cursor.execute(f"DELETE FROM superior_lines WHERE superior_id IN ({stale_superiors})", stale_params)
+        
+        rows = ((line['hts_code'], self._line_params(line, superior_ids, source_file))
+                for line in parsed['lines'])
+        results = self.db.executemany_batched(self.LINE_UPSERT_SQL, rows, self.batch_size)
+        results['superior_lines'] = len(superior_ids)
+        results['deleted_lines'] = deleted_lines
+        return results
+    
+    def delete_chapter(self, chapter_code: str) -> int:
+        """Remove all lines of a chapter whose source file has gone away."""
+        conn = self.db.connect()
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM national_lines WHERE chapter_code = ?", (chapter_code,))
+        deleted = cursor.rowcount
+        cursor.execute("DELETE FROM superior_lines WHERE chapter_code = ?", (chapter_code,))
+        conn.commit()
+        self.duty_rates.sync(chapter_code)
+        return deleted
+    
+    @staticmethod
+    def _line_params(line: Dict, superior_ids: Dict[int, int], source_file: str) -> tuple:
+        return (
+            line['hts_code'],
+            line['hts_display'],
+            line['code_level'],
+            line['chapter_code'],
+            line['heading_code'],
+            line['subheading_code'],
+            line['parent_code'],
+            superior_ids.get(line['superior_row']),
+            line['indent'],
+            line['description'],
+            line['full_description'],
+            json.dumps(line['units'], ensure_ascii=False),
+            line['general_rate'],
+            line['special_rate'],
+            line['other_rate'],
+            int(line['rates_inherited']),
+            json.dumps(line['footnotes'], ensure_ascii=False),
+            line['quota_quantity'],
+            line['additional_duties'],
+            source_file,
+            line['source_row']
+        )
+    
+    def _loaded_chapter_counts(self) -> Dict[str, int]:
+        cursor = self.db.connect().cursor()
+        cursor.execute("SELECT chapter_code, COUNT(*) FROM national_lines GROUP BY chapter_code")
+        return {row[0]: row[1] for row in cursor.fetchall()}
+    
+    def ingest(self, paths: Iterable[Path], workers: Optional[int] = None,
+               previous_sources: Optional[Dict[str, Dict]] = None) -> Dict[str, Any]:
+        """
+        Parse chapter files across a process pool and load each chapter as soon
+        as its parse finishes, so only a few parsed chapters are held at once.
+        
+        With ``previous_sources`` (the ``source_files`` section of the last
+        manifest) only files whose content hash changed are re-parsed, and
+        chapters whose file was removed are deleted.
+        """
+        start = time.time()
+        paths = [str(p) for p in paths]
+        summary = {
+            'chapters': 0,
+            'skipped_chapters': 0,
+            'lines': 0,
+            'superior_lines': 0,
+            'deleted_lines': 0,
+            'duty_rates': 0,
+            'error_count': 0,
+            'errors': [],
+            'chapter_results': [],
+            'source_files': {},
+        }
+        
+        self.ensure_schema()
+        
+        hashes = {source_key(p): file_sha256(p) for p in paths}
+        to_parse = paths
+        
+        if previous_sources is not None:
+            loaded = self._loaded_chapter_counts()
+            to_parse = []
+            for p in paths:
+                key = source_key(p)
+                previous = previous_sources.get(key)
+                unchanged = (
+                    previous is not None
+                    and previous.get('sha256') == hashes[key]
+                    and (loaded.get(previous.get('chapter_code'), 0) > 0 or not previous.get('lines'))
+                )
+                if unchanged:
+                    summary['source_files'][key] = previous
+                    summary['skipped_chapters'] += 1
+                else:
+                    to_parse.append(p)
+            
+            current_keys = set(hashes)
+            for key, previous in previous_sources.items():
+                if key not in current_keys and previous.get('chapter_code'):
+                    deleted = self.delete_chapter(previous['chapter_code'])
+                    summary['deleted_lines'] += deleted
+                    logger.info(f"Chapter {previous['chapter_code']}: source {key} removed, {deleted:,} lines deleted")
+            
+            logger.info(f"{len(to_parse)} of {len(paths)} chapter files changed since the last build")
+        
+        if to_parse:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for parsed in executor.map(parse_chapter_file, to_parse):
+                    if not parsed['chapter_code']:
+                        logger.warning(f"Skipping {parsed['source_file']}: chapter code not found")
+                        continue
+                    
+                    result = self.load_chapter(parsed)
+                    summary['chapters'] += 1
+                    summary['lines'] += result['lines']
+                    summary['superior_lines'] += result['superior_lines']
+                    summary['deleted_lines'] += result['deleted_lines']
+                    summary['duty_rates'] += result['duty_rates']
+                    summary['error_count'] += len(result['errors'])
+                    summary['errors'].extend(result['errors'])
+                    summary['chapter_results'].append({
+                        key: value for key, value in result.items() if key != 'errors'
+                    })
+                    
+                    key = source_key(parsed['source_file'])
+                    summary['source_files'][key] = {
+                        'sha256': hashes[key],
+                        'chapter_code': result['chapter_code'],
+                        'lines': result['lines'],
+                        'superior_lines': result['superior_lines'],
+                    }
+                    logger.info(f"Chapter {result['chapter_code']}: {result['lines']:,} lines, "
+                                f"{result['superior_lines']:,} superior lines, "
+                                f"{result['deleted_lines']:,} removed")
+        
+        summary['source_files'] = dict(sorted(summary['source_files'].items()))
+        summary['duration_seconds'] = round(time.time() - start, 2)
+        logger.info(f"Loaded {summary['lines']:,} national lines from {summary['chapters']} chapters "
+                    f"({summary['skipped_chapters']} unchanged) in {summary['duration_seconds']}s")
+        return summary
@@ -10,15 +10,78 @@ from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 import re
 
+from utils.hierarchy import HierarchyTrie
+from utils.search_index import (
+    SEARCH_COLUMNS, TRIGRAM_COLUMNS, bm25_expression, fts_query, similarity, trigram_match_query
+)
+
 logger = logging.getLogger(__name__)
 
 
 class ProductManager:
     """Manages product data and classification in the HTS database."""
     
-    def __init__(self, db_connection: sqlite3.Connection):
+    # Markers around matched terms in snippets and highlights
+    HIGHLIGHT_MARKERS = ('<b>', '</b>')
+    SNIPPET_TOKENS = 12
+    
+    # Trigram candidates re-ranked per fuzzy query, and the similarity a hit needs
+    FUZZY_CANDIDATES = 200
+    FUZZY_MIN_SIMILARITY = 0.5
+    
+    # Documents that vote for a subheading when classifying a description,
+    # how many of the description's keywords are searched, and the search
+    # hits considered per query (or per keyword in a batch)
+    CLASSIFY_RECORD_TYPES = ('product', 'subheading', 'national_line')
+    CLASSIFY_KEYWORDS = 5
+    CLASSIFY_CANDIDATES = 200
+    
+    # Votes of the classification hits for the subheading their code falls
+    # under, with the title of the best hit of each subheading. Most national
+    # lines fall under subheadings missing from the subheadings table, whose
+    # votes still count and take that title instead.
+    CLASSIFY_VOTES_SQL = """
+        votes AS (
+            SELECT {partition} substr(d.code, 1, 6) AS subheading_code, d.record_type, hits.score,
+                   FIRST_VALUE(d.title_en) OVER (
+                       PARTITION BY {partition} substr(d.code, 1, 6) ORDER BY hits.score, hits.doc_id
+                   ) AS best_title
+            FROM hits
+            JOIN search_documents d ON d.doc_id = hits.doc_id
+            WHERE length(d.code) >= 6
+        )
+    """
+    CLASSIFY_ROLLUP_SQL = """
+        SELECT {input_id} v.subheading_code,
+               COALESCE(MIN(sh.title_en), MIN(v.best_title)) AS title_en,
+               COUNT(*) AS match_count,
+               CASE WHEN MAX(v.record_type = 'product') THEN 'product_match'
+                    ELSE 'classification_match' END AS match_type,
+               MIN(v.score) AS score
+        FROM votes v
+        LEFT JOIN subheadings sh ON sh.subheading_code = v.subheading_code
+        GROUP BY {input_id} v.subheading_code
+    """
+    
+    def __init__(self, db_connection: sqlite3.Connection, classifier=None,
+                 hierarchy: Optional[HierarchyTrie] = None):
+        """
+        ``classifier`` optionally replaces the SQL keyword path of the
+        classify_* methods with a model such as utils.tfidf_classifier.TfidfClassifier.
+        ``hierarchy`` shares an already loaded code trie; otherwise one is
+        built from the database on first use.
+        """
         self.conn = db_connection
         self.conn.row_factory = sqlite3.Row
+        self.classifier = classifier
+        self._hierarchy = hierarchy
+    
+    @property
+    def hierarchy(self) -> HierarchyTrie:
+        """Code hierarchy trie, loaded on first use."""
+        if self._hierarchy is None:
+            self._hierarchy = HierarchyTrie.from_database(self.conn)
+        return self._hierarchy
     
     def add_product(self, product_data: Dict) -> int:
         """Add a new product to the database."""
@@ -90,46 +153,240 @@ class ProductManager:
         return product_id
     
     def search_products(self, query: str, filters: Dict = None, limit: int = 50) -> List[Dict]:
-        """Search products using full-text search and filters."""
+        """Search products using full-text search and filters, best matches first."""
+        return self.search_products_page(query, filters, limit)['results']
+    
+    def search_products_page(self, query: str, filters: Dict = None, limit: int = 50,
+                             cursor: Optional[List] = None,
+                             weights: Optional[Dict[str, float]] = None,
+                             fuzzy: bool = False) -> Dict:
+        """
+        Search products and return one page of results plus the cursor for the next.
+        
+        With a query, products are ranked by bm25() with per-column weights and
+        carry a snippet and highlighted name; without one they are listed by name.
+        Pages are keyset-paginated: pass the returned ``next_cursor`` back in to
+        continue, which stays cheap however deep the page. The hierarchy join
+        only runs for the products on the returned page. With ``fuzzy``, a query
+        with no exact hits falls back to typo-tolerant matching on product names.
+        """
+        conditions, params = self._product_filter_conditions(filters)
+        
+        if query:
+            page = self._ranked_page(
+                query,
+                joins="""
+                    JOIN products p ON p.product_id = search_index.record_id
+                    JOIN subheadings sh ON sh.subheading_id = p.subheading_id
+                """,
+                conditions=["search_index.record_type = 'product'"] + conditions,
+                params=params,
+                limit=limit,
+                cursor=cursor,
+                weights=weights
+            )
+            next_cursor = page['next_cursor']
+            hits = {hit['record_id']: hit for hit in page['results']}
+            product_ids = list(hits)
+            
+            if fuzzy and not hits and not cursor:
+                similarities = {match['record_id']: match['similarity']
+                                for match in self.fuzzy_search(query, ['product'], self.FUZZY_CANDIDATES)}
+                if similarities and conditions:
+                    db_cursor = self.conn.cursor()
+                    db_cursor.execute(f"""
+                        SELECT p.product_id FROM products p
+                        JOIN subheadings sh ON sh.subheading_id = p.subheading_id
+                        WHERE p.product_id IN ({', '.join('?' for _ in similarities)})
+                          AND {' AND '.join(conditions)}
+                    """, list(similarities) + params)
+                    allowed = {row['product_id'] for row in db_cursor.fetchall()}
+                    similarities = {pid: score for pid, score in similarities.items() if pid in allowed}
+                
+                results = self._products_with_hierarchy(list(similarities)[:limit])
+                for product in results:
+                    product['similarity'] = similarities[product['product_id']]
+                return {'results': results, 'next_cursor': None}
+        else:
+            keyset = ""
+            if cursor:
+                keyset = "AND (p.product_name, p.product_id) > (?, ?)"
+                params = params + list(cursor)
+            where_clause = " AND ".join(conditions) or "1 = 1"
+            
+            db_cursor = self.conn.cursor()
+            db_cursor.execute(f"""
+                SELECT p.product_id, p.product_name
+                FROM products p
+                JOIN subheadings sh ON sh.subheading_id = p.subheading_id
+                WHERE {where_clause} {keyset}
+                ORDER BY p.product_name, p.product_id
+                LIMIT ?
+            """, params + [limit])
+            rows = db_cursor.fetchall()
+            hits = {}
+            product_ids = [row['product_id'] for row in rows]
+            next_cursor = [rows[-1]['product_name'], rows[-1]['product_id']] if len(rows) == limit else None
+        
+        results = []
+        for product in self._products_with_hierarchy(product_ids):
+            hit = hits.get(product['product_id'])
+            if hit:
+                product['score'] = hit['score']
+                product['snippet'] = hit['snippet']
+                product['name_highlight'] = hit['title_highlight']
+            results.append(product)
+        
+        return {'results': results, 'next_cursor': next_cursor}
+    
+    def search_catalog(self, query: str, record_types: Optional[List[str]] = None, limit: int = 20,
+                       cursor: Optional[List] = None,
+                       weights: Optional[Dict[str, float]] = None) -> Dict:
+        """
+        Ranked search across every indexed record type (sections through
+        national tariff lines and products), with snippets and keyset pagination.
+        """
+        conditions = []
+        params = []
+        if record_types:
+            conditions.append(f"search_index.record_type IN ({', '.join('?' for _ in record_types)})")
+            params.extend(record_types)
+        
+        return self._ranked_page(query, "", conditions, params, limit, cursor, weights)
+    
+    def fuzzy_search(self, query: str, record_types: Optional[List[str]] = None, limit: int = 20,
+                     min_similarity: float = None) -> List[Dict]:
+        """
+        Typo-tolerant search ("alumnium foil", "polyethylen") over titles,
+        alternative names and product names.
+        
+        Candidates come from the search_trigram index (every query word must
+        share a trigram with the candidate, or failing that any word may) and
+        are re-ranked by trigram similarity to the query. The CROSS JOIN keeps
+        the MATCH as the outer loop; otherwise SQLite may probe the trigram
+        index once per search_documents row.
+        """
+        min_similarity = self.FUZZY_MIN_SIMILARITY if min_similarity is None else min_similarity
+        match = trigram_match_query(query)
+        if not match:
+            return []
+        
+        type_filter = ""
+        params = []
+        if record_types:
+            type_filter = f"AND d.record_type IN ({', '.join('?' for _ in record_types)})"
+            params.extend(record_types)
+        
+        sql = f"""
+            SELECT d.doc_id, d.record_type, d.record_id, d.code, d.title_en,
+                   d.alternative_names, d.product_names
+            FROM search_trigram
+            CROSS JOIN search_documents d ON d.doc_id = search_trigram.rowid
+            WHERE search_trigram MATCH ? {type_filter}
+            ORDER BY search_trigram.rank
+            LIMIT ?
+        """
         cursor = self.conn.cursor()
+        cursor.execute(sql, [match] + params + [self.FUZZY_CANDIDATES])
+        candidates = cursor.fetchall()
+        if not candidates and ' AND ' in match:
+            cursor.execute(sql, [match.replace(' AND ', ' OR ')] + params + [self.FUZZY_CANDIDATES])
+            candidates = cursor.fetchall()
+        
+        results = []
+        for position, row in enumerate(candidates):
+            text = ' '.join(row[column] or '' for column in TRIGRAM_COLUMNS)
+            score = similarity(query, text)
+            if score >= min_similarity:
+                result = dict(row)
+                result['similarity'] = round(score, 4)
+                results.append((-score, position, result))
+        
+        results.sort(key=lambda item: item[:2])
+        return [result for _, _, result in results[:limit]]
+    
+    def _ranked_page(self, query: str, joins: str, conditions: List[str], params: List,
+                     limit: int, cursor: Optional[List], weights: Optional[Dict[str, float]]) -> Dict:
+        """One bm25-ranked page of search_index hits ordered by (score, doc_id)."""
+        where_clause = "".join(f" AND {condition}" for condition in conditions)
+        keyset = "WHERE (score, doc_id) > (?, ?)" if cursor else ""
+        sql = f"""
+            SELECT doc_id, record_type, record_id, score FROM (
+                SELECT search_index.rowid AS doc_id, search_index.record_type,
+                       search_index.record_id, {bm25_expression(weights)} AS score
+                FROM search_index {joins}
+                WHERE search_index MATCH ?{where_clause}
+            )
+            {keyset}
+            ORDER BY score, doc_id
+            LIMIT ?
+        """
         
-        # Build search query
-        search_conditions = []
+        db_cursor = self.conn.cursor()
+        match = query
+        try:
+            db_cursor.execute(sql, [match] + params + list(cursor or []) + [limit])
+        except sqlite3.OperationalError:
+            # Free text that is not valid FTS5 syntax ('1/2-inch', '12" pipe',
+            # 'horse-drawn'): match the words literally. Other errors recur below.
+            match = fts_query(query)
+            if match == query:
+                raise
+            if not match:
+                return {'results': [], 'next_cursor': None}
+            db_cursor.execute(sql, [match] + params + list(cursor or []) + [limit])
+        
+        hits = [dict(row) for row in db_cursor.fetchall()]
+        
+        # Snippets are only built for the rows on this page
+        if hits:
+            start, end = self.HIGHLIGHT_MARKERS
+            title_column = SEARCH_COLUMNS.index('title_en')
+            db_cursor.execute(f"""
+                SELECT rowid AS doc_id, code, title_en,
+                       snippet(search_index, -1, ?, ?, '…', ?) AS snippet,
+                       highlight(search_index, {title_column}, ?, ?) AS title_highlight
+                FROM search_index
+                WHERE search_index MATCH ? AND rowid IN ({', '.join('?' for _ in hits)})
+            """, [start, end, self.SNIPPET_TOKENS, start, end, match] + [hit['doc_id'] for hit in hits])
+            snippets = {row['doc_id']: dict(row) for row in db_cursor.fetchall()}
+            for hit in hits:
+                hit.update(snippets.get(hit['doc_id'], {}))
+        
+        next_cursor = [hits[-1]['score'], hits[-1]['doc_id']] if len(hits) == limit else None
+        return {'results': hits, 'next_cursor': next_cursor}
+    
+    def _product_filter_conditions(self, filters: Optional[Dict]) -> Tuple[List[str], List]:
+        """SQL conditions on products p / subheadings sh for search filters."""
+        conditions = []
         params = []
         
-        if query:
-            # Use FTS5 search
-            search_conditions.append("""
-                product_id IN (
-                    SELECT record_id FROM search_index 
-                    WHERE record_type = 'product' AND search_index MATCH ?
-                )
-            """)
-            params.append(query)
-        
-        # Apply filters
         if filters:
             if 'subheading_code' in filters:
-                search_conditions.append("sh.subheading_code = ?")
+                conditions.append("sh.subheading_code = ?")
                 params.append(filters['subheading_code'])
             
             if 'is_controlled' in filters:
-                search_conditions.append("p.is_controlled = ?")
+                conditions.append("p.is_controlled = ?")
                 params.append(filters['is_controlled'])
             
             if 'is_prohibited' in filters:
-                search_conditions.append("p.is_prohibited = ?")
+                conditions.append("p.is_prohibited = ?")
                 params.append(filters['is_prohibited'])
             
             if 'origin_country' in filters:
-                search_conditions.append("json_extract(p.origin_countries, '$[*]') LIKE ?")
-                params.append(f"%{filters['origin_country']}%")
+                conditions.append("EXISTS (SELECT 1 FROM json_each(p.origin_countries) WHERE value = ?)")
+                params.append(filters['origin_country'])
         
-        where_clause = ""
-        if search_conditions:
-            where_clause = "WHERE " + " AND ".join(search_conditions)
+        return conditions, params
+    
+    def _products_with_hierarchy(self, product_ids: List[int]) -> List[Dict]:
+        """Load products with their classification hierarchy, in the given order."""
+        if not product_ids:
+            return []
         
-        sql = f"""
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
             SELECT p.*, sh.subheading_code, sh.title_en as subheading_title,
                    c.chapter_code, c.title_en as chapter_title,
                    s.section_number, s.title_en as section_title
@@ -138,16 +395,11 @@ class ProductManager:
             JOIN headings h ON sh.heading_id = h.heading_id
             JOIN chapters c ON h.chapter_id = c.chapter_id
             JOIN sections s ON c.section_id = s.section_id
-            {where_clause}
-            ORDER BY p.product_name
-            LIMIT ?
-        """
-        params.append(limit)
+            WHERE p.product_id IN ({', '.join('?' for _ in product_ids)})
+        """, product_ids)
         
-        cursor.execute(sql, params)
-        results = cursor.fetchall()
-        
-        return [dict(row) for row in results]
+        products = {row['product_id']: dict(row) for row in cursor.fetchall()}
+        return [products[product_id] for product_id in product_ids if product_id in products]
     
     def get_product_details(self, product_id: int) -> Optional[Dict]:
         """Get complete product details including classification hierarchy."""
@@ -182,95 +434,214 @@ class ProductManager:
         
         return product
     
-    def classify_product_by_description(self, description: str) -> List[Dict]:
+    def classify_product_by_description(self, description: str, limit: int = 10) -> List[Dict]:
         """Suggest HTS classifications based on product description."""
+        if self.classifier is not None:
+            return self._model_classification([description], limit)[0]
+        
         cursor = self.conn.cursor()
         
         # Extract keywords from description
         keywords = self._extract_keywords(description)
+        if not keywords:
+            return []
+        
+        # Rank subheadings by their best-scoring product, subheading or
+        # national line document; any of the top keywords may match
+        match_query = ' OR '.join(fts_query(keyword) for keyword in keywords[:self.CLASSIFY_KEYWORDS])
+        record_types = ', '.join('?' for _ in self.CLASSIFY_RECORD_TYPES)
+        cursor.execute(f"""
+            WITH hits AS MATERIALIZED (
+                SELECT rowid AS doc_id, {bm25_expression()} AS score
+                FROM search_index
+                WHERE search_index MATCH ?
+                  AND record_type IN ({record_types})
+                ORDER BY score, rowid
+                LIMIT ?
+            ),
+            {self.CLASSIFY_VOTES_SQL.format(partition='')}
+            {self.CLASSIFY_ROLLUP_SQL.format(input_id='')}
+            ORDER BY score, match_count DESC, v.subheading_code
+            LIMIT ?
+        """, (match_query, *self.CLASSIFY_RECORD_TYPES, self.CLASSIFY_CANDIDATES, limit))
+        suggestions = [dict(row) for row in cursor.fetchall()]
         
-        # Search across multiple levels
-        suggestions = []
+        # Nothing matched exactly; the description is probably misspelled
+        return suggestions or self._fuzzy_classification(description, limit)
+    
+    def classify_batch(self, descriptions: List[str], limit: int = 10) -> List[List[Dict]]:
+        """
+        Suggest HTS classifications for many descriptions at once, such as
+        the lines of a commercial invoice.
+        
+        Each distinct description is tokenized once, and each distinct keyword
+        in the batch is looked up in search_index once: the (description,
+        keyword) pairs go into a temp table that a single query joins against
+        the index. The ranking is the one of classify_product_by_description():
+        bm25 of an OR query is the sum of each matching term's score, so
+        summing a document's keyword scores per description gives the score
+        of that description's OR query, and the same top candidates are
+        rolled up to subheadings. Descriptions without any hit fall back to
+        fuzzy matching there as well.
+        
+        Returns one list of suggestions per description, in input order.
+        """
+        if self.classifier is not None:
+            return self._model_classification(descriptions, limit)
         
-        # Search in products
-        for keyword in keywords[:5]:  # Limit to top 5 keywords
-            cursor.execute("""
-                SELECT DISTINCT sh.subheading_code, sh.title_en, 
-                       COUNT(*) as match_count,
-                       'product_match' as match_type
-                FROM products p
-                JOIN subheadings sh ON p.subheading_id = sh.subheading_id
-                WHERE p.product_name LIKE ? OR p.common_name LIKE ? OR p.description LIKE ?
-                GROUP BY sh.subheading_id
-                ORDER BY match_count DESC
-                LIMIT 5
-            """, (f"%{keyword}%", f"%{keyword}%", f"%{keyword}%"))
-            
-            suggestions.extend([dict(row) for row in cursor.fetchall()])
+        unique_descriptions = list(dict.fromkeys(descriptions))
+        terms = [(input_id, keyword)
+                 for input_id, description in enumerate(unique_descriptions)
+                 for keyword in self._extract_keywords(description)[:self.CLASSIFY_KEYWORDS]]
         
-        # Search in subheadings directly
-        query_terms = " ".join(keywords[:3])
+        owns_transaction = not self.conn.in_transaction
+        cursor = self.conn.cursor()
         cursor.execute("""
-            SELECT sh.subheading_code, sh.title_en, 
-                   1.0 as match_count,
-                   'classification_match' as match_type
-            FROM subheadings sh
-            WHERE sh.title_en MATCH ? OR sh.description MATCH ?
-            LIMIT 10
-        """, (query_terms, query_terms))
-        
-        suggestions.extend([dict(row) for row in cursor.fetchall()])
-        
-        # Remove duplicates and sort by relevance
+            CREATE TEMP TABLE IF NOT EXISTS classify_terms (
+                input_id INTEGER NOT NULL,
+                keyword TEXT NOT NULL
+            )
+        """)
+        cursor.execute("DELETE FROM temp.classify_terms")
+        cursor.executemany("INSERT INTO temp.classify_terms (input_id, keyword) VALUES (?, ?)", terms)
+        
+        record_types = ', '.join('?' for _ in self.CLASSIFY_RECORD_TYPES)
+        cursor.execute(f"""
+            WITH keywords AS (
+                SELECT DISTINCT keyword FROM temp.classify_terms
+            ),
+            keyword_hits AS MATERIALIZED (
+                SELECT k.keyword, search_index.rowid AS doc_id, {bm25_expression()} AS score
+                FROM keywords k
+                JOIN search_index ON search_index MATCH '"' || k.keyword || '"'
+                WHERE search_index.record_type IN ({record_types})
+            ),
+            input_hits AS (
+                SELECT t.input_id, h.doc_id, SUM(h.score) AS score
+                FROM temp.classify_terms t
+                JOIN keyword_hits h ON h.keyword = t.keyword
+                GROUP BY t.input_id, h.doc_id
+            ),
+            ranked_hits AS (
+                SELECT input_id, doc_id, score,
+                       ROW_NUMBER() OVER (PARTITION BY input_id ORDER BY score, doc_id) AS position
+                FROM input_hits
+            ),
+            hits AS (
+                SELECT input_id, doc_id, score FROM ranked_hits WHERE position <= ?
+            ),
+            {self.CLASSIFY_VOTES_SQL.format(partition='hits.input_id,')}
+            {self.CLASSIFY_ROLLUP_SQL.format(input_id='v.input_id,')}
+            ORDER BY v.input_id, score, match_count DESC, v.subheading_code
+        """, (*self.CLASSIFY_RECORD_TYPES, self.CLASSIFY_CANDIDATES))
+        
+        suggestions = {input_id: [] for input_id in range(len(unique_descriptions))}
+        for row in cursor.fetchall():
+            input_suggestions = suggestions[row['input_id']]
+            if len(input_suggestions) < limit:
+                input_suggestions.append({key: row[key] for key in row.keys() if key != 'input_id'})
+        
+        cursor.execute("DELETE FROM temp.classify_terms")
+        if owns_transaction:
+            self.conn.commit()
+        
+        keyword_inputs = {input_id for input_id, _ in terms}
+        for input_id in keyword_inputs:
+            if not suggestions[input_id]:
+                suggestions[input_id] = self._fuzzy_classification(unique_descriptions[input_id], limit)
+        
+        by_description = dict(zip(unique_descriptions, suggestions.values()))
+        return [list(by_description[description]) for description in descriptions]
+    
+    def _model_classification(self, descriptions: List[str], limit: int) -> List[List[Dict]]:
+        """Classify with self.classifier, rolling its code matches up to subheadings."""
+        # Several lines of one subheading may rank highly; ask for enough to fill limit
+        batch_matches = self.classifier.classify_batch(descriptions, top_k=limit * 5)
+        
+        results = []
+        for matches in batch_matches:
+            suggestions = {}
+            for match in matches:
+                code = match['hts_code'][:6]
+                if code in suggestions:
+                    suggestions[code]['match_count'] += 1
+                else:
+                    suggestions[code] = {'subheading_code': code, 'hts_code': match['hts_code'],
+                                         'title_en': match['title_en'], 'match_count': 1,
+                                         'match_type': 'model_match', 'score': match['score']}
+            results.append(list(suggestions.values())[:limit])
+        return results
+    
+    def _fuzzy_classification(self, description: str, limit: int) -> List[Dict]:
+        """Subheadings of the fuzzy matches for a description, best match first."""
         unique_suggestions = {}
-        for suggestion in suggestions:
-            code = suggestion['subheading_code']
-            if code not in unique_suggestions or suggestion['match_count'] > unique_suggestions[code]['match_count']:
-                unique_suggestions[code] = suggestion
+        matches = self.fuzzy_search(description, list(self.CLASSIFY_RECORD_TYPES), self.CLASSIFY_CANDIDATES)
+        for match in matches:
+            code = (match['code'] or '')[:6]
+            if len(code) < 6:
+                continue
+            if code in unique_suggestions:
+                unique_suggestions[code]['match_count'] += 1
+            else:
+                unique_suggestions[code] = {'subheading_code': code, 'match_count': 1,
+                                            'match_type': 'fuzzy_match', 'similarity': match['similarity'],
+                                            'title_en': match['title_en']}
+        
+        if not unique_suggestions:
+            return []
+        
+        # Subheading titles where the subheading exists, otherwise the best match's
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT subheading_code, title_en FROM subheadings
+            WHERE subheading_code IN (SELECT value FROM json_each(?))
+        """, (json.dumps(list(unique_suggestions)),))
+        for row in cursor.fetchall():
+            unique_suggestions[row['subheading_code']]['title_en'] = row['title_en']
         
-        return list(unique_suggestions.values())[:10]
+        return list(unique_suggestions.values())[:limit]
     
     def get_classification_guidance(self, subheading_code: str) -> Dict:
         """Get classification guidance for a specific subheading."""
         cursor = self.conn.cursor()
         
         # Get subheading details
-        cursor.execute("""
-            SELECT sh.*, h.heading_code, h.title_en as heading_title,
-                   c.chapter_code, c.title_en as chapter_title,
-                   s.section_number, s.title_en as section_title
-            FROM subheadings sh
-            JOIN headings h ON sh.heading_id = h.heading_id
-            JOIN chapters c ON h.chapter_id = c.chapter_id
-            JOIN sections s ON c.section_id = s.section_id
-            WHERE sh.subheading_code = ?
-        """, (subheading_code,))
-        
+        cursor.execute("SELECT * FROM subheadings WHERE subheading_code = ?", (subheading_code,))
         subheading = cursor.fetchone()
         if not subheading:
             return {}
         
+        # Resolve heading, chapter and section from the code trie
+        parents = {node['level']: node for node in self.hierarchy.ancestors(subheading_code, include_self=False)}
+        if not all(level in parents for level in ('section', 'chapter', 'heading')):
+            return {}
+        
         guidance = dict(subheading)
+        guidance.update({
+            'heading_code': parents['heading']['code'],
+            'heading_title': parents['heading']['title'],
+            'chapter_code': parents['chapter']['code'],
+            'chapter_title': parents['chapter']['title'],
+            'section_number': parents['section']['code'],
+            'section_title': parents['section']['title'],
+        })
         
         # Get notes at all levels (section, chapter, heading, subheading)
         cursor.execute("""
             SELECT cn.*, 'section' as level FROM classification_notes cn
-            JOIN sections s ON cn.reference_id = s.section_id
-            WHERE cn.reference_type = 'section' AND s.section_number = ?
+            WHERE cn.reference_type = 'section' AND cn.reference_id = ?
             UNION ALL
             SELECT cn.*, 'chapter' as level FROM classification_notes cn
-            JOIN chapters c ON cn.reference_id = c.chapter_id
-            WHERE cn.reference_type = 'chapter' AND c.chapter_code = ?
+            WHERE cn.reference_type = 'chapter' AND cn.reference_id = ?
             UNION ALL
             SELECT cn.*, 'heading' as level FROM classification_notes cn
-            JOIN headings h ON cn.reference_id = h.heading_id
-            WHERE cn.reference_type = 'heading' AND h.heading_code = ?
+            WHERE cn.reference_type = 'heading' AND cn.reference_id = ?
             UNION ALL
             SELECT cn.*, 'subheading' as level FROM classification_notes cn
             WHERE cn.reference_type = 'subheading' AND cn.reference_id = ?
             ORDER BY level, priority_level DESC, note_sequence
-        """, (guidance['section_number'], guidance['chapter_code'], 
-              guidance['heading_code'], guidance['subheading_id']))
+        """, (parents['section']['record_id'], parents['chapter']['record_id'],
+              parents['heading']['record_id'], guidance['subheading_id']))
         
         guidance['notes'] = [dict(row) for row in cursor.fetchall()]
         
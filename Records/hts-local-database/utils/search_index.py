@@ -0,0 +1,306 @@
+"""
+Full-text search index maintenance.
+
+The search_index FTS5 table reads its content from search_documents, which
+triggers on the source tables keep current (see schema/sql/sqlite/search_index.sql).
+This module installs that schema, backfills documents for existing records and
+runs the FTS5 maintenance commands after bulk loads.
+"""
+
+import logging
+import re
+import sqlite3
+import time
+from functools import lru_cache
+from typing import Dict, Any, Optional
+
+from utils.database import HTSDatabase
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_FILE = "schema/sql/sqlite/search_index.sql"
+NATIONAL_LINES_SCHEMA_FILE = "schema/sql/sqlite/search_index_national_lines.sql"
+
+# FTS5 column order of search_index, as used by bm25(), snippet() and highlight()
+SEARCH_COLUMNS = (
+    'record_type', 'record_id', 'code', 'title_en', 'description', 'keywords',
+    'alternative_names', 'notes_text', 'product_names', 'examples_text'
+)
+
+# Default bm25() column weights: a hit in a code, title or name counts for
+# more than the same hit somewhere in a long description or note
+DEFAULT_WEIGHTS = {
+    'code': 10.0,
+    'title_en': 5.0,
+    'product_names': 6.0,
+    'alternative_names': 4.0,
+    'keywords': 3.0,
+    'description': 1.0,
+    'examples_text': 1.0,
+    'notes_text': 0.5,
+}
+
+# FTS5 indexes over search_documents
+FTS_TABLES = ('search_index', 'search_trigram')
+
+# Columns of search_trigram, compared against fuzzy queries
+TRIGRAM_COLUMNS = ('title_en', 'alternative_names', 'product_names')
+
+# Triggers that maintained the old contentless index
+LEGACY_TRIGGERS = (
+    'tr_search_index_products_insert',
+    'tr_search_index_products_update',
+    'tr_search_index_products_delete',
+)
+
+DOCUMENT_COLUMNS = (
+    'record_type', 'record_id', 'code', 'title_en', 'description',
+    'alternative_names', 'notes_text', 'product_names', 'examples_text'
+)
+
+ALTERNATIVE_NAMES_SQL = """(SELECT group_concat(a.alternative_name, ' ') FROM alternative_names a
+     WHERE a.reference_type = '{record_type}' AND a.reference_id = {id_expr})"""
+
+NOTES_SQL = """(SELECT group_concat(COALESCE(n.title || ' ', '') || n.note_text, ' ') FROM classification_notes n
+     WHERE n.reference_type = '{record_type}' AND n.reference_id = {id_expr})"""
+
+# Source of each record type: (table, id column, title column, SELECT of
+# DOCUMENT_COLUMNS). Records with a NULL title are not indexed. The SELECTs
+# mirror the trigger bodies in search_index.sql.
+DOCUMENT_SOURCES = {
+    'section': ('sections', 'section_id', 'title_en', f"""
+        SELECT 'section', s.section_id, s.section_number, s.title_en, s.description,
+               {ALTERNATIVE_NAMES_SQL.format(record_type='section', id_expr='s.section_id')},
+               {NOTES_SQL.format(record_type='section', id_expr='s.section_id')},
+               NULL, NULL
+        FROM sections s
+    """),
+    'chapter': ('chapters', 'chapter_id', 'title_en', f"""
+        SELECT 'chapter', c.chapter_id, c.chapter_code, c.title_en, c.description,
+               {ALTERNATIVE_NAMES_SQL.format(record_type='chapter', id_expr='c.chapter_id')},
+               {NOTES_SQL.format(record_type='chapter', id_expr='c.chapter_id')},
+               NULL, NULL
+        FROM chapters c
+    """),
+    'heading': ('headings', 'heading_id', 'title_en', f"""
+        SELECT 'heading', h.heading_id, h.heading_code, h.title_en, h.description,
+               {ALTERNATIVE_NAMES_SQL.format(record_type='heading', id_expr='h.heading_id')},
+               {NOTES_SQL.format(record_type='heading', id_expr='h.heading_id')},
+               NULL, NULL
+        FROM headings h
+    """),
+    'subheading': ('subheadings', 'subheading_id', 'title_en', f"""
+        SELECT 'subheading', sh.subheading_id, sh.subheading_code, sh.title_en, sh.description,
+               {ALTERNATIVE_NAMES_SQL.format(record_type='subheading', id_expr='sh.subheading_id')},
+               {NOTES_SQL.format(record_type='subheading', id_expr='sh.subheading_id')},
+               NULL,
+               (SELECT group_concat(e.title || ' ' || e.description, ' ') FROM classification_examples e
+                WHERE e.subheading_id = sh.subheading_id)
+        FROM subheadings sh
+    """),
+    'product': ('products', 'product_id', 'product_name', f"""
+        SELECT 'product', p.product_id,
+               (SELECT sh.subheading_code FROM subheadings sh WHERE sh.subheading_id = p.subheading_id),
+               p.product_name, p.description,
+               {ALTERNATIVE_NAMES_SQL.format(record_type='product', id_expr='p.product_id')},
+               {NOTES_SQL.format(record_type='product', id_expr='p.product_id')},
+               p.product_name || ' ' || COALESCE(p.common_name, '') || ' ' || COALESCE(p.scientific_name, ''),
+               NULL
+        FROM products p
+    """),
+    'national_line': ('national_lines', 'line_id', 'description', """
+        SELECT 'national_line', nl.line_id, nl.hts_code, nl.description, nl.full_description,
+               NULL, NULL, NULL, NULL
+        FROM national_lines nl
+    """),
+}
+
+
+def bm25_expression(weights: Optional[Dict[str, float]] = None) -> str:
+    """bm25() call over search_index with one weight per column (lower scores rank first)."""
+    weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+    values = ', '.join(str(float(weights.get(column, 0.0))) for column in SEARCH_COLUMNS)
+    return f"bm25(search_index, {values})"
+
+
+def fts_query(text: str) -> str:
+    """Quote each word of free text so FTS5 operators in it are matched literally."""
+    terms = re.findall(r'\w+', text)
+    return ' '.join(f'"{term}"' for term in terms)
+
+
+@lru_cache(maxsize=65536)
+def trigrams(word: str) -> frozenset:
+    """Trigrams of a word padded with spaces, so short words still yield some."""
+    padded = f" {word} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def trigram_match_query(text: str) -> str:
+    """
+    search_trigram MATCH expression for free text: each word must share at
+    least one trigram with the candidate, so a typo in one word still matches.
+    """
+    groups = []
+    for word in re.findall(r'\w+', text.lower()):
+        grams = {word[i:i + 3] for i in range(len(word) - 2)}
+        if grams:
+            groups.append('(' + ' OR '.join(f'"{gram}"' for gram in sorted(grams)) + ')')
+    return ' AND '.join(groups)
+
+
+def similarity(query: str, text: str) -> float:
+    """
+    Mean over the query words of the best trigram Dice coefficient against
+    any word of ``text``; 1.0 when every query word appears verbatim.
+    """
+    query_words = re.findall(r'\w+', query.lower())
+    text_grams = [trigrams(word) for word in set(re.findall(r'\w+', (text or '').lower()))]
+    if not query_words or not text_grams:
+        return 0.0
+    
+    total = 0.0
+    for word in query_words:
+        grams = trigrams(word)
+        total += max(2 * len(grams & other) / (len(grams) + len(other)) for other in text_grams)
+    return total / len(query_words)
+
+
+class SearchIndex:
+    """Installs and maintains the trigger-driven FTS5 search index."""
+    
+    def __init__(self, db: HTSDatabase):
+        self.db = db
+    
+    def is_installed(self) -> bool:
+        """True once search_documents and its triggers have been created."""
+        return self.db.table_exists('search_documents')
+    
+    def _drop_legacy_index(self) -> bool:
+        """Drop a contentless search_index left by create_tables.sql or enhanced_schema_v2.sql."""
+        cursor = self.db.connect().cursor()
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'search_index'")
+        row = cursor.fetchone()
+        if row is None or 'search_documents' in row[0]:
+            return False
+        
+        logger.info("Replacing contentless search_index with trigger-maintained index")
+        for trigger in LEGACY_TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        cursor.execute("DROP TABLE search_index")
+        self.db.connect().commit()
+        return True
+    
+    def ensure_schema(self) -> Dict[str, Any]:
+        """
+        Install the search schema and triggers, then backfill documents for
+        records that existed before the triggers did. Safe to call repeatedly.
+        """
+        self._drop_legacy_index()
+        had_trigram = self.db.table_exists('search_trigram')
+        self.db.create_tables(SCHEMA_FILE)
+        self.install_national_lines()
+        results = self.sync()
+        
+        # The trigram index was added after search_documents; fill it once
+        if not had_trigram:
+            self._command('rebuild', table='search_trigram')
+        return results
+    
+    def install_national_lines(self) -> bool:
+        """Add the national_lines triggers once both schemas are present."""
+        if not (self.is_installed() and self.db.table_exists('national_lines')):
+            return False
+        self.db.create_tables(NATIONAL_LINES_SCHEMA_FILE)
+        return True
+    
+    def sync(self) -> Dict[str, Any]:
+        """
+        Bring search_documents in line with the source tables.
+        
+        Only documents whose content differs are written, so after the triggers
+        are installed this is a cheap consistency check rather than a rebuild.
+        """
+        start = time.time()
+        conn = self.db.connect()
+        cursor = conn.cursor()
+        results = {'upserted': 0, 'deleted': 0}
+        
+        updated = [c for c in DOCUMENT_COLUMNS if c not in ('record_type', 'record_id')]
+        upsert_tail = f"""
+            ON CONFLICT (record_type, record_id) DO UPDATE SET
+                {', '.join(f'{c} = excluded.{c}' for c in updated)}
+            WHERE ({', '.join(f'search_documents.{c}' for c in updated)})
+                IS NOT ({', '.join(f'excluded.{c}' for c in updated)})
+        """
+        
+        try:
+            for record_type, (table, id_column, title_column, select_sql) in DOCUMENT_SOURCES.items():
+                if not self.db.table_exists(table):
+                    continue
+                
+                cursor.execute(f"""
+                    INSERT INTO search_documents ({', '.join(DOCUMENT_COLUMNS)})
+                    {select_sql} WHERE {title_column} IS NOT NULL {upsert_tail}
+                """)
+                results['upserted'] += cursor.rowcount
+                
+                cursor.execute(f"""
+                    DELETE FROM search_documents
+                    WHERE record_type = ? AND record_id NOT IN (
+                        SELECT {id_column} FROM {table} WHERE {title_column} IS NOT NULL)
+                """, (record_type,))
+                results['deleted'] += cursor.rowcount
+            
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        
+        results['documents'] = self.count()
+        results['duration_seconds'] = round(time.time() - start, 2)
+        logger.info(f"Search documents synced: {results['documents']:,} total, "
+                    f"{results['upserted']:,} written, {results['deleted']:,} removed")
+        return results
+    
+    def count(self) -> int:
+        """Number of indexed documents."""
+        cursor = self.db.connect().cursor()
+        cursor.execute("SELECT COUNT(*) FROM search_documents")
+        return cursor.fetchone()[0]
+    
+    def _command(self, command: str, argument: Any = None, table: str = None):
+        """Run an FTS5 special command on one index, or on all of them."""
+        conn = self.db.connect()
+        for fts_table in ([table] if table else FTS_TABLES):
+            if argument is None:
+                conn.execute(f"INSERT INTO {fts_table} ({fts_table}) VALUES (?)", (command,))
+            else:
+                conn.execute(f"INSERT INTO {fts_table} ({fts_table}, rank) VALUES (?, ?)", (command, argument))
+        conn.commit()
+    
+    def optimize(self):
+        """Merge all FTS5 segments into one. Run after bulk loads."""
+        start = time.time()
+        self._command('optimize')
+        logger.info(f"Search index optimized in {time.time() - start:.2f}s")
+    
+    def merge(self, pages: int = 500):
+        """Incremental segment merge that writes at most ``pages`` pages."""
+        self._command('merge', pages)
+        logger.info(f"Search index merge step ({pages} pages) done")
+    
+    def rebuild(self):
+        """Rebuild the FTS5 indexes from search_documents."""
+        start = time.time()
+        self._command('rebuild')
+        logger.info(f"Search index rebuilt in {time.time() - start:.2f}s")
+    
+    def integrity_check(self) -> bool:
+        """Check that the FTS5 indexes match search_documents."""
+        try:
+            self._command('integrity-check', 1)
+            return True
+        except sqlite3.DatabaseError as e:
+            logger.error(f"Search index integrity check failed: {e}")
+            return False
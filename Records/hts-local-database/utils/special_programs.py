@@ -0,0 +1,178 @@
+"""
+Special program indicator (SPI) index.
+
+The special rate column lists the programs a line qualifies under, e.g.
+"Free (A+,AU,BH,CL,CO,D,E,IL,JO,KR,MA,OM,P,PA,PE,S,SG)". DutyRatesLoader
+normalizes those lists into duty_rate_programs at ingest (see
+utils/duty_rates.py). SpecialProgramIndex loads that table once into one
+bitmap per program over all national lines, so "is this code free under KR"
+is a bit test and "every code eligible under USMCA" or "free under both KR
+and AU" are integer ANDs instead of string scans.
+
+Bitmaps are kept per indicator as published, qualifier included: "A+"
+(least-developed beneficiary countries only) and "A*" (some beneficiary
+countries excluded) are separate from "A", as they do not extend to every
+country of the program. Ask for each code that applies to an origin, e.g.
+bitmap('A', 'A+') for a least-developed beneficiary.
+"""
+
+import bisect
+import logging
+import re
+import time
+from typing import Dict, List, Optional, Iterator
+
+logger = logging.getLogger(__name__)
+
+# Program indicators of the special rate column (General Note 3(c) of the HTS)
+PROGRAM_NAMES = {
+    'A': 'Generalized System of Preferences',
+    'AU': 'United States-Australia Free Trade Agreement',
+    'B': 'Automotive Products Trade Act',
+    'BH': 'United States-Bahrain Free Trade Agreement',
+    'C': 'Agreement on Trade in Civil Aircraft',
+    'CA': 'North American Free Trade Agreement (Canada)',
+    'CL': 'United States-Chile Free Trade Agreement',
+    'CO': 'United States-Colombia Trade Promotion Agreement',
+    'D': 'African Growth and Opportunity Act',
+    'E': 'Caribbean Basin Economic Recovery Act',
+    'IL': 'United States-Israel Free Trade Area',
+    'J': 'Andean Trade Preference Act',
+    'JO': 'United States-Jordan Free Trade Area',
+    'JP': 'United States-Japan Trade Agreement',
+    'K': 'Agreement on Trade in Pharmaceutical Products',
+    'KR': 'United States-Korea Free Trade Agreement',
+    'L': 'Uruguay Round Concessions on Intermediate Chemicals for Dyes',
+    'MA': 'United States-Morocco Free Trade Agreement',
+    'MX': 'North American Free Trade Agreement (Mexico)',
+    'NP': 'Nepal Preference Program',
+    'OM': 'United States-Oman Free Trade Agreement',
+    'P': 'Dominican Republic-Central America-United States Free Trade Agreement',
+    'PA': 'United States-Panama Trade Promotion Agreement',
+    'PE': 'United States-Peru Trade Promotion Agreement',
+    'R': 'United States-Caribbean Basin Trade Partnership Act',
+    'S': 'United States-Mexico-Canada Agreement',
+    'SG': 'United States-Singapore Free Trade Agreement',
+    'W': 'Haiti Hemispheric Opportunity through Partnership Encouragement Act',
+}
+
+# Common names accepted wherever a program indicator is
+PROGRAM_ALIASES = {
+    'GSP': 'A',
+    'AGOA': 'D',
+    'CBERA': 'E',
+    'CBTPA': 'R',
+    'CAFTA': 'P',
+    'CAFTA-DR': 'P',
+    'KORUS': 'KR',
+    'NAFTA': 'CA',
+    'USMCA': 'S',
+    'CUSMA': 'S',
+    'T-MEC': 'S',
+}
+
+
+def program_indicator(program: str) -> str:
+    """Indicator for a program code or common name: 'USMCA' -> 'S', 'kr' -> 'KR'; 'A+' stays 'A+'."""
+    program = program.strip().upper()
+    return PROGRAM_ALIASES.get(program, program)
+
+
+def _bits(bitmap: int) -> Iterator[int]:
+    """Positions of the set bits of an integer, lowest first."""
+    while bitmap:
+        low = bitmap & -bitmap
+        yield low.bit_length() - 1
+        bitmap ^= low
+
+
+class SpecialProgramIndex:
+    """
+    One bitmap per program indicator (qualifier included) over the national
+    lines, in code order. A 10-digit line that inherits its rates is
+    eligible wherever its 8-digit line is.
+    """
+    
+    def __init__(self, codes: List[str]):
+        self.codes = list(codes)
+        self.positions = {code: position for position, code in enumerate(self.codes)}
+        self.eligible: Dict[str, int] = {}
+        self.free: Dict[str, int] = {}
+    
+    @classmethod
+    def from_database(cls, conn) -> 'SpecialProgramIndex':
+        """Build the bitmaps from the current rates in duty_rate_programs."""
+        start = time.time()
+        cursor = conn.cursor()
+        cursor.execute("SELECT hts_code, rates_inherited FROM national_lines ORDER BY hts_code")
+        lines = cursor.fetchall()
+        index = cls([code for code, _ in lines])
+        
+        # Bits set by the rates published on a code: its own and its inheriting children's
+        covered: Dict[str, int] = {}
+        for code, inherited in lines:
+            source = code[:8] if inherited else code
+            covered[source] = covered.get(source, 0) | (1 << index.positions[code])
+        
+        cursor.execute("""
+            SELECT p.classification_code, p.program_code, p.is_free
+            FROM duty_rate_programs p
+            JOIN duty_rates d ON d.rate_id = p.rate_id
+            WHERE d.expiry_date IS NULL
+        """)
+        for code, program, is_free in cursor.fetchall():
+            bits = covered.get(code, 0)
+            index.eligible[program] = index.eligible.get(program, 0) | bits
+            if is_free:
+                index.free[program] = index.free.get(program, 0) | bits
+        
+        logger.info(f"Special program index loaded: {len(index.eligible)} programs over "
+                    f"{len(index.codes):,} lines in {time.time() - start:.2f}s")
+        return index
+    
+    def _bit(self, hts_code: str) -> int:
+        position = self.positions.get(re.sub(r'\D', '', hts_code))
+        return 0 if position is None else 1 << position
+    
+    def is_eligible(self, hts_code: str, program: str) -> bool:
+        """True when the line lists the program in its special rate column."""
+        return bool(self.eligible.get(program_indicator(program), 0) & self._bit(hts_code))
+    
+    def is_free(self, hts_code: str, program: str) -> bool:
+        """True when the line is duty-free under the program."""
+        return bool(self.free.get(program_indicator(program), 0) & self._bit(hts_code))
+    
+    def programs_for(self, hts_code: str) -> List[str]:
+        """Programs a line is eligible under."""
+        bit = self._bit(hts_code)
+        return sorted(program for program, bitmap in self.eligible.items() if bitmap & bit)
+    
+    def bitmap(self, *programs: str, free_only: bool = False, match_all: bool = False) -> int:
+        """Bitmap of lines eligible (or free) under any, or with ``match_all`` every, program."""
+        source = self.free if free_only else self.eligible
+        bitmaps = [source.get(program_indicator(program), 0) for program in programs]
+        if not bitmaps:
+            return 0
+        result = bitmaps[0]
+        for bitmap in bitmaps[1:]:
+            result = result & bitmap if match_all else result | bitmap
+        return result
+    
+    def eligible_codes(self, *programs: str, free_only: bool = False, match_all: bool = False,
+                       prefix: Optional[str] = None) -> List[str]:
+        """
+        Codes eligible under the programs, in code order, optionally only
+        below a prefix such as a chapter or heading.
+        """
+        bitmap = self.bitmap(*programs, free_only=free_only, match_all=match_all)
+        if prefix:
+            # Codes are sorted, so a prefix is one contiguous run of bits
+            digits = re.sub(r'\D', '', prefix)
+            low = bisect.bisect_left(self.codes, digits)
+            high = bisect.bisect_left(self.codes, digits + '\uffff')
+            bitmap &= ((1 << high) - 1) ^ ((1 << low) - 1)
+        return [self.codes[position] for position in _bits(bitmap)]
+    
+    def count(self, *programs: str, free_only: bool = False, match_all: bool = False) -> int:
+        """Number of lines eligible under the programs."""
+        return bin(self.bitmap(*programs, free_only=free_only, match_all=match_all)).count('1')
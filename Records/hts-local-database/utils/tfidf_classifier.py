@@ -0,0 +1,255 @@
+"""
+TF-IDF classification engine over the tariff text.
+
+Builds a sparse term matrix with one row per classification target (every
+subheading and 8/10-digit national line), using the text already gathered
+in search_documents: titles, hierarchical descriptions, alternative names,
+product names and classification examples. Descriptions are scored against
+every target with one sparse matrix-vector product.
+
+NumPy and SciPy are only needed when this engine is used.
+"""
+
+import logging
+import math
+import re
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Iterable
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    np = None
+    sparse = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_PATH = "database/tfidf_model.npz"
+
+# search_documents record types that become (or vote for) a target code;
+# product documents carry their subheading code and are merged into it
+TARGET_RECORD_TYPES = ('subheading', 'national_line', 'product')
+
+# Columns read per document and how many times their terms are counted
+FIELD_WEIGHTS = {
+    'title_en': 2,
+    'alternative_names': 2,
+    'product_names': 2,
+    'description': 1,
+    'examples_text': 1,
+}
+
+STOP_WORDS = frozenset({
+    'the', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with',
+    'by', 'is', 'are', 'was', 'were', 'be', 'been', 'other', 'not', 'nesoi',
+    'whether', 'than', 'its', 'thereof', 'such', 'from', 'as',
+})
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def require_numpy():
+    """Fail with an actionable message when NumPy/SciPy are missing."""
+    if np is None or sparse is None:
+        raise ImportError("The TF-IDF classifier requires numpy and scipy: pip install numpy scipy")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stop words, with plural -s stripped."""
+    tokens = []
+    for token in TOKEN_RE.findall((text or '').lower()):
+        if len(token) < 2 or token in STOP_WORDS:
+            continue
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class TfidfClassifier:
+    """Sparse TF-IDF model mapping free-text descriptions to HTS codes."""
+    
+    def __init__(self, codes: List[str], titles: List[str], vocabulary: List[str],
+                 idf, matrix, fingerprint: str = ''):
+        require_numpy()
+        self.codes = list(codes)
+        self.titles = list(titles)
+        self.vocabulary = {term: index for index, term in enumerate(vocabulary)}
+        self.idf = idf
+        self.matrix = matrix.tocsr()
+        # Term-major copy, so scoring never transposes the whole matrix
+        self.term_matrix = self.matrix.T.tocsr()
+        self.fingerprint = fingerprint
+    
+    @staticmethod
+    def source_fingerprint(conn) -> str:
+        """Cheap summary of the indexed text, used to detect a stale model on disk."""
+        placeholders = ', '.join('?' for _ in TARGET_RECORD_TYPES)
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT COUNT(*), COALESCE(MAX(doc_id), 0),
+                   COALESCE(SUM(length(code) + length(title_en) + COALESCE(length(description), 0)
+                                + COALESCE(length(alternative_names), 0)
+                                + COALESCE(length(product_names), 0)
+                                + COALESCE(length(examples_text), 0)), 0)
+            FROM search_documents
+            WHERE record_type IN ({placeholders})
+        """, TARGET_RECORD_TYPES)
+        return ':'.join(str(value) for value in cursor.fetchone())
+    
+    @classmethod
+    def build(cls, conn) -> 'TfidfClassifier':
+        """Build the model from search_documents (see utils/search_index.py)."""
+        require_numpy()
+        start = time.time()
+        
+        placeholders = ', '.join('?' for _ in TARGET_RECORD_TYPES)
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT code, title_en, {', '.join(FIELD_WEIGHTS)}
+            FROM search_documents
+            WHERE record_type IN ({placeholders}) AND code IS NOT NULL
+            ORDER BY code, record_type DESC
+        """, TARGET_RECORD_TYPES)
+        
+        # One bag of words per code; the first title seen for a code wins,
+        # which with the ORDER BY is the subheading or national line itself
+        bags: Dict[str, Counter] = {}
+        titles: Dict[str, str] = {}
+        for code, title, *fields in cursor.fetchall():
+            bag = bags.setdefault(code, Counter())
+            titles.setdefault(code, title or '')
+            for text, weight in zip(fields, FIELD_WEIGHTS.values()):
+                for token in tokenize(text):
+                    bag[token] += weight
+        
+        codes = list(bags)
+        document_frequency = Counter()
+        for bag in bags.values():
+            document_frequency.update(bag.keys())
+        vocabulary = sorted(document_frequency)
+        term_index = {term: index for index, term in enumerate(vocabulary)}
+        
+        document_count = len(codes)
+        idf = np.array([math.log((1 + document_count) / (1 + document_frequency[term])) + 1.0
+                        for term in vocabulary], dtype=np.float32)
+        
+        rows, columns, values = [], [], []
+        for row_index, code in enumerate(codes):
+            for term, count in bags[code].items():
+                rows.append(row_index)
+                columns.append(term_index[term])
+                values.append(1.0 + math.log(count))
+        matrix = sparse.csr_matrix(
+            (np.array(values, dtype=np.float32), (rows, columns)),
+            shape=(document_count, len(vocabulary))
+        )
+        matrix = _normalize_rows(matrix.multiply(idf).tocsr())
+        
+        model = cls(codes, [titles[code] for code in codes], vocabulary, idf, matrix,
+                    cls.source_fingerprint(conn))
+        logger.info(f"TF-IDF model built: {document_count:,} codes, {len(vocabulary):,} terms "
+                    f"in {time.time() - start:.2f}s")
+        return model
+    
+    def save(self, path: str = DEFAULT_MODEL_PATH):
+        """Write the model to a compressed .npz file."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        vocabulary = sorted(self.vocabulary, key=self.vocabulary.get)
+        np.savez_compressed(
+            path,
+            codes=np.array(self.codes, dtype=str),
+            titles=np.array(self.titles, dtype=str),
+            vocabulary=np.array(vocabulary, dtype=str),
+            idf=self.idf,
+            data=self.matrix.data,
+            indices=self.matrix.indices,
+            indptr=self.matrix.indptr,
+            shape=np.array(self.matrix.shape),
+            fingerprint=np.array(self.fingerprint),
+        )
+        logger.info(f"TF-IDF model saved to {path}")
+    
+    @classmethod
+    def load(cls, path: str = DEFAULT_MODEL_PATH) -> 'TfidfClassifier':
+        """Read a model written by save()."""
+        require_numpy()
+        with np.load(path, allow_pickle=False) as archive:
+            matrix = sparse.csr_matrix(
+                (archive['data'], archive['indices'], archive['indptr']),
+                shape=tuple(archive['shape'])
+            )
+            return cls(archive['codes'].tolist(), archive['titles'].tolist(),
+                       archive['vocabulary'].tolist(), archive['idf'], matrix,
+                       str(archive['fingerprint']))
+    
+    @classmethod
+    def load_or_build(cls, conn, path: str = DEFAULT_MODEL_PATH) -> 'TfidfClassifier':
+        """Load the saved model, rebuilding and saving it if the tariff text has changed."""
+        if Path(path).exists():
+            model = cls.load(path)
+            if model.fingerprint == cls.source_fingerprint(conn):
+                return model
+            logger.info("TF-IDF model is out of date, rebuilding")
+        
+        model = cls.build(conn)
+        model.save(path)
+        return model
+    
+    def vectorize(self, descriptions: Iterable[str]):
+        """L2-normalized TF-IDF rows for descriptions; unknown terms are ignored."""
+        rows, columns, values = [], [], []
+        description_count = 0
+        for row_index, description in enumerate(descriptions):
+            description_count += 1
+            counts = Counter(term for term in tokenize(description) if term in self.vocabulary)
+            for term, count in counts.items():
+                rows.append(row_index)
+                columns.append(self.vocabulary[term])
+                values.append(1.0 + math.log(count))
+        
+        vectors = sparse.csr_matrix(
+            (np.array(values, dtype=np.float32), (rows, columns)),
+            shape=(description_count, len(self.vocabulary))
+        )
+        return _normalize_rows(vectors.multiply(self.idf).tocsr())
+    
+    def classify(self, description: str, top_k: int = 10) -> List[Dict]:
+        """Top-k codes for one description by cosine similarity."""
+        return self.classify_batch([description], top_k)[0]
+    
+    def classify_batch(self, descriptions: List[str], top_k: int = 10) -> List[List[Dict]]:
+        """
+        Top-k codes per description. All descriptions are scored with one
+        sparse matrix product, which stays sparse: only codes sharing a term
+        with a description get a score.
+        """
+        scores = (self.vectorize(descriptions) @ self.term_matrix).tocsr()
+        
+        results = []
+        for row_index in range(scores.shape[0]):
+            start, end = scores.indptr[row_index], scores.indptr[row_index + 1]
+            row_scores = scores.data[start:end]
+            row_codes = scores.indices[start:end]
+            if len(row_scores) > top_k:
+                best = np.argpartition(-row_scores, top_k)[:top_k]
+            else:
+                best = np.arange(len(row_scores))
+            best = best[np.argsort(-row_scores[best], kind='stable')]
+            results.append([
+                {'hts_code': self.codes[row_codes[i]], 'title_en': self.titles[row_codes[i]],
+                 'score': round(float(row_scores[i]), 4)}
+                for i in best
+            ])
+        return results
+
+
+def _normalize_rows(matrix):
+    """Scale each row of a CSR matrix to unit L2 norm, leaving empty rows alone."""
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms).dot(matrix).tocsr().astype(np.float32)
@@ -7,20 +7,62 @@ import sqlite3
 import json
 import re
 import logging
-from typing import Dict, List, Optional, Tuple, Any
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Any, Iterator
 from datetime import datetime, date
+from functools import lru_cache
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=256)
+def _compile_pattern(pattern: str):
+    return re.compile(pattern)
+
+
+def _regexp(pattern: str, value) -> Optional[bool]:
+    """SQLite REGEXP function: ``value REGEXP pattern`` matches like re.match."""
+    if value is None:
+        return None
+    return _compile_pattern(pattern).match(str(value)) is not None
+
+
 class ValidationEngine:
     """Comprehensive validation engine for HTS database."""
     
-    def __init__(self, db_connection: sqlite3.Connection):
+    # Offending rows kept per rule; the full violation count is still reported
+    MAX_ISSUES_PER_RULE = 100
+    
+    # Independent rule groups, in the order their results are merged
+    TABLES_TO_VALIDATE = ['sections', 'chapters', 'headings', 'subheadings', 'products']
+    RULE_GROUPS = TABLES_TO_VALIDATE + ['relationships', 'business_rules']
+    
+    # Tables read by the cross-table rule groups, which re-run when any of them changes
+    GROUP_TABLES = {
+        'relationships': ['sections', 'chapters', 'headings', 'subheadings', 'national_lines'],
+        'business_rules': ['sections', 'products'],
+    }
+    
+    # Results and per-rule violating row ids of the last incremental run
+    DEFAULT_STATE_PATH = "data/validation_state.json"
+    
+    def __init__(self, db_connection: sqlite3.Connection, hierarchy=None):
         self.conn = db_connection
         self.conn.row_factory = sqlite3.Row
+        self.conn.create_function('REGEXP', 2, _regexp, deterministic=True)
         self.validation_rules = self._load_validation_rules()
+        self._hierarchy = hierarchy
+    
+    @property
+    def hierarchy(self):
+        """Code hierarchy trie (utils.hierarchy.HierarchyTrie), loaded on first use."""
+        if self._hierarchy is None:
+            # Imported here so the module still runs as a standalone script
+            from utils.hierarchy import HierarchyTrie
+            self._hierarchy = HierarchyTrie.from_database(self.conn)
+        return self._hierarchy
     
     def _load_validation_rules(self) -> List[Dict]:
         """Load validation rules from database and built-in rules."""
@@ -102,10 +144,38 @@ class ValidationEngine:
         
         return builtin_rules + custom_rules
     
-    def validate_all(self) -> Dict[str, Any]:
-        """Run comprehensive validation on entire database."""
+    def validate_all(self, parallel: bool = False, workers: int = None) -> Dict[str, Any]:
+        """
+        Run comprehensive validation on entire database.
+        
+        With ``parallel`` the rule groups (each table's rules, the relationship
+        checks and the business rules) run in a thread pool, each on its own
+        read-only connection. Results are merged in RULE_GROUPS order either
+        way, so the output does not depend on which group finishes first.
+        """
         logger.info("Starting comprehensive database validation...")
+        start = time.time()
         
+        database_file = self._database_file()
+        if parallel and database_file:
+            with ThreadPoolExecutor(max_workers=workers or len(self.RULE_GROUPS)) as executor:
+                futures = {group: executor.submit(self._run_group_readonly, database_file, group)
+                           for group in self.RULE_GROUPS}
+                group_results = {group: futures[group].result() for group in self.RULE_GROUPS}
+        else:
+            group_results = {group: self._run_group(group) for group in self.RULE_GROUPS}
+        
+        validation_results = self._merge_group_results(group_results)
+        validation_results['timings']['total_seconds'] = round(time.time() - start, 3)
+        
+        logger.info(f"Validation completed: {validation_results['overall_status']}")
+        logger.info(f"Errors: {validation_results['summary']['total_errors']}, "
+                   f"Warnings: {validation_results['summary']['total_warnings']}")
+        
+        return validation_results
+    
+    def _merge_group_results(self, group_results: Dict[str, Dict]) -> Dict[str, Any]:
+        """Combine per-group results, in RULE_GROUPS order, into one validation result."""
         validation_results = {
             'timestamp': datetime.now().isoformat(),
             'overall_status': 'passed',
@@ -116,31 +186,22 @@ class ValidationEngine:
                 'data_quality_score': 0.0
             },
             'table_results': {},
-            'detailed_issues': []
+            'detailed_issues': [],
+            'timings': {'groups': {}, 'rules': {}}
         }
         
-        # Core table validations
-        tables_to_validate = ['sections', 'chapters', 'headings', 'subheadings', 'products']
-        
-        for table in tables_to_validate:
-            table_results = self._validate_table(table)
-            validation_results['table_results'][table] = table_results
-            validation_results['summary']['total_errors'] += table_results['error_count']
-            validation_results['summary']['total_warnings'] += table_results['warning_count']
-            validation_results['summary']['total_checks'] += table_results['check_count']
-            validation_results['detailed_issues'].extend(table_results['issues'])
-        
-        # Relationship validations
-        relationship_results = self._validate_relationships()
-        validation_results['table_results']['relationships'] = relationship_results
-        validation_results['summary']['total_errors'] += relationship_results['error_count']
-        validation_results['summary']['total_warnings'] += relationship_results['warning_count']
-        
-        # Business rule validations
-        business_results = self._validate_business_rules()
-        validation_results['table_results']['business_rules'] = business_results
-        validation_results['summary']['total_errors'] += business_results['error_count']
-        validation_results['summary']['total_warnings'] += business_results['warning_count']
+        for group in self.RULE_GROUPS:
+            group_result = group_results[group]
+            validation_results['timings']['groups'][group] = group_result.pop('duration_seconds')
+            validation_results['timings']['rules'].update(group_result.pop('rule_timings', {}))
+            validation_results['table_results'][group] = group_result
+            validation_results['summary']['total_errors'] += group_result['error_count']
+            validation_results['summary']['total_warnings'] += group_result['warning_count']
+            
+            # Relationship and business checks are not counted towards the score
+            if group in self.TABLES_TO_VALIDATE:
+                validation_results['summary']['total_checks'] += group_result['check_count']
+                validation_results['detailed_issues'].extend(group_result['issues'])
         
         # Calculate overall data quality score
         total_issues = validation_results['summary']['total_errors'] + validation_results['summary']['total_warnings']
@@ -153,12 +214,225 @@ class ValidationEngine:
         elif validation_results['summary']['total_warnings'] > 0:
             validation_results['overall_status'] = 'passed_with_warnings'
         
-        logger.info(f"Validation completed: {validation_results['overall_status']}")
-        logger.info(f"Errors: {validation_results['summary']['total_errors']}, "
-                   f"Warnings: {validation_results['summary']['total_warnings']}")
+        return validation_results
+    
+    def validate_incremental(self, state_path: str = None) -> Dict[str, Any]:
+        """
+        Re-validate only what changed since the last incremental run.
+        
+        Rows changed since then are found through updated_at and change_log.
+        Each table rule is re-evaluated for those rows only and merged with
+        the violating row ids stored from the previous run (dropping rows
+        that were deleted). The relationship and business rule groups re-run
+        only if one of their tables changed. The first run, or a run without
+        a state file, validates everything.
+        """
+        state_path = Path(state_path or self.DEFAULT_STATE_PATH)
+        start = time.time()
+        
+        state = None
+        if state_path.exists():
+            with open(state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
         
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT CURRENT_TIMESTAMP")
+        validated_at = cursor.fetchone()[0]
+        change_log_id = self._max_change_log_id()
+        row_counts = self._row_counts()
+        
+        tables = set(self.TABLES_TO_VALIDATE).union(*self.GROUP_TABLES.values())
+        if state is None:
+            changed = {table: None for table in tables}
+        else:
+            changed = self._changed_rows(tables, state['validated_at'], state['change_log_id'])
+        
+        group_results = {}
+        violations = {}
+        rechecked = []
+        for group in self.RULE_GROUPS:
+            previous_result = state['results']['table_results'].get(group) if state else None
+            
+            if group in self.TABLES_TO_VALIDATE:
+                previous = state['violations'].get(group, {}) if state else {}
+                rule_names = {rule['rule_name'] for rule in self.validation_rules if rule['table_name'] == group}
+                unchanged = (previous_result is not None and not changed[group]
+                             and row_counts.get(group) == state['row_counts'].get(group)
+                             and rule_names <= set(previous))
+                if unchanged:
+                    group_results[group] = {**previous_result, 'duration_seconds': 0.0}
+                    violations[group] = {name: previous[name] for name in rule_names}
+                else:
+                    group_results[group], violations[group] = self._recheck_table(group, changed[group], previous)
+                    rechecked.append(group)
+            else:
+                unchanged = previous_result is not None and not any(
+                    changed[table] or row_counts.get(table) != state['row_counts'].get(table)
+                    for table in self.GROUP_TABLES[group]
+                )
+                if unchanged:
+                    group_results[group] = {**previous_result, 'duration_seconds': 0.0}
+                else:
+                    group_results[group] = self._run_group(group)
+                    rechecked.append(group)
+        
+        validation_results = self._merge_group_results(group_results)
+        validation_results['timings']['total_seconds'] = round(time.time() - start, 3)
+        validation_results['incremental'] = {
+            'since': state['validated_at'] if state else None,
+            'changed_rows': {table: (len(ids) if ids is not None else row_counts.get(table, 0))
+                             for table, ids in sorted(changed.items())},
+            'rechecked_groups': rechecked,
+        }
+        
+        state_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(state_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'validated_at': validated_at,
+                'change_log_id': change_log_id,
+                'row_counts': row_counts,
+                'violations': violations,
+                'results': validation_results,
+            }, f, ensure_ascii=False, default=str)
+        
+        logger.info(f"Incremental validation completed: {validation_results['overall_status']} "
+                    f"(re-checked {', '.join(rechecked) or 'nothing'})")
         return validation_results
     
+    def _table_exists(self, table_name: str) -> bool:
+        # Imported here so the module still runs as a standalone script
+        from utils.database import table_exists
+        return table_exists(self.conn, table_name)
+    
+    def _max_change_log_id(self) -> int:
+        if not self._table_exists('change_log'):
+            return 0
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT COALESCE(MAX(log_id), 0) FROM change_log")
+        return cursor.fetchone()[0]
+    
+    def _row_counts(self) -> Dict[str, int]:
+        """Row count of every table the rule groups read, to detect deletions."""
+        counts = {}
+        cursor = self.conn.cursor()
+        for table in sorted(set(self.TABLES_TO_VALIDATE).union(*self.GROUP_TABLES.values())):
+            if self._table_exists(table):
+                cursor.execute(f"SELECT COUNT(*) FROM {table}")
+                counts[table] = cursor.fetchone()[0]
+        return counts
+    
+    def _changed_rows(self, tables, since: str, change_log_id: int) -> Dict[str, set]:
+        """Row ids per table inserted or updated since a timestamp or change_log entry."""
+        changed = {}
+        cursor = self.conn.cursor()
+        for table in tables:
+            changed[table] = set()
+            if not self._table_exists(table):
+                continue
+            
+            # >= because updated_at has one-second resolution; re-checking a
+            # row that was already validated is harmless
+            cursor.execute(f"SELECT rowid FROM {table} WHERE updated_at >= ?", (since,))
+            changed[table].update(row[0] for row in cursor.fetchall())
+        
+        if self._table_exists('change_log'):
+            cursor.execute("SELECT table_name, record_id FROM change_log WHERE log_id > ?", (change_log_id,))
+            for table, record_id in cursor.fetchall():
+                if table in changed:
+                    changed[table].add(record_id)
+        return changed
+    
+    def _recheck_table(self, table_name: str, changed_ids: Optional[set],
+                       previous: Dict[str, List[int]]) -> Tuple[Dict[str, Any], Dict[str, List[int]]]:
+        """
+        Evaluate a table's rules for the changed rows only (all rows when
+        ``changed_ids`` is None), merged with the previously violating rows.
+        Returns the table result and the violating row ids per rule.
+        """
+        start = time.time()
+        result = {
+            'table_name': table_name,
+            'error_count': 0,
+            'warning_count': 0,
+            'check_count': 0,
+            'record_count': 0,
+            'violation_counts': {},
+            'rule_timings': {},
+            'issues': []
+        }
+        violations = {}
+        
+        cursor = self.conn.cursor()
+        cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
+        result['record_count'] = cursor.fetchone()[0]
+        
+        if result['record_count'] > 0:
+            for rule in [rule for rule in self.validation_rules if rule['table_name'] == table_name]:
+                rule_name = rule['rule_name']
+                rule_start = time.time()
+                try:
+                    if changed_ids is None or rule_name not in previous:
+                        ids = set(self._violation_ids(rule))
+                    else:
+                        kept = set(previous[rule_name]) - changed_ids
+                        ids = set(self._existing_rowids(table_name, kept)) | set(self._violation_ids(rule, changed_ids))
+                    
+                    violations[rule_name] = sorted(ids)
+                    result['violation_counts'][rule_name] = len(ids)
+                    result['issues'].extend(self.iter_rule_violations(
+                        rule, rowids=violations[rule_name][:self.MAX_ISSUES_PER_RULE]))
+                    result['check_count'] += 1
+                    
+                    if rule['severity'] == 'error':
+                        result['error_count'] += len(ids)
+                    elif rule['severity'] == 'warning':
+                        result['warning_count'] += len(ids)
+                
+                except Exception as e:
+                    logger.error(f"Error applying rule {rule_name}: {e}")
+                result['rule_timings'][rule_name] = round(time.time() - rule_start, 4)
+        
+        result['duration_seconds'] = round(time.time() - start, 3)
+        return result, violations
+    
+    def _existing_rowids(self, table_name: str, rowids) -> List[int]:
+        """The subset of ``rowids`` still present in a table."""
+        if not rowids:
+            return []
+        cursor = self.conn.cursor()
+        cursor.execute(f"SELECT rowid FROM {table_name} WHERE rowid IN (SELECT value FROM json_each(?))",
+                       (json.dumps(sorted(rowids)),))
+        return [row[0] for row in cursor.fetchall()]
+    
+    def _database_file(self) -> Optional[str]:
+        """Path of the main database file, or None for an in-memory database."""
+        for row in self.conn.execute("PRAGMA database_list"):
+            if row[1] == 'main':
+                return row[2] or None
+        return None
+    
+    def _run_group(self, group: str) -> Dict[str, Any]:
+        """Run one rule group and time it."""
+        start = time.time()
+        if group == 'relationships':
+            result = self._validate_relationships()
+        elif group == 'business_rules':
+            result = self._validate_business_rules()
+        else:
+            result = self._validate_table(group)
+        result['duration_seconds'] = round(time.time() - start, 3)
+        return result
+    
+    def _run_group_readonly(self, database_file: str, group: str) -> Dict[str, Any]:
+        """Run one rule group on a fresh read-only connection (for worker threads)."""
+        conn = sqlite3.connect(f"{Path(database_file).as_uri()}?mode=ro", uri=True)
+        try:
+            engine = ValidationEngine(conn, hierarchy=self._hierarchy)
+            engine.validation_rules = self.validation_rules
+            return engine._run_group(group)
+        finally:
+            conn.close()
+    
     def _validate_table(self, table_name: str) -> Dict[str, Any]:
         """Validate a specific table."""
         logger.debug(f"Validating table: {table_name}")
@@ -169,6 +443,8 @@ class ValidationEngine:
             'warning_count': 0,
             'check_count': 0,
             'record_count': 0,
+            'violation_counts': {},
+            'rule_timings': {},
             'issues': []
         }
         
@@ -185,131 +461,142 @@ class ValidationEngine:
         table_rules = [rule for rule in self.validation_rules if rule['table_name'] == table_name]
         
         for rule in table_rules:
+            rule_start = time.time()
             try:
-                issues = self._apply_validation_rule(rule)
-                result['issues'].extend(issues)
+                outcome = self._apply_validation_rule(rule)
+                result['issues'].extend(outcome['issues'])
+                result['violation_counts'][rule['rule_name']] = outcome['violation_count']
                 result['check_count'] += 1
                 
-                for issue in issues:
-                    if issue['severity'] == 'error':
-                        result['error_count'] += 1
-                    elif issue['severity'] == 'warning':
-                        result['warning_count'] += 1
-                        
+                if rule['severity'] == 'error':
+                    result['error_count'] += outcome['violation_count']
+                elif rule['severity'] == 'warning':
+                    result['warning_count'] += outcome['violation_count']
+                
             except Exception as e:
                 logger.error(f"Error applying rule {rule['rule_name']}: {e}")
+            result['rule_timings'][rule['rule_name']] = round(time.time() - rule_start, 4)
         
         return result
     
-    def _apply_validation_rule(self, rule: Dict) -> List[Dict]:
-        """Apply a single validation rule."""
-        issues = []
-        cursor = self.conn.cursor()
-        
-        table = rule['table_name']
+    def _rule_condition(self, rule: Dict) -> Optional[Tuple[str, List]]:
+        """SQL condition (and parameters) matching the rows that violate a rule."""
         column = rule['column_name']
         rule_type = rule['rule_type']
         expression = rule['rule_expression']
         
+        if rule_type == 'format':
+            # Regex format validation through the REGEXP function
+            return f"{column} IS NOT NULL AND NOT ({column} REGEXP ?)", [expression]
+        elif rule_type == 'range':
+            # Range validation
+            if 'confidence_score' in expression:
+                return f"{column} IS NOT NULL AND NOT ({expression})", []
+        elif rule_type == 'logic':
+            # Logic validation
+            return f"NOT ({expression})", []
+        elif rule_type == 'json_format':
+            # JSON format validation; empty values are allowed
+            return f"{column} IS NOT NULL AND {column} != '' AND NOT json_valid({column})", []
+        
+        return None
+    
+    def _apply_validation_rule(self, rule: Dict, limit: int = None) -> Dict[str, Any]:
+        """
+        Apply a single validation rule in the database.
+        
+        Violations are counted in SQL and only the first ``limit`` offending
+        rows (MAX_ISSUES_PER_RULE by default) are turned into issues.
+        """
+        outcome = {'violation_count': 0, 'issues': []}
+        condition = self._rule_condition(rule)
+        if condition is None:
+            return outcome
+        
+        where, params = condition
         try:
-            if rule_type == 'format':
-                # Regex format validation
-                cursor.execute(f"SELECT rowid, {column} FROM {table} WHERE {column} IS NOT NULL")
-                rows = cursor.fetchall()
-                
-                pattern = re.compile(expression)
-                for row in rows:
-                    if not pattern.match(str(row[1])):
-                        issues.append({
-                            'rule_name': rule['rule_name'],
-                            'severity': rule['severity'],
-                            'table_name': table,
-                            'record_id': row[0],
-                            'column_name': column,
-                            'current_value': row[1],
-                            'error_message': rule['error_message']
-                        })
-            
-            elif rule_type == 'range':
-                # Range validation
-                if 'confidence_score' in expression:
-                    cursor.execute(f"SELECT rowid, {column} FROM {table} WHERE {column} IS NOT NULL AND NOT ({expression})")
-                    rows = cursor.fetchall()
-                    
-                    for row in rows:
-                        issues.append({
-                            'rule_name': rule['rule_name'],
-                            'severity': rule['severity'],
-                            'table_name': table,
-                            'record_id': row[0],
-                            'column_name': column,
-                            'current_value': row[1],
-                            'error_message': rule['error_message']
-                        })
-            
-            elif rule_type == 'logic':
-                # Logic validation
-                cursor.execute(f"SELECT rowid, {column} FROM {table} WHERE NOT ({expression})")
-                rows = cursor.fetchall()
-                
-                for row in rows:
-                    issues.append({
-                        'rule_name': rule['rule_name'],
-                        'severity': rule['severity'],
-                        'table_name': table,
-                        'record_id': row[0],
-                        'column_name': column,
-                        'current_value': row[1],
-                        'error_message': rule['error_message']
-                    })
-            
-            elif rule_type == 'json_format':
-                # JSON format validation
-                cursor.execute(f"SELECT rowid, {column} FROM {table} WHERE {column} IS NOT NULL")
-                rows = cursor.fetchall()
-                
-                for row in rows:
-                    try:
-                        if row[1]:
-                            json.loads(row[1])
-                    except (json.JSONDecodeError, TypeError):
-                        issues.append({
-                            'rule_name': rule['rule_name'],
-                            'severity': rule['severity'],
-                            'table_name': table,
-                            'record_id': row[0],
-                            'column_name': column,
-                            'current_value': row[1],
-                            'error_message': rule['error_message']
-                        })
-                        
+            cursor = self.conn.cursor()
+            cursor.execute(f"SELECT COUNT(*) FROM {rule['table_name']} WHERE {where}", params)
+            outcome['violation_count'] = cursor.fetchone()[0]
+            if outcome['violation_count']:
+                outcome['issues'] = list(self.iter_rule_violations(rule, limit or self.MAX_ISSUES_PER_RULE))
         except Exception as e:
             logger.error(f"Error in rule {rule['rule_name']}: {e}")
-            
-        return issues
+        
+        return outcome
+    
+    def _rule_query(self, rule: Dict, select: str, rowids=None) -> Optional[Tuple[str, List]]:
+        """SELECT over the rows violating a rule, optionally only among ``rowids``."""
+        condition = self._rule_condition(rule)
+        if condition is None:
+            return None
+        
+        where, params = condition
+        sql = f"SELECT {select} FROM {rule['table_name']} WHERE ({where})"
+        if rowids is not None:
+            sql += " AND rowid IN (SELECT value FROM json_each(?))"
+            params = params + [json.dumps(sorted(rowids))]
+        return sql + " ORDER BY rowid", params
+    
+    def _violation_ids(self, rule: Dict, rowids=None) -> List[int]:
+        """Row ids violating a rule, optionally only among ``rowids``."""
+        query = self._rule_query(rule, "rowid", rowids)
+        if query is None:
+            return []
+        return [row[0] for row in self.conn.execute(*query)]
+    
+    def iter_rule_violations(self, rule: Dict, limit: int = None, rowids=None) -> Iterator[Dict]:
+        """Yield an issue per row violating a rule, streaming from the cursor."""
+        query = self._rule_query(rule, f"rowid, {rule['column_name']}", rowids)
+        if query is None:
+            return
+        
+        sql, params = query
+        if limit is not None:
+            sql += " LIMIT ?"
+            params = params + [limit]
+        
+        for row in self.conn.execute(sql, params):
+            yield {
+                'rule_name': rule['rule_name'],
+                'severity': rule['severity'],
+                'table_name': rule['table_name'],
+                'record_id': row[0],
+                'column_name': rule['column_name'],
+                'current_value': row[1],
+                'error_message': rule['error_message']
+            }
     
     def _validate_relationships(self) -> Dict[str, Any]:
         """Validate foreign key relationships and hierarchy integrity."""
-        result = {
-            'error_count': 0,
-            'warning_count': 0,
-            'check_count': 0,
-            'issues': []
-        }
-        
+        return self._collect_issues(self.iter_relationship_issues)
+    
+    def _validate_business_rules(self) -> Dict[str, Any]:
+        """Validate business-specific rules."""
+        return self._collect_issues(self.iter_business_rule_issues)
+    
+    @staticmethod
+    def _collect_issues(check) -> Dict[str, Any]:
+        """Run an issue generator into a result dict with its issues in a list."""
+        result = {'error_count': 0, 'warning_count': 0, 'check_count': 0}
+        result['issues'] = list(check(result))
+        return result
+    
+    def iter_relationship_issues(self, counts: Dict[str, int]) -> Iterator[Dict]:
+        """
+        Yield an issue per broken relationship, streaming from the cursor, and
+        add the checks run and issues found by severity to ``counts``.
+        """
         cursor = self.conn.cursor()
         
         # Check for orphaned chapters
-        cursor.execute("""
+        for row in cursor.execute("""
             SELECT c.rowid, c.chapter_code, c.section_id
             FROM chapters c
             LEFT JOIN sections s ON c.section_id = s.section_id
             WHERE s.section_id IS NULL
-        """)
-        orphaned_chapters = cursor.fetchall()
-        
-        for row in orphaned_chapters:
-            result['issues'].append({
+        """):
+            yield {
                 'rule_name': 'orphaned_chapter',
                 'severity': 'error',
                 'table_name': 'chapters',
@@ -317,22 +604,19 @@ class ValidationEngine:
                 'column_name': 'section_id',
                 'current_value': row[2],
                 'error_message': f'Chapter {row[1]} references non-existent section_id {row[2]}'
-            })
-            result['error_count'] += 1
+            }
+            counts['error_count'] += 1
         
-        result['check_count'] += 1
+        counts['check_count'] += 1
         
         # Check for orphaned headings
-        cursor.execute("""
+        for row in cursor.execute("""
             SELECT h.rowid, h.heading_code, h.chapter_id
             FROM headings h
             LEFT JOIN chapters c ON h.chapter_id = c.chapter_id
             WHERE c.chapter_id IS NULL
-        """)
-        orphaned_headings = cursor.fetchall()
-        
-        for row in orphaned_headings:
-            result['issues'].append({
+        """):
+            yield {
                 'rule_name': 'orphaned_heading',
                 'severity': 'error',
                 'table_name': 'headings',
@@ -340,22 +624,19 @@ class ValidationEngine:
                 'column_name': 'chapter_id',
                 'current_value': row[2],
                 'error_message': f'Heading {row[1]} references non-existent chapter_id {row[2]}'
-            })
-            result['error_count'] += 1
+            }
+            counts['error_count'] += 1
         
-        result['check_count'] += 1
+        counts['check_count'] += 1
         
         # Check for orphaned subheadings
-        cursor.execute("""
+        for row in cursor.execute("""
             SELECT sh.rowid, sh.subheading_code, sh.heading_id
             FROM subheadings sh
             LEFT JOIN headings h ON sh.heading_id = h.heading_id
             WHERE h.heading_id IS NULL
-        """)
-        orphaned_subheadings = cursor.fetchall()
-        
-        for row in orphaned_subheadings:
-            result['issues'].append({
+        """):
+            yield {
                 'rule_name': 'orphaned_subheading',
                 'severity': 'error',
                 'table_name': 'subheadings',
@@ -363,22 +644,19 @@ class ValidationEngine:
                 'column_name': 'heading_id',
                 'current_value': row[2],
                 'error_message': f'Subheading {row[1]} references non-existent heading_id {row[2]}'
-            })
-            result['error_count'] += 1
+            }
+            counts['error_count'] += 1
         
-        result['check_count'] += 1
+        counts['check_count'] += 1
         
         # Check code hierarchy consistency
-        cursor.execute("""
+        for row in cursor.execute("""
             SELECT h.rowid, h.heading_code, c.chapter_code
             FROM headings h
             JOIN chapters c ON h.chapter_id = c.chapter_id
             WHERE SUBSTR(h.heading_code, 1, 2) != c.chapter_code
-        """)
-        inconsistent_headings = cursor.fetchall()
-        
-        for row in inconsistent_headings:
-            result['issues'].append({
+        """):
+            yield {
                 'rule_name': 'heading_code_mismatch',
                 'severity': 'error',
                 'table_name': 'headings',
@@ -386,21 +664,18 @@ class ValidationEngine:
                 'column_name': 'heading_code',
                 'current_value': row[1],
                 'error_message': f'Heading code {row[1]} does not match chapter code {row[2]}'
-            })
-            result['error_count'] += 1
+            }
+            counts['error_count'] += 1
         
-        result['check_count'] += 1
+        counts['check_count'] += 1
         
-        cursor.execute("""
+        for row in cursor.execute("""
             SELECT sh.rowid, sh.subheading_code, h.heading_code
             FROM subheadings sh
             JOIN headings h ON sh.heading_id = h.heading_id
             WHERE SUBSTR(sh.subheading_code, 1, 4) != h.heading_code
-        """)
-        inconsistent_subheadings = cursor.fetchall()
-        
-        for row in inconsistent_subheadings:
-            result['issues'].append({
+        """):
+            yield {
                 'rule_name': 'subheading_code_mismatch',
                 'severity': 'error',
                 'table_name': 'subheadings',
@@ -408,35 +683,50 @@ class ValidationEngine:
                 'column_name': 'subheading_code',
                 'current_value': row[1],
                 'error_message': f'Subheading code {row[1]} does not match heading code {row[2]}'
-            })
-            result['error_count'] += 1
-        
-        result['check_count'] += 1
+            }
+            counts['error_count'] += 1
+        
+        counts['check_count'] += 1
+        
+        # Check that national lines sit under a known heading
+        missing_headings = {}
+        line_count = 0
+        for code in self.hierarchy.codes():
+            if len(code) in (8, 10):
+                line_count += 1
+                if self.hierarchy.find(code[:4]) is None:
+                    missing_headings[code[:4]] = missing_headings.get(code[:4], 0) + 1
+        
+        for heading_code, count in sorted(missing_headings.items()):
+            yield {
+                'rule_name': 'national_lines_without_heading',
+                'severity': 'warning',
+                'table_name': 'national_lines',
+                'record_id': None,
+                'column_name': 'hts_code',
+                'current_value': heading_code,
+                'error_message': f'{count} national lines fall under heading {heading_code}, which is not in headings'
+            }
+            counts['warning_count'] += 1
         
-        return result
+        if line_count:
+            counts['check_count'] += 1
     
-    def _validate_business_rules(self) -> Dict[str, Any]:
-        """Validate business-specific rules."""
-        result = {
-            'error_count': 0,
-            'warning_count': 0,
-            'check_count': 0,
-            'issues': []
-        }
-        
+    def iter_business_rule_issues(self, counts: Dict[str, int]) -> Iterator[Dict]:
+        """
+        Yield an issue per business-rule violation, adding to ``counts`` as
+        iter_relationship_issues() does.
+        """
         cursor = self.conn.cursor()
         
         # Check for duplicate codes
-        cursor.execute("""
+        for row in cursor.execute("""
             SELECT section_number, COUNT(*) as count
             FROM sections
             GROUP BY section_number
             HAVING COUNT(*) > 1
-        """)
-        duplicate_sections = cursor.fetchall()
-        
-        for row in duplicate_sections:
-            result['issues'].append({
+        """):
+            yield {
                 'rule_name': 'duplicate_section_number',
                 'severity': 'error',
                 'table_name': 'sections',
@@ -444,17 +734,17 @@ class ValidationEngine:
                 'column_name': 'section_number',
                 'current_value': row[0],
                 'error_message': f'Section number {row[0]} appears {row[1]} times'
-            })
-            result['error_count'] += 1
+            }
+            counts['error_count'] += 1
         
-        result['check_count'] += 1
+        counts['check_count'] += 1
         
         # Check for missing descriptions
         cursor.execute("SELECT COUNT(*) FROM products WHERE description IS NULL OR description = ''")
         missing_product_descriptions = cursor.fetchone()[0]
         
         if missing_product_descriptions > 0:
-            result['issues'].append({
+            yield {
                 'rule_name': 'missing_product_descriptions',
                 'severity': 'warning',
                 'table_name': 'products',
@@ -462,10 +752,10 @@ class ValidationEngine:
                 'column_name': 'description',
                 'current_value': None,
                 'error_message': f'{missing_product_descriptions} products are missing descriptions'
-            })
-            result['warning_count'] += 1
+            }
+            counts['warning_count'] += 1
         
-        result['check_count'] += 1
+        counts['check_count'] += 1
         
         # Check for products without proper scientific names
         try:
@@ -478,7 +768,7 @@ class ValidationEngine:
             missing_scientific_names = cursor.fetchone()[0]
             
             if missing_scientific_names > 0:
-                result['issues'].append({
+                yield {
                     'rule_name': 'missing_scientific_names',
                     'severity': 'warning',
                     'table_name': 'products',
@@ -486,16 +776,14 @@ class ValidationEngine:
                     'column_name': 'scientific_name',
                     'current_value': None,
                     'error_message': f'{missing_scientific_names} natural products are missing scientific names'
-                })
-                result['warning_count'] += 1
+                }
+                counts['warning_count'] += 1
             
-            result['check_count'] += 1
+            counts['check_count'] += 1
             
         except sqlite3.Error:
             # Products table may not exist yet
             pass
-        
-        return result
     
     def generate_validation_report(self, validation_results: Dict) -> str:
         """Generate a human-readable validation report."""
@@ -518,6 +806,17 @@ class ValidationEngine:
         report.append(f"Warnings: {summary['total_warnings']}")
         report.append("")
         
+        # Where the time went
+        timings = validation_results.get('timings')
+        if timings:
+            report.append("TIMINGS")
+            report.append("-" * 40)
+            report.append(f"Total: {timings['total_seconds']:.3f}s")
+            slowest = sorted({**timings['groups'], **timings['rules']}.items(), key=lambda item: -item[1])
+            for name, seconds in slowest[:8]:
+                report.append(f"   {name:<32} {seconds:8.3f}s")
+            report.append("")
+        
         # Table-by-table results
         report.append("TABLE VALIDATION RESULTS")
         report.append("-" * 40)
@@ -581,6 +880,56 @@ class ValidationEngine:
         logger.info(f"Validation results saved to {output_file}")
         return str(output_file)
     
+    def write_validation_report(self, output_path: str = None, sample_size: int = 5) -> Dict[str, Any]:
+        """
+        Validate the whole database, streaming every issue to an NDJSON report
+        (see utils/validation_report.py) instead of collecting them in memory.
+        
+        Table rules write all of their violations, not just the first
+        MAX_ISSUES_PER_RULE. Returns the summary that ends the report.
+        """
+        # Imported here so the module still runs as a standalone script
+        from utils.validation_report import ValidationReportWriter
+        
+        if output_path is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            output_path = f"validation_report_{timestamp}.ndjson"
+        
+        summary = {'total_errors': 0, 'total_warnings': 0}
+        with ValidationReportWriter(output_path, sample_size=sample_size) as writer:
+            cursor = self.conn.cursor()
+            for table in self.TABLES_TO_VALIDATE:
+                cursor.execute(f"SELECT COUNT(*) FROM {table}")
+                if cursor.fetchone()[0] == 0:
+                    continue
+                for rule in [rule for rule in self.validation_rules if rule['table_name'] == table]:
+                    try:
+                        written = writer.write_issues(self.iter_rule_violations(rule))
+                    except Exception as e:
+                        logger.error(f"Error applying rule {rule['rule_name']}: {e}")
+                        continue
+                    if rule['severity'] == 'error':
+                        summary['total_errors'] += written
+                    elif rule['severity'] == 'warning':
+                        summary['total_warnings'] += written
+            
+            for check in (self.iter_relationship_issues, self.iter_business_rule_issues):
+                counts = {'error_count': 0, 'warning_count': 0, 'check_count': 0}
+                writer.write_issues(check(counts))
+                summary['total_errors'] += counts['error_count']
+                summary['total_warnings'] += counts['warning_count']
+            
+            if summary['total_errors'] > 0:
+                summary['overall_status'] = 'failed'
+            elif summary['total_warnings'] > 0:
+                summary['overall_status'] = 'passed_with_warnings'
+            else:
+                summary['overall_status'] = 'passed'
+            summary = writer.close(summary)
+        
+        logger.info(f"Validation report streamed to {output_path}: {summary['issue_count']:,} issues")
+        return summary
+    
     def update_data_quality_scores(self, validation_results: Dict):
         """Update data quality scores in the database."""
         cursor = self.conn.cursor()
@@ -634,7 +983,18 @@ def main():
     conn = db.connect()
     
     validator = ValidationEngine(conn)
-    results = validator.validate_all()
+    if "--ndjson" in sys.argv:
+        # Stream every issue to disk and print only the per-rule summary
+        from utils.validation_report import format_report_summary
+        summary = validator.write_validation_report()
+        print(format_report_summary(summary))
+        db.close()
+        sys.exit(1 if summary['overall_status'] == 'failed' else 0)
+    
+    if "--incremental" in sys.argv:
+        results = validator.validate_incremental()
+    else:
+        results = validator.validate_all(parallel="--parallel" in sys.argv)
     
     # Generate and display report
     report = validator.generate_validation_report(results)
@@ -0,0 +1,198 @@
+"""
+Streaming validation reports.
+
+Issues are written to an NDJSON file as they are produced, one JSON object
+per line, so a report with hundreds of thousands of issues never has to be
+held in memory. The last line is a summary with per-rule counts, a few
+sampled example issues per rule and the byte offsets of every page of
+issues, which lets ValidationReportReader page through a stored report
+without reading it whole.
+"""
+
+import json
+import random
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterable, Iterator
+
+REPORT_FORMAT_VERSION = 1
+
+
+class ValidationReportWriter:
+    """Write validation issues to an NDJSON report as they arrive."""
+    
+    def __init__(self, output_path: str, sample_size: int = 5, page_size: int = 1000):
+        self.output_path = Path(output_path)
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        self.sample_size = sample_size
+        self.page_size = page_size
+        
+        self.issue_count = 0
+        self.rule_counts: Dict[str, Dict[str, Any]] = {}
+        self.page_offsets: List[int] = []
+        # Seeded so the sampled examples are the same on every run
+        self._random = random.Random(0)
+        
+        self._file = open(self.output_path, 'wb')
+        self._write_line({
+            'type': 'header',
+            'format_version': REPORT_FORMAT_VERSION,
+            'timestamp': datetime.now().isoformat()
+        })
+    
+    def _write_line(self, record: Dict):
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        self._file.write(line.encode('utf-8'))
+    
+    def write_issue(self, issue: Dict):
+        """Append one issue and update the per-rule counts and samples."""
+        if self.issue_count % self.page_size == 0:
+            self.page_offsets.append(self._file.tell())
+        self._write_line({'type': 'issue', **issue})
+        self.issue_count += 1
+        
+        rule = self.rule_counts.setdefault(issue['rule_name'], {
+            'severity': issue['severity'],
+            'table_name': issue['table_name'],
+            'count': 0,
+            'examples': []
+        })
+        rule['count'] += 1
+        
+        # Reservoir sampling keeps a uniform sample of each rule's issues
+        if len(rule['examples']) < self.sample_size:
+            rule['examples'].append(issue)
+        else:
+            slot = self._random.randrange(rule['count'])
+            if slot < self.sample_size:
+                rule['examples'][slot] = issue
+    
+    def write_issues(self, issues: Iterable[Dict]) -> int:
+        """Append every issue from an iterable; returns how many were written."""
+        written = 0
+        for issue in issues:
+            self.write_issue(issue)
+            written += 1
+        return written
+    
+    def close(self, summary: Optional[Dict] = None) -> Dict[str, Any]:
+        """Write the summary line and close the file; returns the summary."""
+        record = {
+            'type': 'summary',
+            **(summary or {}),
+            'issue_count': self.issue_count,
+            'rule_counts': self.rule_counts,
+            'page_size': self.page_size,
+            'page_offsets': self.page_offsets,
+        }
+        self._write_line(record)
+        self._file.close()
+        return record
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        if not self._file.closed:
+            self._file.close()
+
+
+class ValidationReportReader:
+    """Read a report written by ValidationReportWriter without loading it whole."""
+    
+    def __init__(self, report_path: str):
+        self.report_path = Path(report_path)
+        self._summary = None
+    
+    def summary(self) -> Dict[str, Any]:
+        """The summary line, read from the end of the file."""
+        if self._summary is None:
+            with open(self.report_path, 'rb') as f:
+                f.seek(0, 2)
+                position = f.tell()
+                block = b''
+                # Read backwards until the line before the summary starts
+                while position > 0 and block.count(b'\n') < 2:
+                    step = min(65536, position)
+                    position -= step
+                    f.seek(position)
+                    block = f.read(step) + block
+                last_line = block.rstrip(b'\n').rsplit(b'\n', 1)[-1]
+            self._summary = json.loads(last_line)
+            if self._summary.get('type') != 'summary':
+                raise ValueError(f"{self.report_path} has no summary line; the report is incomplete")
+        return self._summary
+    
+    def iter_issues(self, start: int = 0, rule_name: str = None,
+                    severity: str = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield issues from position ``start`` onwards, optionally filtered by
+        rule or severity. Without filters the read starts at the page that
+        holds ``start``, so late pages are reached without scanning the file.
+        """
+        summary = self.summary()
+        offsets = summary['page_offsets']
+        filtered = rule_name is not None or severity is not None
+        
+        if filtered or not offsets:
+            page_index, skip = 0, start
+        else:
+            page_index = min(start // summary['page_size'], len(offsets) - 1)
+            skip = start - page_index * summary['page_size']
+        
+        with open(self.report_path, 'rb') as f:
+            if offsets:
+                f.seek(offsets[page_index])
+            for line in f:
+                record = json.loads(line)
+                if record['type'] != 'issue':
+                    if record['type'] == 'summary':
+                        return
+                    continue
+                if rule_name is not None and record['rule_name'] != rule_name:
+                    continue
+                if severity is not None and record['severity'] != severity:
+                    continue
+                if skip:
+                    skip -= 1
+                    continue
+                record.pop('type')
+                yield record
+    
+    def page(self, page: int, page_size: int = 100, rule_name: str = None,
+             severity: str = None) -> List[Dict[str, Any]]:
+        """One page of issues (zero-based), optionally filtered by rule or severity."""
+        issues = []
+        for issue in self.iter_issues(page * page_size, rule_name, severity):
+            issues.append(issue)
+            if len(issues) >= page_size:
+                break
+        return issues
+
+
+def format_report_summary(summary: Dict[str, Any]) -> str:
+    """Human-readable summary of a streamed report: counts and examples per rule."""
+    report = []
+    report.append("=" * 80)
+    report.append("HTS DATABASE VALIDATION REPORT (SUMMARY)")
+    report.append("=" * 80)
+    if 'overall_status' in summary:
+        report.append(f"Overall Status: {summary['overall_status'].upper()}")
+    if 'total_errors' in summary:
+        report.append(f"Errors: {summary['total_errors']}")
+        report.append(f"Warnings: {summary['total_warnings']}")
+    report.append(f"Issues written: {summary['issue_count']:,}")
+    report.append("")
+    
+    report.append("ISSUES BY RULE")
+    report.append("-" * 40)
+    for rule_name, rule in sorted(summary['rule_counts'].items(), key=lambda item: -item[1]['count']):
+        severity_icon = "🔴" if rule['severity'] == 'error' else "🟡"
+        report.append(f"{severity_icon} {rule_name} ({rule['table_name']}): {rule['count']:,}")
+        for example in rule['examples']:
+            value = f" = {example['current_value']}" if example.get('current_value') is not None else ""
+            record = f"#{example['record_id']}" if example.get('record_id') is not None else ""
+            report.append(f"     {record}{value}  {example['error_message']}")
+    report.append("=" * 80)
+    
+    return "\n".join(report)